@@ -3,7 +3,7 @@ import * as React from "react";
 import { Button, Form } from "semantic-ui-react";
 import { Omit } from "../../helpers/types";
 import { DatasetParamsHDF5, DatasetTypes } from "../../messages";
-import { getInitial } from "../helpers";
+import { getInitial, parseOptionalNumList } from "../helpers";
 import { OpenFormProps } from "../types";
 
 type DatasetParamsHDF5ForForm = Omit<DatasetParamsHDF5, "path" | "type" | "tileshape"> & { tileshape: string, };
@@ -52,7 +52,7 @@ const HDF5ParamsForm: React.SFC<MergedProps> = ({
 export default withFormik<OpenFormProps<DatasetParamsHDF5>, FormValues>({
     mapPropsToValues: ({ initial }) => ({
         name: getInitial("name", "", initial),
-        tileshape: getInitial("tileshape", "1, 8, 128, 128", initial),
+        tileshape: getInitial("tileshape", "", initial),
         ds_path: getInitial("ds_path", "", initial),
     }),
     handleSubmit: (values, formikBag) => {
@@ -62,7 +62,7 @@ export default withFormik<OpenFormProps<DatasetParamsHDF5>, FormValues>({
             type: DatasetTypes.HDF5,
             name: values.name,
             ds_path: values.ds_path,
-            tileshape: values.tileshape.split(",").map(part => +part),
+            tileshape: parseOptionalNumList(values.tileshape),
         });
     }
 })(HDF5ParamsForm);
\ No newline at end of file
@@ -3,7 +3,7 @@ import * as React from "react";
 import { Button, Form } from "semantic-ui-react";
 import { Omit } from "../../helpers/types";
 import { DatasetParamsMIB, DatasetTypes } from "../../messages";
-import { getInitial, parseNumList } from "../helpers";
+import { getInitial, parseNumList, parseOptionalNumList } from "../helpers";
 import { OpenFormProps } from "../types";
 
 // some fields have different types in the form vs. in messages
@@ -61,7 +61,7 @@ const RawFileParamsForm: React.SFC<MergedProps> = ({
 export default withFormik<OpenFormProps<DatasetParamsMIB>, FormValues>({
     mapPropsToValues: ({ initial }) => ({
         name: getInitial("name", "", initial),
-        tileshape: getInitial("tileshape", "1, 8, 256, 256", initial),
+        tileshape: getInitial("tileshape", "", initial),
         scan_size: getInitial("scan_size", "256, 256", initial),
     }),
     handleSubmit: (values, formikBag) => {
@@ -70,7 +70,7 @@ export default withFormik<OpenFormProps<DatasetParamsMIB>, FormValues>({
             path,
             type: DatasetTypes.MIB,
             name: values.name,
-            tileshape: parseNumList(values.tileshape),
+            tileshape: parseOptionalNumList(values.tileshape),
             scan_size: parseNumList(values.scan_size),
         });
     }
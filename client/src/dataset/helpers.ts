@@ -3,6 +3,13 @@ export function parseNumList(nums: string) {
     return nums.split(",").map(part => +part);
 }
 
+export function parseOptionalNumList(nums: string) {
+    if (nums.trim() === "") {
+        return undefined;
+    }
+    return parseNumList(nums);
+}
+
 export function getInitial<T extends object, K extends keyof T>(key: K, otherwise: string, values?: T): string {
     if (!values) {
         return otherwise;
@@ -93,7 +93,7 @@ export type DatasetParamsHDF5 = {
     type: DatasetTypes.HDF5,
     path: string,
     ds_path: string,
-    tileshape: number[],
+    tileshape?: number[],
 } & DatasetParamsCommon
 
 export type DatasetParamsRaw = {
@@ -110,7 +110,7 @@ export type DatasetParamsMIB = {
     type: DatasetTypes.MIB,
     path: string,
     scan_size: number[],
-    tileshape: number[],
+    tileshape?: number[],
 } & DatasetParamsCommon
 
 export type DatasetParamsBLO = {
@@ -146,6 +146,7 @@ setup(
     extras_require={
         'hdfs': 'hfds3',
         'torch': 'torch',
+        'compression': ['zstandard', 'lz4'],
     },
     package_dir={"": "src"},
     packages=[
@@ -153,6 +154,7 @@ setup(
         "libertem.common",
         "libertem.io",
         "libertem.io.dataset",
+        "libertem.io.ingest",
         "libertem.executor",
         "libertem.job",
         "libertem.web",
@@ -1,8 +1,19 @@
+import json
+import hashlib
+
 import numpy as np
 
 from libertem.viz import encode_image, visualize_simple, CMAP_CIRCULAR_DEFAULT
 
 
+def _to_json(obj):
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    raise TypeError("can't compare parameters of type %s" % type(obj).__name__)
+
+
 class AnalysisResult(object):
     """
     this class represents a single 2D image result
@@ -126,3 +137,16 @@ class BaseAnalysis(object):
         Get analysis parameters. Override to set defaults
         """
         return parameters
+
+    def get_cache_key(self):
+        """
+        A string that identifies this analysis and its parameters, used as key for
+        keeping results. None if the parameters can't be compared, for example
+        because they contain functions.
+        """
+        try:
+            params = json.dumps(self.parameters, sort_keys=True, default=_to_json)
+        except (TypeError, ValueError):
+            return None
+        key = repr((type(self).__module__, type(self).__name__, params))
+        return hashlib.sha1(key.encode("utf8")).hexdigest()
@@ -4,9 +4,13 @@ import psutil
 import numpy as np
 from libertem.io.dataset import load, filetypes
 from libertem.io.dataset.base import DataSet
+from libertem.io.planner import PartitionPlanner
 from libertem.job.masks import ApplyMasksJob
 from libertem.job.raw import PickFrameJob
 from libertem.job.base import Job
+from libertem.job.incremental import IncrementalRun, PartialResultStore, get_partials_key
+from libertem.job.cache import get_result_key
+from libertem.job.checkpoint import CheckpointedRun, CheckpointStore
 from libertem.common import Slice, Shape
 from libertem.executor.dask import DaskJobExecutor
 from libertem.analysis.raw import PickFrameAnalysis
@@ -26,14 +30,44 @@ class Context:
     them.
     """
 
-    def __init__(self, executor=None):
+    def __init__(self, executor=None, tune_tiling=False, incremental=False,
+                 result_cache=None, checkpoint_interval=None):
         """
         Create a new context. In the background, this creates a suitable
         executor and spins up a local Dask cluster.
+
+        Parameters
+        ----------
+        executor : JobExecutor or None
+            the executor to run jobs on, by default a local Dask cluster
+        tune_tiling : bool
+            refine the tiles that are negotiated between jobs and datasets with a short
+            benchmark on each host; the results are stored in ``$LIBERTEM_CACHE_DIR``
+        incremental : bool
+            keep the results of each partition of an analysis, and when the analysis
+            is run again with the same parameters, only process partitions that are new
+            or whose files changed; for example to follow an acquisition to which files
+            are added. The results are stored in ``$LIBERTEM_CACHE_DIR``
+        result_cache : ResultCache or None
+            look up the results of analyses in this cache before running them, and
+            store them after they are run; analyses that are run again on unchanged
+            data with the same parameters then return immediately
+        checkpoint_interval : float or None
+            store a checkpoint of running analyses every ``checkpoint_interval``
+            seconds, and when they fail; when an analysis is run again on unchanged
+            data with the same parameters, it resumes from its checkpoint, and only
+            the partitions that were not done are run. The checkpoints are stored
+            in ``$LIBERTEM_CACHE_DIR``
         """
         if executor is None:
             executor = self._create_local_executor()
         self.executor = executor
+        self.tune_tiling = tune_tiling
+        self.incremental = incremental
+        self.result_cache = result_cache
+        self.checkpoint_interval = checkpoint_interval
+        self._partials = None
+        self._checkpoints = None
 
     def load(self, filetype: str, *args, **kwargs) -> DataSet:
         """
@@ -64,6 +98,10 @@ class Context:
         ds = self.executor.run_function(load, filetype, *args, **kwargs)
         ds = self.executor.run_function(ds.initialize)
         self.executor.run_function(ds.check_valid)
+        resources = self.executor.get_resources()
+        if resources is not None:
+            ds.set_planner(PartitionPlanner(**resources))
+        ds.set_shared_memory(self.executor.workers_share_memory())
         return ds
 
     load.__doc__ = load.__doc__ % {"types": ", ".join(filetypes.keys())}
@@ -371,20 +409,93 @@ class Context:
         job
             the job or analysis to run
         """
+        analysis, out = None, None
+        for analysis, out in self._reduce_iter(job):
+            pass
+        if analysis is not None:
+            return analysis.get_results(out)
+        return out
+
+    def run_iter(self, job: Union[Job, BaseAnalysis]):
+        """
+        Run the given `Job` or `Analysis` and yield the intermediate results each
+        time a partition is done, for example to show the results of a live
+        acquisition while it is running. The last result is the same as the result
+        of `run`.
+
+        Parameters
+        ----------
+        job
+            the job or analysis to run
+
+        Yields
+        ------
+        the result data, as returned by `run`. For jobs, the same buffer is
+        updated in place and yielded again.
+        """
+        for analysis, out in self._reduce_iter(job):
+            if analysis is not None:
+                yield analysis.get_results(out)
+            else:
+                yield out
+
+    def _reduce_iter(self, job):
+        """
+        run ``job`` and yield ``(analysis, buffer)`` each time a partition is done;
+        ``analysis`` is None for jobs. Yields at least once.
+        """
         analysis = None
         if hasattr(job, "get_job"):
             analysis = job
             job_to_run = analysis.get_job()
         else:
             job_to_run = job
+        job_to_run.dataset.set_shared_memory(self.executor.workers_share_memory())
+        if self.tune_tiling:
+            job_to_run.tune_tiling = True
+
+        key = None
+        use_key = self.result_cache is not None or self.checkpoint_interval is not None
+        if use_key and analysis is not None:
+            key = get_result_key(analysis)
+        if key is not None and self.result_cache is not None:
+            cached = self.result_cache.get(key)
+            if cached is not None:
+                yield analysis, cached
+                return
 
         out = job_to_run.get_result_buffer()
-        for tiles in self.executor.run_job(job_to_run):
+        done = False
+        for tiles in self._run_job(job_to_run, analysis, key):
             for tile in tiles:
                 tile.reduce_into_result(out)
-        if analysis is not None:
-            return analysis.get_results(out)
-        return out
+            done = True
+            yield analysis, out
+        if not done:
+            # no partitions, or all of them were skipped:
+            yield analysis, out
+        # if the data changed while the job was running, the key is outdated, and
+        # the result won't be found under it again:
+        if key is not None and self.result_cache is not None:
+            self.result_cache.put(key, out)
+
+    def _run_job(self, job, analysis, result_key):
+        partials_key = None
+        if self.incremental and analysis is not None:
+            partials_key = get_partials_key(analysis)
+        if partials_key is not None:
+            # the stored partial results already serve as checkpoint:
+            if self._partials is None:
+                self._partials = PartialResultStore()
+            return IncrementalRun(job, partials_key, self._partials).run(self.executor)
+        if self.checkpoint_interval is not None and result_key is not None:
+            if self._checkpoints is None:
+                self._checkpoints = CheckpointStore()
+            run = CheckpointedRun(
+                job, result_key, self._checkpoints, interval=self.checkpoint_interval
+            )
+            return run.run(self.executor)
+        return self.executor.run_job(job)
 
     def _create_local_executor(self):
         cores = psutil.cpu_count(logical=False)
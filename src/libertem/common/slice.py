@@ -161,6 +161,27 @@ class Slice(object):
         else:
             return slice_
 
+    def get_frame_indices(self, nav_shape):
+        """
+        The flat indices of the frames of this slice, in a dataset with navigation
+        shape ``nav_shape``, as an array shaped like the navigation dimensions of
+        this slice
+
+        Examples
+        --------
+        >>> from libertem.common import Slice, Shape
+        >>> s = Slice(shape=Shape((2, 2, 4, 4), sig_dims=2), origin=(1, 2, 0, 0))
+        >>> s.get_frame_indices((4, 4))
+        array([[ 6,  7],
+               [10, 11]])
+        """
+        o, s = self.origin, self.shape
+        ranges = [
+            np.arange(o[i], o[i] + s[i])
+            for i in range(s.nav.dims)
+        ]
+        return np.ravel_multi_index(np.meshgrid(*ranges, indexing='ij'), tuple(nav_shape))
+
     def discard_nav(self):
         """
         returns a copy with the origin/shape zeroed in the nav dimensions
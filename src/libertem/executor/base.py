@@ -36,11 +36,27 @@ class JobExecutor(object):
         """
         raise NotImplementedError()
 
+    def get_resources(self):
+        """
+        returns a dict with the keys num_workers (total number of worker threads)
+        and worker_memory (memory per worker thread in bytes, or None), or None
+        if unknown; used to plan partitions
+        """
+        return None
+
+    def workers_share_memory(self):
+        """
+        True if all workers run on this node, in other processes, so they can map
+        data from the shared memory of this process instead of receiving a copy
+        """
+        return False
+
 
 class AsyncJobExecutor(object):
-    async def run_job(self, job):
+    async def run_job(self, job, priority=0, pause=None):
         """
-        run a Job
+        run a Job; tasks with a higher ``priority`` run first, and while ``pause()``
+        returns True, no new tasks are started
         """
         raise NotImplementedError()
 
@@ -63,3 +79,15 @@ class AsyncJobExecutor(object):
 
     async def get_available_workers(self):
         raise NotImplementedError()
+
+    def get_resources(self):
+        """
+        see ``JobExecutor.get_resources``
+        """
+        return None
+
+    def workers_share_memory(self):
+        """
+        see ``JobExecutor.workers_share_memory``
+        """
+        return False
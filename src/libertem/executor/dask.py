@@ -1,41 +1,513 @@
+import math
+import time
+import asyncio
+import hashlib
 import functools
 import logging
+import collections
 
 import tornado.util
 from dask import distributed as dd
+from distributed.scheduler import KilledWorker
 
+from libertem.io.utils import is_rotational
+from libertem.io.dataset.base import SubPartition
 from .base import JobExecutor, AsyncJobExecutor, JobCancelledError
 
 
 log = logging.getLogger(__name__)
 
 
+def _hrw_score(key, node):
+    digest = hashlib.md5(("%s|%s" % (key, node)).encode("utf8")).digest()
+    return int.from_bytes(digest[:8], "big")
+
+
+def _hrw_choice(key, nodes):
+    """
+    rendezvous (highest random weight) hashing: the choice for a ``key`` only changes
+    if the chosen node leaves, or a node joins that wins for this ``key``
+    """
+    return max(nodes, key=lambda node: (_hrw_score(key, node), node))
+
+
+def _hrw_order(key, nodes):
+    """
+    all ``nodes``, in the order of preference for ``key``; the first is ``_hrw_choice``
+    """
+    return sorted(nodes, key=lambda node: (_hrw_score(key, node), node), reverse=True)
+
+
+def _run_task(task):
+    """
+    run ``task`` on a worker; exceptions are marked with the name of the worker,
+    so failing workers can be excluded
+    """
+    try:
+        return task()
+    except Exception as e:
+        try:
+            e.libertem_worker = dd.get_worker().name
+        except ValueError:
+            # not running on a worker
+            pass
+        raise
+
+
+class _TaskScheduler(object):
+    def __init__(self, tasks, max_readers_per_device=None):
+        """
+        Decide which tasks can be started, so that each storage device is only read by a
+        limited number of tasks at the same time. The tasks of a device are started
+        in order, which, for most formats, means in file order. Pending tasks can be
+        split to balance the load at the end of a job.
+
+        Parameters
+        ----------
+        tasks : list of Task
+            the tasks of a job, in dataset order
+        max_readers_per_device : int or None
+            concurrent tasks per device; by default, one for spinning disks and
+            unlimited for everything else
+        """
+        self._pending = []
+        self._max_readers = max_readers_per_device
+        self._devices = {}
+        self._limits = {}
+        self._active = collections.Counter()
+        self._cancelled = False
+        self._pending = [self._add(task) for task in tasks]
+
+    def _add(self, task):
+        devices = task.partition.get_devices()
+        self._devices[id(task)] = devices
+        for device in devices:
+            if device not in self._limits:
+                self._limits[device] = self._get_limit(device)
+        return task
+
+    def _get_limit(self, device):
+        if self._max_readers is not None:
+            return self._max_readers
+        if is_rotational(device):
+            return 1
+        return None
+
+    def _has_capacity(self, device):
+        limit = self._limits[device]
+        return limit is None or self._active[device] < limit
+
+    @property
+    def num_pending(self):
+        return len(self._pending)
+
+    def next_tasks(self, max_tasks=None):
+        """
+        remove up to ``max_tasks`` tasks that can be started now from the pending
+        tasks, and return them
+        """
+        if self._cancelled:
+            return []
+        runnable = []
+        remaining = []
+        # devices that have a waiting task, later tasks must not overtake it:
+        blocked = set()
+        for task in self._pending:
+            devices = self._devices[id(task)]
+            full = max_tasks is not None and len(runnable) >= max_tasks
+            if full or any(d in blocked or not self._has_capacity(d) for d in devices):
+                blocked.update(devices)
+                remaining.append(task)
+                continue
+            for device in devices:
+                self._active[device] += 1
+            runnable.append(task)
+        self._pending = remaining
+        return runnable
+
+    def split_pending(self, num_tasks, min_size):
+        """
+        split the largest pending tasks until there are at least ``num_tasks``
+        pending tasks, or no task can be split into parts of at least ``min_size`` bytes
+        """
+        unsplittable = set()
+        while not self._cancelled and len(self._pending) < num_tasks:
+            candidates = [
+                (idx, task) for idx, task in enumerate(self._pending)
+                if id(task) not in unsplittable
+            ]
+            if not candidates:
+                return
+            idx, task = max(candidates, key=lambda c: _task_size(c[1]))
+            parts = _split_task(task, num_tasks - len(self._pending) + 1, min_size)
+            if parts is None:
+                unsplittable.add(id(task))
+                continue
+            del self._devices[id(task)]
+            self._pending[idx:idx + 1] = [self._add(part) for part in parts]
+
+    def task_done(self, task):
+        for device in self._devices.pop(id(task)):
+            self._active[device] -= 1
+
+    def cancel(self):
+        self._cancelled = True
+
+    @property
+    def cancelled(self):
+        return self._cancelled
+
+
+def _task_size(task):
+    partition = task.partition
+    return partition.shape.size * partition.dtype.itemsize
+
+
+def _split_task(task, num_parts, min_size):
+    """
+    split ``task`` into up to ``num_parts`` tasks of at least ``min_size`` bytes,
+    returns None if that is not possible
+    """
+    partition = task.partition
+    frame_size = partition.shape.sig.size * partition.dtype.itemsize
+    min_frames = max(1, -(-min_size // frame_size))
+    parts = partition.split(num_parts, min_frames=min_frames)
+    if len(parts) <= 1:
+        return None
+    tasks = [task.for_partition(part) for part in parts]
+    if any(t is None for t in tasks):
+        return None
+    return tasks
+
+
+class _JobRun(object):
+    def __init__(self, executor, job, priority=0, pause=None):
+        """
+        The state of a job running on a dask cluster: which tasks are submitted,
+        which futures belong to which task, and which tasks are done.
+
+        Parameters
+        ----------
+        priority : int
+            dask priority of the tasks; tasks with higher priority are run first
+        pause : callable or None
+            while ``pause()`` returns True, no new tasks are submitted
+        """
+        self._executor = executor
+        self.priority = priority
+        self.pause = pause
+        self.scheduler = _TaskScheduler(
+            job.get_tasks(), max_readers_per_device=executor.max_readers_per_device
+        )
+        self.workers = executor.get_available_workers()
+        self.slots = executor.get_num_slots()
+        self.as_completed = dd.as_completed(with_results=True, raise_errors=False)
+        self.excluded = set()
+        self.error = None
+        self._tasks = {}
+        self._hosts = {}
+        self.load = collections.Counter()
+        self._copies = collections.OrderedDict()
+        self._attempts = collections.Counter()
+        self._worker_failures = collections.Counter()
+        # (due time, task) of failed tasks that wait for their retry:
+        self._retries = []
+
+    def _get_workers(self):
+        workers = [w for w in self.workers if w['name'] not in self.excluded]
+        # if all workers failed, we still have to try somewhere:
+        return workers or self.workers
+
+    def _submit(self, task, duplicate=False, retry=False):
+        future, locations = self._executor._submit(
+            task, self._get_workers(), duplicate=duplicate, retry=retry,
+            priority=self.priority, load=self.load,
+        )
+        # the tasks in flight per host, for placing the next tasks:
+        host_of = {w['name']: w['host'] for w in self.workers}
+        hosts = {host_of.get(name) for name in locations}
+        if len(hosts) == 1 and None not in hosts:
+            host = hosts.pop()
+            self._hosts[future] = host
+            self.load[host] += 1
+        self._tasks[future] = task
+        self._copies.setdefault(id(task), []).append(future)
+        self.as_completed.add(future)
+
+    def submit(self):
+        """
+        submit the tasks that can be started now
+        """
+        executor = self._executor
+        self._submit_retries()
+        if self.is_paused():
+            return
+        if executor.split_partitions:
+            # keep a few tasks per thread in flight, so workers don't wait for a
+            # round trip to the client between tasks, but not more, so the rest
+            # can still be split when workers become idle:
+            free = executor.tasks_per_slot * self.slots - len(self._tasks)
+            if free <= 0:
+                return
+            if self.scheduler.num_pending < free:
+                self.scheduler.split_pending(free, min_size=executor.min_split_size)
+            tasks = self.scheduler.next_tasks(max_tasks=free)
+        else:
+            tasks = self.scheduler.next_tasks()
+        for task in tasks:
+            self._submit(task)
+        self._speculate()
+
+    def is_paused(self):
+        return self.pause is not None and self.pause()
+
+    def _submit_retries(self):
+        """
+        submit the retries whose delay has passed; if the job failed or was
+        cancelled, the waiting retries are dropped
+        """
+        if self.error is not None or self.scheduler.cancelled:
+            for due, task in self._retries:
+                self.scheduler.task_done(task)
+            self._retries = []
+            return
+        if self.is_paused():
+            return
+        now = time.monotonic()
+        for due, task in self._retries:
+            if due <= now:
+                self._submit(task, retry=True)
+        self._retries = [(due, task) for due, task in self._retries if due > now]
+
+    def _retry_wait(self):
+        """
+        how long to wait before checking the waiting retries again, or None
+        if there are none
+        """
+        if not self._retries:
+            return None
+        next_due = min(due for due, task in self._retries)
+        return min(max(next_due - time.monotonic(), 0.01), 0.1)
+
+    def iter_completed(self):
+        """
+        yield ``(future, result)`` of the tasks as they complete; while retries are
+        waiting, the client wakes up regularly to submit them, so the delay doesn't
+        block a worker thread
+        """
+        while True:
+            self.submit()
+            wait = self._retry_wait()
+            if wait is not None and not self.as_completed.has_ready():
+                time.sleep(wait)
+                continue
+            if self.as_completed.is_empty():
+                return
+            yield next(self.as_completed)
+
+    async def aiter_completed(self):
+        """
+        like `iter_completed`, for use from asyncio code
+        """
+        while True:
+            self.submit()
+            wait = self._retry_wait()
+            if wait is not None and not self.as_completed.has_ready():
+                await asyncio.sleep(wait)
+                continue
+            if self.as_completed.is_empty():
+                return
+            yield await self.as_completed.__anext__()
+
+    def _forget(self, future):
+        task = self._tasks.pop(future, None)
+        host = self._hosts.pop(future, None)
+        if host is not None:
+            self.load[host] -= 1
+        return task
+
+    def _speculate(self):
+        """
+        run duplicates of the last few running tasks on idle threads, and use the
+        result that comes first
+        """
+        max_tasks = self._executor.speculative_tasks
+        if not max_tasks or self.scheduler.num_pending > 0 or self.error is not None:
+            return
+        if len(self._copies) > max_tasks:
+            return
+        idle = self.slots - len(self._tasks)
+        # oldest first, as they are most likely to be stragglers:
+        for task_id, futures in list(self._copies.items()):
+            if idle <= 0:
+                break
+            if len(futures) > 1:
+                continue
+            self._submit(self._tasks[futures[0]], duplicate=True)
+            idle -= 1
+
+    def complete(self, future):
+        """
+        handle the completion of ``future``
+
+        Returns
+        -------
+        (bool, list of Future)
+            whether the result of ``future`` should be used, and the futures of
+            duplicates that are no longer needed
+        """
+        task = self._forget(future)
+        if task is None:
+            # a duplicate of a task that is already done
+            return False, []
+        futures = self._copies[id(task)]
+        del self._copies[id(task)]
+        self.scheduler.task_done(task)
+        others = [f for f in futures if f is not future]
+        for other in others:
+            self._forget(other)
+        return True, others
+
+    def fail(self, future, exc_info):
+        """
+        handle the failure of ``future``: retry its task after a delay that doubles
+        with each attempt, and exclude workers on which tasks failed too often.
+        If the task can't be retried, no new tasks are started, and ``self.error``
+        is set; the tasks that are still running are finished, so their results
+        are not lost.
+        """
+        executor = self._executor
+        task = self._forget(future)
+        if task is None:
+            return
+        futures = self._copies[id(task)]
+        futures.remove(future)
+        if futures:
+            # a duplicate of this task may still succeed
+            return
+        del self._copies[id(task)]
+        exc = exc_info[1]
+        worker = getattr(exc, "libertem_worker", None)
+        if worker is not None:
+            self._worker_failures[worker] += 1
+            if (self._worker_failures[worker] >= executor.max_worker_failures
+                    and worker not in self.excluded):
+                log.warning("excluding worker %s after %d failed tasks",
+                            worker, self._worker_failures[worker])
+                self.excluded.add(worker)
+        attempts = self._attempts[id(task)]
+        retry = (
+            self.error is None
+            and isinstance(exc, executor.retry_on)
+            and attempts < executor.max_retries
+        )
+        if not retry:
+            self.scheduler.task_done(task)
+            if self.error is None:
+                self.error = exc_info
+                self.scheduler.cancel()
+            return
+        self._attempts[id(task)] += 1
+        delay = executor.retry_delay * 2 ** attempts
+        log.warning("task for %r failed (%r), retrying in %.1fs",
+                    task.partition, exc, delay)
+        self._retries.append((time.monotonic() + delay, task))
+
+    def raise_error(self):
+        """
+        raise the error of a task that could not be retried, if any
+        """
+        if self.error is not None:
+            typ, exc, tb = self.error
+            raise exc.with_traceback(tb)
+
+    def cancel(self):
+        self.scheduler.cancel()
+        return list(self._tasks.keys())
+
+
 class CommonDaskMixin(object):
-    def _task_idx_to_workers(self, workers, idx):
-        hosts = list(sorted(set(w['host'] for w in workers)))
-        host_idx = idx % len(hosts)
-        host = hosts[host_idx]
-        return [
+    pin_workers = False
+    max_readers_per_device = None
+    split_partitions = True
+    tasks_per_slot = 2
+    min_split_size = 16*1024*1024
+    speculative_tasks = 0
+    max_retries = 2
+    retry_delay = 1.0
+    max_worker_failures = 3
+    retry_on = (OSError, KilledWorker)
+    load_factor = 1.25
+
+    def _task_to_workers(self, workers, key, load=None):
+        """
+        place the task with placement key ``key`` on a host via consistent hashing,
+        so repeated jobs on the same data are served from the same page cache.
+        If ``pin_workers`` is set, also choose a single worker on that host.
+
+        ``load`` is the number of tasks in flight per host. Hosts that already have
+        more than ``load_factor`` times their share of the tasks are skipped in favor
+        of the next host in the hashing order of ``key`` (consistent hashing with
+        bounded loads), so the tasks don't pile up on one host.
+        """
+        threads = collections.Counter()
+        for w in workers:
+            threads[w['host']] += w.get('nthreads', 1)
+        hosts = _hrw_order(key, threads.keys())
+        host = hosts[0]
+        if load:
+            total = sum(load[h] for h in hosts) + 1
+            total_threads = sum(threads.values())
+            for candidate in hosts:
+                share = total * threads[candidate] / total_threads
+                if load[candidate] < math.ceil(self.load_factor * share):
+                    host = candidate
+                    break
+        names = [
             w['name']
             for w in workers
             if w['host'] == host
         ]
+        if self.pin_workers:
+            by_str = {str(name): name for name in names}
+            return [by_str[_hrw_choice(key, by_str.keys())]]
+        return names
+
+    def _submit(self, task, workers, duplicate=False, retry=False, priority=0, load=None):
+        """
+        submit ``task`` to one of ``workers``; ``load`` is passed to ``_task_to_workers``
 
-    def _get_futures(self, job):
-        futures = []
-        available_workers = self.get_available_workers()
-        for task in job.get_tasks():
-            submit_kwargs = {}
-            locations = task.get_locations()
-            if locations is not None and len(locations) == 0:
-                raise ValueError("no workers found for task")
-            if locations is None:
-                locations = self._task_idx_to_workers(available_workers, task.idx)
-            submit_kwargs['workers'] = locations
-            futures.append(
-                self.client.submit(task, **submit_kwargs)
+        Returns
+        -------
+        (Future, list)
+            the future of the task, and the names of the workers it may run on
+        """
+        submit_kwargs = {'priority': priority}
+        locations = task.get_locations()
+        if locations is not None and len(locations) == 0:
+            raise ValueError("no workers found for task")
+        if locations is not None:
+            # don't use excluded workers, unless there are no others:
+            names = {w['name'] for w in workers}
+            locations = [loc for loc in locations if loc in names] or locations
+        else:
+            locations = self._task_to_workers(
+                workers, task.partition.get_placement_key(), load=load
             )
-        return futures
+        if duplicate:
+            # prefer other hosts for duplicates, and make sure they get a new key:
+            others = [w['name'] for w in workers if w['name'] not in locations]
+            if others and task.get_locations() is None:
+                locations = others
+            submit_kwargs['pure'] = False
+        if retry:
+            # the failed key is still known to the scheduler:
+            submit_kwargs['pure'] = False
+        if duplicate or retry or isinstance(task.partition, SubPartition):
+            # parts of split tasks, duplicates and retries may run on any idle worker:
+            submit_kwargs['allow_other_workers'] = True
+        submit_kwargs['workers'] = locations
+        return self.client.submit(_run_task, task, **submit_kwargs), locations
 
     def get_available_workers(self):
         info = self.client.scheduler_info()
@@ -43,14 +515,56 @@ class CommonDaskMixin(object):
             {
                 'name': worker['name'],
                 'host': worker['host'],
+                'nthreads': worker['nthreads'],
             }
             for worker in info['workers'].values()
         ]
 
+    def get_resources(self):
+        workers = list(self.client.scheduler_info()['workers'].values())
+        if not workers:
+            return None
+        memory = [
+            w['memory_limit'] // w['nthreads']
+            for w in workers
+            if w.get('memory_limit')
+        ]
+        return {
+            'num_workers': sum(w['nthreads'] for w in workers),
+            'worker_memory': min(memory) if memory else None,
+        }
+
+    def workers_share_memory(self):
+        # only for clusters we started ourselves, we know that the workers are local:
+        return self.is_local
+
+    def get_num_slots(self):
+        """
+        total number of threads of all workers
+        """
+        info = self.client.scheduler_info()
+        return max(1, sum(worker['nthreads'] for worker in info['workers'].values()))
+
 
 class AsyncDaskJobExecutor(CommonDaskMixin, AsyncJobExecutor):
-    def __init__(self, client, is_local=False):
+    def __init__(self, client, is_local=False, pin_workers=False,
+                 max_readers_per_device=None, split_partitions=True, tasks_per_slot=2,
+                 min_split_size=16*1024*1024, speculative_tasks=0, max_retries=2,
+                 retry_delay=1.0, max_worker_failures=3, retry_on=(OSError, KilledWorker)):
+        """
+        Like `DaskJobExecutor`, for use from asyncio code
+        """
         self.is_local = is_local
+        self.pin_workers = pin_workers
+        self.max_readers_per_device = max_readers_per_device
+        self.split_partitions = split_partitions
+        self.tasks_per_slot = tasks_per_slot
+        self.min_split_size = min_split_size
+        self.speculative_tasks = speculative_tasks
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.max_worker_failures = max_worker_failures
+        self.retry_on = retry_on
         self.client = client
         self._futures = {}
 
@@ -68,14 +582,49 @@ class AsyncDaskJobExecutor(CommonDaskMixin, AsyncJobExecutor):
         except Exception:
             log.exception("could not close dask executor")
 
-    async def run_job(self, job):
-        futures = self._get_futures(job)
-        self._futures[job] = futures
-        async for future, result in dd.as_completed(futures, with_results=True):
-            if future.cancelled():
-                raise JobCancelledError()
-            yield result
-        del self._futures[job]
+    async def run_job(self, job, priority=0, pause=None):
+        """
+        run ``job``, and yield the results of its tasks
+
+        Parameters
+        ----------
+        priority : int
+            dask priority of the tasks of this job; tasks with higher priority are
+            run first
+        pause : callable or None
+            while ``pause()`` returns True, no new tasks are started, so other jobs can
+            use the workers; the tasks that are running are finished. With
+            ``split_partitions``, only ``tasks_per_slot`` tasks per worker thread are
+            in flight, otherwise all tasks are submitted at the start of the job.
+        """
+        run = _JobRun(self, job, priority=priority, pause=pause)
+        self._futures[job] = run
+        try:
+            while True:
+                async for future, result in run.aiter_completed():
+                    if future.status == "error":
+                        run.fail(future, result)
+                        continue
+                    use_result, duplicates = run.complete(future)
+                    if not use_result:
+                        continue
+                    if future.cancelled():
+                        raise JobCancelledError()
+                    if duplicates:
+                        await self.client.cancel(duplicates)
+                    run.submit()
+                    yield result
+                if run.error is not None:
+                    break
+                if run.scheduler.cancelled:
+                    raise JobCancelledError()
+                if run.scheduler.num_pending == 0:
+                    break
+                # paused, with no tasks in flight:
+                await asyncio.sleep(0.1)
+            run.raise_error()
+        finally:
+            del self._futures[job]
 
     async def run_function(self, fn, *args, **kwargs):
         """
@@ -86,7 +635,7 @@ class AsyncDaskJobExecutor(CommonDaskMixin, AsyncJobExecutor):
 
     async def cancel_job(self, job):
         if job in self._futures:
-            futures = self._futures[job]
+            futures = self._futures[job].cancel()
             await self.client.cancel(futures)
 
     @classmethod
@@ -103,7 +652,7 @@ class AsyncDaskJobExecutor(CommonDaskMixin, AsyncJobExecutor):
         return cls(client=client, is_local=False, *args, **kwargs)
 
     @classmethod
-    async def make_local(cls, cluster_kwargs=None, client_kwargs=None):
+    async def make_local(cls, cluster_kwargs=None, client_kwargs=None, **kwargs):
         """
         Spin up a local dask cluster
 
@@ -111,6 +660,9 @@ class AsyncDaskJobExecutor(CommonDaskMixin, AsyncJobExecutor):
             threads_per_worker
             n_workers
 
+        additional kwargs, like ``pin_workers``, ``max_readers_per_device``,
+        ``speculative_tasks`` or ``max_retries``, are passed to the executor
+
         Returns
         -------
         AsyncDaskJobExecutor
@@ -118,18 +670,50 @@ class AsyncDaskJobExecutor(CommonDaskMixin, AsyncJobExecutor):
         """
         cluster = dd.LocalCluster(**(cluster_kwargs or {}))
         client = await dd.Client(cluster, asynchronous=True, **(client_kwargs or {}))
-        return cls(client=client, is_local=True)
+        return cls(client=client, is_local=True, **kwargs)
 
 
 class DaskJobExecutor(CommonDaskMixin, JobExecutor):
-    def __init__(self, client, is_local=False):
+    def __init__(self, client, is_local=False, pin_workers=False,
+                 max_readers_per_device=None, split_partitions=True, tasks_per_slot=2,
+                 min_split_size=16*1024*1024, speculative_tasks=0, max_retries=2,
+                 retry_delay=1.0, max_worker_failures=3, retry_on=(OSError, KilledWorker)):
+        """
+        Run jobs on a dask cluster. Tasks that fail with one of the ``retry_on``
+        exceptions, for example because of an I/O error or because their worker died,
+        are retried up to ``max_retries`` times, after ``retry_delay`` seconds, doubled
+        with each attempt. Workers on which ``max_worker_failures`` tasks failed are
+        not used for the rest of the job. If a task can't be retried, the tasks that
+        are already running are finished before the error is raised, so their results
+        are not lost.
+        """
         self.is_local = is_local
+        self.pin_workers = pin_workers
+        self.max_readers_per_device = max_readers_per_device
+        self.split_partitions = split_partitions
+        self.tasks_per_slot = tasks_per_slot
+        self.min_split_size = min_split_size
+        self.speculative_tasks = speculative_tasks
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.max_worker_failures = max_worker_failures
+        self.retry_on = retry_on
         self.client = client
 
     def run_job(self, job):
-        futures = self._get_futures(job)
-        for future, result in dd.as_completed(futures, with_results=True):
+        run = _JobRun(self, job)
+        for future, result in run.iter_completed():
+            if future.status == "error":
+                run.fail(future, result)
+                continue
+            use_result, duplicates = run.complete(future)
+            if not use_result:
+                continue
+            if duplicates:
+                self.client.cancel(duplicates)
+            run.submit()
             yield result
+        run.raise_error()
 
     def run_function(self, fn, *args, **kwargs):
         """
@@ -161,7 +745,7 @@ class DaskJobExecutor(CommonDaskMixin, JobExecutor):
         return cls(client=client, is_local=False, *args, **kwargs)
 
     @classmethod
-    def make_local(cls, cluster_kwargs=None, client_kwargs=None):
+    def make_local(cls, cluster_kwargs=None, client_kwargs=None, **kwargs):
         """
         Spin up a local dask cluster
 
@@ -169,6 +753,9 @@ class DaskJobExecutor(CommonDaskMixin, JobExecutor):
             threads_per_worker
             n_workers
 
+        additional kwargs, like ``pin_workers``, ``max_readers_per_device``,
+        ``speculative_tasks`` or ``max_retries``, are passed to the executor
+
         Returns
         -------
         DaskJobExecutor
@@ -176,4 +763,4 @@ class DaskJobExecutor(CommonDaskMixin, JobExecutor):
         """
         cluster = dd.LocalCluster(**(cluster_kwargs or {}))
         client = dd.Client(cluster, **(client_kwargs or {}))
-        return cls(client=client, is_local=True)
+        return cls(client=client, is_local=True, **kwargs)
@@ -0,0 +1,115 @@
+"""
+Compression codecs for our own file formats, and helpers to run them in parallel.
+
+All codecs used here release the GIL while (de)compressing, so running them in a
+thread pool scales with the number of cores.
+"""
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+import psutil
+import numpy as np
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import lz4.frame as lz4_frame
+except ImportError:
+    lz4_frame = None
+
+
+def _zstd_compress(data):
+    # compressor objects must not be shared between threads
+    return zstandard.ZstdCompressor(level=1).compress(data)
+
+
+def _zstd_decompress(data):
+    return zstandard.ZstdDecompressor().decompress(data)
+
+
+def _zlib_compress(data):
+    return zlib.compress(data, 1)
+
+
+def _identity(data):
+    return data
+
+
+_CODECS = {
+    "none": (_identity, _identity),
+    "zlib": (_zlib_compress, zlib.decompress),
+}
+if zstandard is not None:
+    _CODECS["zstd"] = (_zstd_compress, _zstd_decompress)
+if lz4_frame is not None:
+    _CODECS["lz4"] = (lz4_frame.compress, lz4_frame.decompress)
+
+
+def available_codecs():
+    return list(_CODECS.keys())
+
+
+def default_codec():
+    """
+    the fastest codec that is available
+    """
+    for name in ("lz4", "zstd", "zlib"):
+        if name in _CODECS:
+            return name
+
+
+def _get_codec(name):
+    try:
+        return _CODECS[name]
+    except KeyError:
+        raise ValueError("codec %s not available, have: %s" % (
+            name, ", ".join(available_codecs())
+        ))
+
+
+def compress(codec, data):
+    return _get_codec(codec)[0](data)
+
+
+def decompress(codec, data):
+    return _get_codec(codec)[1](data)
+
+
+def shuffle(arr):
+    """
+    byte shuffling: group the first bytes of all items, then all second bytes etc.,
+    which makes numeric data a lot more compressible
+    """
+    arr = np.ascontiguousarray(arr)
+    return np.ascontiguousarray(arr.view(np.uint8).reshape((-1, arr.dtype.itemsize)).T)
+
+
+def unshuffle(raw, itemsize):
+    """
+    inverse of ``shuffle``; ``raw`` can be any buffer, returns an uint8 array
+    """
+    arr = np.frombuffer(raw, dtype=np.uint8)
+    return np.ascontiguousarray(arr.reshape((itemsize, -1)).T)
+
+
+_pool = None
+
+
+def get_codec_threads():
+    """
+    number of threads of the pool returned by ``get_codec_pool``
+    """
+    return psutil.cpu_count(logical=False) or 2
+
+
+def get_codec_pool():
+    """
+    per-process thread pool for running codecs
+    """
+    global _pool
+    if _pool is None:
+        _pool = ThreadPoolExecutor(max_workers=get_codec_threads())
+    return _pool
@@ -4,6 +4,7 @@ from libertem.io.dataset.base import DataSetException
 
 filetypes = {
     "hdfs": "libertem.io.dataset.hdfs.BinaryHDFSDataSet",
+    "binary": "libertem.io.dataset.binary.BinaryDataSet",
     "hdf5": "libertem.io.dataset.hdf5.H5DataSet",
     "raw": "libertem.io.dataset.raw.RawFileDataSet",
     "mib": "libertem.io.dataset.mib.MIBDataSet",
@@ -11,6 +12,11 @@ filetypes = {
     "k2is": "libertem.io.dataset.k2is.K2ISDataSet",
     "ser": "libertem.io.dataset.ser.SERDataSet",
     "frms6": "libertem.io.dataset.frms6.FRMS6DataSet",
+    "empad": "libertem.io.dataset.empad.EMPADDataSet",
+    "npy": "libertem.io.dataset.npy.NPYDataSet",
+    "memory": "libertem.io.dataset.memory.MemoryDataSet",
+    "chunked": "libertem.io.dataset.chunked.ChunkedDataSet",
+    "stream": "libertem.io.dataset.stream.StreamDataSet",
 }
 
 
@@ -1,6 +1,21 @@
+import os
+import hashlib
+
 import numpy as np
 
-from libertem.io.utils import get_partition_shape
+from libertem.common import Slice, Shape
+from libertem.io.utils import get_partition_shape, get_devices
+from libertem.io.planner import get_default_planner
+from libertem.io.tiling import TilingCapabilities
+
+
+def _is_simple(value):
+    """
+    is ``value`` made of simple types only, so that its repr identifies it?
+    """
+    if isinstance(value, (tuple, list)):
+        return all(_is_simple(v) for v in value)
+    return isinstance(value, (str, bytes, int, float, bool, type(None), np.dtype))
 
 
 class DataSetException(Exception):
@@ -8,6 +23,8 @@ class DataSetException(Exception):
 
 
 class DataSet(object):
+    _planner = None
+
     def initialize(self):
         """
         pre-load metadata. this will be executed on a worker node. should return self.
@@ -79,6 +96,54 @@ class DataSet(object):
              "value": str(len(list(self.get_partitions())))}
         ]
 
+    def get_cache_key(self):
+        """
+        A string that identifies the data that this DataSet yields, used as key for caching
+        decoded data. The default implementation hashes the type and the simple-typed
+        attributes of the DataSet (scalars, strings and tuples or lists of them, whose
+        repr is the same for equal values), together with size and modification time
+        of all files it reads: those of its partitions (see ``Partition.get_paths``),
+        and the file at ``self._path`` or ``self.path``, if any, for example an index
+        or header file. Subclasses can override this method if that is not sufficient.
+        """
+        params = sorted(
+            (k, repr(v)) for k, v in vars(self).items()
+            if _is_simple(v)
+        )
+        paths = set()
+        for attr in ("_path", "path"):
+            path = getattr(self, attr, None)
+            if isinstance(path, str):
+                paths.add(path)
+        try:
+            for partition in self.get_partitions():
+                paths.update(partition.get_paths())
+        except (AttributeError, DataSetException, IOError, OSError):
+            # not initialized: only the parameters are known
+            pass
+        stats = []
+        for path in sorted(paths):
+            try:
+                st = os.stat(path)
+            except (IOError, OSError):
+                continue
+            stats.append((path, st.st_size, st.st_mtime_ns))
+        key = repr((type(self).__module__, type(self).__name__, params, stats))
+        return hashlib.sha1(key.encode("utf8")).hexdigest()
+
+    def get_identity(self):
+        """
+        A string that identifies where the data of this DataSet comes from, independent
+        of its size, or None if that is not known. Used to keep partial results of a
+        DataSet that grows, like a running acquisition. The default implementation hashes
+        the type of the DataSet and the path at ``self._path``, if any.
+        """
+        path = getattr(self, "_path", None)
+        if not isinstance(path, str):
+            return None
+        key = repr((type(self).__module__, type(self).__name__, os.path.abspath(path)))
+        return hashlib.sha1(key.encode("utf8")).hexdigest()
+
     def get_diagnostics(self):
         """
         Get relevant diagnostics for this dataset, as a list of
@@ -87,28 +152,70 @@ class DataSet(object):
         """
         return []
 
-    def partition_shape(self, datashape, framesize, dtype, target_size, min_num_partitions=None):
+    def get_planner(self):
+        """
+        The ``PartitionPlanner`` that decides how this DataSet is split into partitions
+        """
+        return self._planner or get_default_planner()
+
+    def set_planner(self, planner):
+        """
+        Use ``planner`` for partitioning, for example one that knows the resources
+        of the cluster. Partitions that were already created are not changed.
+        """
+        self._planner = planner
+
+    def set_shared_memory(self, enabled):
+        """
+        Called with ``enabled=True`` if the workers of the executor can map the shared
+        memory of this process. DataSets that keep their data in memory can then share
+        it instead of sending a copy to each task; other DataSets ignore this.
+        """
+        pass
+
+    def get_tiling_capabilities(self):
+        """
+        The tiles this DataSet can produce efficiently, see ``TilingCapabilities``.
+        By default, the DataSet decides about the tiles alone.
+        """
+        return TilingCapabilities(fixed=True)
+
+    def partition_shape(self, datashape, framesize, dtype, target_size=None,
+                        min_num_partitions=None):
         """
         Calculate partition shape for the given ``target_size``
         Parameters
         ----------
-        datashape : (int, int, int, int)
+        datashape : Shape
             size of the whole dataset
         framesize : int
             number of pixels per frame
         dtype : numpy.dtype or str
             data type of the dataset
-        target_size : int
-            target size in bytes - how large should each partition be?
-        min_num_partitions : int
-            minimum number of partitions desired, defaults to twice the number of CPU cores
+        target_size : int or None
+            target size in bytes - how large should each partition be? By default,
+            this is decided by the planner
+        min_num_partitions : int or None
+            minimum number of partitions desired, defaults to twice the number of workers
         Returns
         -------
-        (int, int, int, int)
+        tuple of int
             the shape calculated from the given parameters
         """
         return get_partition_shape(datashape, framesize, dtype, target_size,
-                                   min_num_partitions)
+                                   min_num_partitions, planner=self.get_planner())
+
+    def get_frame_ranges(self, num_frames, frame_size, **kwargs):
+        """
+        Split ``num_frames`` frames of ``frame_size`` bytes into partitions, for formats
+        that address frames by their index
+
+        Returns
+        -------
+        list of (int, int)
+            (start, stop) of each partition
+        """
+        return self.get_planner().get_frame_ranges(num_frames, frame_size, **kwargs)
 
 
 class Reader(object):
@@ -141,7 +248,7 @@ class Partition(object):
         """
         return self.slice.shape
 
-    def get_tiles(self, crop_to=None):
+    def get_tiles(self, crop_to=None, tiling=None):
         """
         Return a generator over all DataTiles contained in this Partition.
 
@@ -156,6 +263,9 @@ class Partition(object):
 
         crop_to : Slice or None
             crop to this slice. datasets may impose additional limits to the shape of the slice
+        tiling : Tiling or None
+            the tiles negotiated between job and DataSet, see ``negotiate_tiling``;
+            by default, the DataSet decides
         """
         raise NotImplementedError()
 
@@ -163,6 +273,123 @@ class Partition(object):
         # Allow using any worker by default
         return None
 
+    def get_paths(self):
+        """
+        Paths of the files this partition reads from, if any
+        """
+        return []
+
+    def get_devices(self):
+        """
+        Storage devices (``st_dev``) this partition reads from, used for scheduling I/O
+        """
+        return get_devices(self.get_paths())
+
+    def get_placement_key(self):
+        """
+        A string that identifies this partition, used to place its tasks on the
+        same host in every job
+        """
+        return "%s:%r:%r" % (type(self).__name__, self.slice.origin, tuple(self.shape))
+
+    def _split_slices(self, num_parts, min_frames=1):
+        shape = self.shape
+        nav_shape = tuple(shape.nav)
+        # split along the first axis that is larger than one, so the parts stay rectangular:
+        for axis, size in enumerate(nav_shape):
+            if size > 1:
+                break
+        else:
+            return [self.slice]
+        frames_per_step = int(np.prod(nav_shape[axis + 1:], dtype=np.int64))
+        min_steps = max(1, -(-min_frames // frames_per_step))
+        num_parts = min(num_parts, size // min_steps)
+        if num_parts <= 1:
+            return [self.slice]
+        slices = []
+        start = 0
+        for i in range(num_parts):
+            stop = start + size // num_parts + (1 if i < size % num_parts else 0)
+            origin = list(self.slice.origin)
+            origin[axis] += start
+            new_shape = list(shape)
+            new_shape[axis] = stop - start
+            slices.append(Slice(
+                origin=tuple(origin),
+                shape=Shape(tuple(new_shape), sig_dims=shape.sig.dims),
+            ))
+            start = stop
+        return slices
+
+    def split(self, num_parts, min_frames=1):
+        """
+        Split this partition into up to ``num_parts`` parts, which can be processed
+        independently, for example to balance the load at the end of a job.
+
+        Parameters
+        ----------
+        num_parts : int
+            maximum number of parts
+        min_frames : int
+            minimum number of frames per part
+
+        Returns
+        -------
+        list of Partition
+            the parts, or ``[self]`` if the partition can't be split further
+        """
+        slices = self._split_slices(num_parts, min_frames)
+        if len(slices) == 1:
+            return [self]
+        return [SubPartition(partition=self, partition_slice=s) for s in slices]
+
+
+class SubPartition(Partition):
+    def __init__(self, partition, partition_slice):
+        """
+        A part of ``partition``, covering ``partition_slice``. Reads the tiles
+        of ``partition`` and crops them to ``partition_slice``.
+        """
+        self._partition = partition
+        super().__init__(meta=partition.meta, partition_slice=partition_slice)
+
+    def get_tiles(self, crop_to=None, tiling=None):
+        if crop_to is None:
+            crop_to = self.slice
+        else:
+            crop_to = crop_to.intersection_with(self.slice)
+            if crop_to.is_null():
+                return
+        for tile in self._partition.get_tiles(crop_to=crop_to, tiling=tiling):
+            intersection = tile.tile_slice.intersection_with(self.slice)
+            if intersection.is_null():
+                continue
+            if intersection.shape == tile.tile_slice.shape:
+                yield tile
+                continue
+            yield DataTile(
+                data=tile.data[intersection.shift(tile.tile_slice).get()],
+                tile_slice=intersection,
+            )
+
+    def split(self, num_parts, min_frames=1):
+        slices = self._split_slices(num_parts, min_frames)
+        if len(slices) == 1:
+            return [self]
+        return [SubPartition(partition=self._partition, partition_slice=s) for s in slices]
+
+    def get_locations(self):
+        return self._partition.get_locations()
+
+    def get_paths(self):
+        return self._partition.get_paths()
+
+    def get_placement_key(self):
+        return self._partition.get_placement_key()
+
+    def __repr__(self):
+        return "<SubPartition %r of %r>" % (self.slice, self._partition)
+
 
 class DataTile(object):
     __slots__ = ["data", "tile_slice"]
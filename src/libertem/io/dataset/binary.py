@@ -0,0 +1,139 @@
+import os
+import json
+
+import numpy as np
+
+from libertem.common import Slice, Shape
+from libertem.io.tiling import TilingCapabilities
+from .base import DataSet, Partition, DataTile, DataSetException, DataSetMeta
+
+INDEX_FILENAME = "index.json"
+
+
+class BinaryDataSet(DataSet):
+    def __init__(self, path, tileshape=None):
+        """
+        Read data that was ingested with ``LocalBinarySink``, or copied from HDFS: a
+        directory with an index.json and one raw binary file per rectangular partition.
+
+        Parameters
+        ----------
+        path : str
+            path to the directory or to its index.json
+        tileshape : tuple of int or None
+            by default, the tiles are negotiated with the job
+        """
+        if os.path.isdir(path):
+            path = os.path.join(path, INDEX_FILENAME)
+        self._index_path = path
+        self._dirname = os.path.dirname(path)
+        self._tileshape = tileshape and tuple(tileshape)
+        self._index = None
+        self._meta = None
+
+    def initialize(self):
+        self._index = self._read_index(self._index_path)
+        shape = Shape(self._index['shape'], sig_dims=self._index.get('sig_dims', 2))
+        self._meta = DataSetMeta(
+            shape=shape,
+            raw_shape=shape,
+            dtype=self._index['dtype'],
+        )
+        return self
+
+    @classmethod
+    def _read_index(cls, path):
+        with open(path, "r") as f:
+            index = json.load(f)
+        if index.get('mode') != 'rect':
+            raise DataSetException("unsupported mode: %s" % index.get('mode'))
+        return index
+
+    @classmethod
+    def detect_params(cls, path):
+        if os.path.isdir(path):
+            path = os.path.join(path, INDEX_FILENAME)
+        if os.path.basename(path) != INDEX_FILENAME:
+            return False
+        try:
+            cls._read_index(path)
+        except (IOError, OSError, ValueError, DataSetException):
+            return False
+        return {"path": path}
+
+    @property
+    def dtype(self):
+        return self._meta.dtype
+
+    @property
+    def shape(self):
+        return self._meta.shape
+
+    @property
+    def raw_shape(self):
+        return self._meta.raw_shape
+
+    def check_valid(self):
+        for partition in self._index['partitions']:
+            path = os.path.join(self._dirname, partition['filename'])
+            try:
+                size = os.stat(path).st_size
+            except (IOError, OSError) as e:
+                raise DataSetException("invalid dataset: %s" % e)
+            expected = int(np.prod(partition['shape'])) * self.dtype.itemsize
+            if size != expected:
+                raise DataSetException(
+                    "partition file %s has %d bytes, expected %d" % (path, size, expected)
+                )
+        return True
+
+    def get_tiling_capabilities(self):
+        # tiles are views into the memory maps, so they can have any shape:
+        return TilingCapabilities(fixed=self._tileshape is not None, sig_tiles=True)
+
+    def get_partitions(self):
+        sig_dims = self.shape.sig.dims
+        for partition in self._index['partitions']:
+            shape = Shape(partition['shape'], sig_dims=sig_dims)
+            yield BinaryPartition(
+                path=os.path.join(self._dirname, partition['filename']),
+                tileshape=self._tileshape,
+                meta=self._meta,
+                partition_slice=Slice(
+                    origin=tuple(partition['origin']) + tuple([0] * sig_dims),
+                    shape=shape,
+                ),
+            )
+
+    def __repr__(self):
+        return "<BinaryDataSet of %s shape=%s>" % (self.dtype, self.shape)
+
+
+class BinaryPartition(Partition):
+    def __init__(self, path, tileshape, *args, **kwargs):
+        self._path = path
+        self.tileshape = tileshape
+        super().__init__(*args, **kwargs)
+
+    def get_paths(self):
+        return [self._path]
+
+    def get_tiles(self, crop_to=None, tiling=None):
+        tileshape = self.tileshape
+        if tiling is not None and tileshape is None:
+            tileshape = tiling.get_tileshape(self.shape)
+        if tileshape is None:
+            tileshape = tuple(self.shape)
+        data = np.memmap(self._path, dtype=self.dtype, mode='r', shape=tuple(self.shape))
+        for tile_slice in self.slice.subslices(shape=tileshape):
+            if crop_to is not None:
+                tile_slice = tile_slice.intersection_with(crop_to)
+                if tile_slice.is_null():
+                    continue
+            yield DataTile(
+                data=data[tile_slice.shift(self.slice).get()],
+                tile_slice=tile_slice,
+            )
+
+    def __repr__(self):
+        return "<BinaryPartition %s [%r]>" % (self._path, self.slice)
@@ -3,6 +3,7 @@ import contextlib
 import numpy as np
 
 from libertem.common import Slice, Shape
+from libertem.io.tiling import TilingCapabilities
 from .base import DataSet, Partition, DataTile, DataSetException, DataSetMeta
 
 MAGIC_EXPECT = 258
@@ -58,8 +59,8 @@ class BloReader(object):
 
 
 class BloDataSet(DataSet):
-    def __init__(self, path, tileshape, endianess='<'):
-        self._tileshape = tileshape
+    def __init__(self, path, tileshape=None, endianess='<'):
+        self._tileshape = tileshape and tuple(tileshape)
         self._path = path
         self._header = None
         self._endianess = endianess
@@ -131,17 +132,21 @@ class BloDataSet(DataSet):
         except (IOError, OSError) as e:
             raise DataSetException("invalid dataset: %s" % e) from e
 
+    def get_tiling_capabilities(self):
+        return TilingCapabilities(fixed=self._tileshape is not None, sig_tiles=True)
+
     def get_partitions(self):
         ds_slice = Slice(origin=(0, 0, 0, 0), shape=self.shape)
         partition_shape = self.partition_shape(
             datashape=self.shape,
             framesize=self.shape[2] * self.shape[3],
             dtype=self.dtype,
-            target_size=256*1024*1024,
         )
+        # used if the tiles are not negotiated with the job:
+        tileshape = self._tileshape or (1, min(8, self.shape[1])) + tuple(self.shape.sig)
         for pslice in ds_slice.subslices(partition_shape):
             yield BloPartition(
-                tileshape=self._tileshape,
+                tileshape=tileshape,
                 meta=self._meta,
                 reader=self.get_reader(),
                 partition_slice=pslice,
@@ -154,12 +159,18 @@ class BloPartition(Partition):
         self.reader = reader
         super().__init__(*args, **kwargs)
 
-    def get_tiles(self, crop_to=None):
+    def get_paths(self):
+        return [self.reader._path]
+
+    def get_tiles(self, crop_to=None, tiling=None):
         if crop_to is not None:
             if crop_to.shape.sig != self.meta.shape.sig:
                 raise DataSetException("BloDataSet only supports whole-frame crops for now")
+        tileshape = self.tileshape
+        if tiling is not None:
+            tileshape = tiling.get_tileshape(self.shape)
         with self.reader.get_data() as data:
-            subslices = list(self.slice.subslices(shape=self.tileshape))
+            subslices = list(self.slice.subslices(shape=tileshape))
             for tile_slice in subslices:
                 if crop_to is not None:
                     intersection = tile_slice.intersection_with(crop_to)
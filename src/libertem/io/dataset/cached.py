@@ -0,0 +1,439 @@
+import os
+import uuid
+import hashlib
+import tempfile
+
+import psutil
+import numpy as np
+
+from libertem.common import Shape
+from libertem.io.utils import get_cache_dir
+from libertem.io.tiling import TilingCapabilities
+from libertem.io.shm import (
+    SharedArray, create_persistent, unlink_persistent, release, as_array,
+)
+from .base import DataSet, Partition, DataTile
+from .memory import _default_tileshape
+
+
+class LocalFSCache(object):
+    def __init__(self, cache_dir=None, max_size=64*1024*1024*1024):
+        """
+        Cache decoded partitions as raw files in a local scratch directory.
+        The size of the directory is bounded by ``max_size``; the least recently
+        used files are removed first. The cache can be shared by many datasets and
+        by all workers on the same node.
+
+        Parameters
+        ----------
+        cache_dir : str or None
+            scratch directory, by default ``$LIBERTEM_CACHE_DIR`` or a directory
+            in the system temporary directory
+        max_size : int
+            size budget of the whole cache directory in bytes
+        """
+        self.cache_dir = cache_dir or get_cache_dir()
+        self.max_size = max_size
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + ".raw")
+
+    def get(self, key, shape, dtype):
+        """
+        get the cached data for ``key`` as a read-only memory map, or None on a miss
+        """
+        path = self._path(key)
+        try:
+            data = np.memmap(path, dtype=dtype, mode='r', shape=tuple(shape))
+            # file times are our LRU order, shared by all processes:
+            os.utime(path)
+        except (FileNotFoundError, ValueError):
+            # not cached, or removed while opening it
+            return None
+        return data
+
+    def create(self, key, shape, dtype):
+        """
+        create a new entry for ``key``, which is filled via ``entry.data`` and becomes
+        visible after ``entry.commit()``. Returns None if the data can't be cached.
+        """
+        nbytes = int(np.prod(shape, dtype=np.int64)) * np.dtype(dtype).itemsize
+        if nbytes > self.max_size or nbytes == 0:
+            return None
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return _LocalFSCacheEntry(cache=self, path=path, shape=shape, dtype=dtype)
+
+    def _entries(self):
+        for dirpath, dirnames, filenames in os.walk(self.cache_dir):
+            for fn in filenames:
+                if not fn.endswith(".raw"):
+                    continue
+                path = os.path.join(dirpath, fn)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield st.st_mtime_ns, st.st_size, path
+
+    def evict(self):
+        """
+        remove the least recently used files until the cache fits into ``max_size``
+        """
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_size:
+                break
+            try:
+                # readers that still map this file keep their data
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def __repr__(self):
+        return "<LocalFSCache %s max_size=%d>" % (self.cache_dir, self.max_size)
+
+
+class _LocalFSCacheEntry(object):
+    def __init__(self, cache, path, shape, dtype):
+        self._cache = cache
+        self._path = path
+        # concurrent writers of the same entry each use their own file:
+        self._tmp_path = "%s.tmp-%s" % (path, uuid.uuid4().hex)
+        self.data = np.memmap(self._tmp_path, dtype=dtype, mode='w+', shape=tuple(shape))
+
+    def commit(self):
+        self.data.flush()
+        self.data = None
+        os.replace(self._tmp_path, self._path)
+        self._cache.evict()
+
+    def abort(self):
+        self.data = None
+        if os.path.exists(self._tmp_path):
+            os.unlink(self._tmp_path)
+
+
+def _default_shm_index_dir():
+    return os.environ.get(
+        "LIBERTEM_SHM_CACHE_DIR",
+        os.path.join(tempfile.gettempdir(), "libertem-shm-cache"),
+    )
+
+
+class SharedMemoryCache(object):
+    def __init__(self, max_size=None, index_dir=None):
+        """
+        Cache decoded partitions in POSIX shared memory, so all workers on a node can
+        map them without copying, also in later jobs. The blocks are not owned by any
+        process: they stay resident until they are evicted, or until ``clear`` is called.
+
+        For each block there is a small marker file in ``index_dir``, which
+        records its size and, via its modification time, when it was last used. This
+        is what the memory budget and the LRU eviction are based on, and what
+        makes the cache consistent between all processes on the node.
+
+        Parameters
+        ----------
+        max_size : int or None
+            memory budget in bytes, by default a quarter of the physical memory
+        index_dir : str or None
+            directory for the marker files, by default ``$LIBERTEM_SHM_CACHE_DIR`` or
+            a directory in the system temporary directory
+        """
+        if max_size is None:
+            max_size = psutil.virtual_memory().total // 4
+        self.max_size = max_size
+        self.index_dir = index_dir or _default_shm_index_dir()
+
+    def _name(self, key):
+        # short names, as some platforms limit their length:
+        return "lt_" + hashlib.sha1(key.encode("utf8")).hexdigest()[:24]
+
+    def _marker(self, name):
+        return os.path.join(self.index_dir, name)
+
+    def get(self, key, shape, dtype):
+        """
+        map the cached data for ``key``, or return None on a miss
+        """
+        name = self._name(key)
+        marker = self._marker(name)
+        if not os.path.exists(marker):
+            return None
+        try:
+            data = SharedArray(name=name, shape=shape, dtype=dtype).data
+            os.utime(marker)
+        except (FileNotFoundError, ValueError, TypeError):
+            return None
+        return data
+
+    def create(self, key, shape, dtype):
+        """
+        create a new entry for ``key``, which is filled via ``entry.data`` and becomes
+        visible after ``entry.commit()``. Returns None if the data can't be cached,
+        for example because another process is filling this entry right now.
+        """
+        nbytes = int(np.prod(shape, dtype=np.int64)) * np.dtype(dtype).itemsize
+        if nbytes > self.max_size or nbytes == 0:
+            return None
+        name = self._name(key)
+        os.makedirs(self.index_dir, exist_ok=True)
+        if not self._lock(name):
+            return None
+        if os.path.exists(self._marker(name)):
+            # another process was faster
+            self._unlock(name)
+            return None
+        # a block without marker is left over from a process that died while filling it:
+        unlink_persistent(name)
+        try:
+            shm = create_persistent(name=name, size=nbytes)
+        except FileExistsError:
+            self._unlock(name)
+            return None
+        return _SharedMemoryCacheEntry(cache=self, name=name, shm=shm, shape=shape, dtype=dtype)
+
+    def _lock(self, name):
+        """
+        mark ``name`` as being filled by this process; fails if another
+        live process is filling it
+        """
+        path = self._marker(name) + ".lock"
+        for attempt in range(2):
+            try:
+                fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                try:
+                    with open(path, "r") as f:
+                        pid = int(f.read() or 0)
+                except (FileNotFoundError, ValueError):
+                    pid = 0
+                if pid and psutil.pid_exists(pid):
+                    return False
+                # stale lock, or the owner is just writing its pid
+                if attempt == 0 and pid:
+                    try:
+                        os.unlink(path)
+                    except FileNotFoundError:
+                        pass
+                    continue
+                return False
+            with os.fdopen(fd, "w") as f:
+                f.write(str(os.getpid()))
+            return True
+        return False
+
+    def _unlock(self, name):
+        try:
+            os.unlink(self._marker(name) + ".lock")
+        except FileNotFoundError:
+            pass
+
+    def _entries(self):
+        if not os.path.exists(self.index_dir):
+            return
+        for name in os.listdir(self.index_dir):
+            if name.endswith(".lock"):
+                continue
+            path = self._marker(name)
+            try:
+                st = os.stat(path)
+                with open(path, "r") as f:
+                    size = int(f.read())
+            except (FileNotFoundError, ValueError):
+                continue
+            yield st.st_mtime_ns, size, name
+
+    def _remove(self, name):
+        try:
+            os.unlink(self._marker(name))
+        except FileNotFoundError:
+            pass
+        # workers that still map the block keep their data
+        unlink_persistent(name)
+
+    def evict(self):
+        """
+        remove the least recently used blocks until the cache fits into ``max_size``
+        """
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in entries:
+            if total <= self.max_size:
+                break
+            self._remove(name)
+            total -= size
+
+    def clear(self):
+        """
+        remove all blocks of this cache
+        """
+        for _, _, name in list(self._entries()):
+            self._remove(name)
+
+    def __repr__(self):
+        return "<SharedMemoryCache max_size=%d>" % self.max_size
+
+
+class _SharedMemoryCacheEntry(object):
+    def __init__(self, cache, name, shm, shape, dtype):
+        self._cache = cache
+        self._name = name
+        self._shm = shm
+        self.data = as_array(shm, tuple(shape), dtype)
+
+    def commit(self):
+        self.data = None
+        release(self._shm, unlink=False)
+        with open(self._cache._marker(self._name), "w") as f:
+            f.write(str(self._shm.size))
+        self._cache._unlock(self._name)
+        self._cache.evict()
+
+    def abort(self):
+        if self.data is None:
+            return
+        self.data = None
+        release(self._shm, unlink=False)
+        unlink_persistent(self._name)
+        self._cache._unlock(self._name)
+
+
+class CachedDataSet(DataSet):
+    def __init__(self, source_ds, cache=None):
+        """
+        Wrap the initialized DataSet ``source_ds``, and cache its decoded partitions.
+
+        On the first pass over a partition, the tiles of ``source_ds`` are passed
+        through and stored in ``cache``. Later passes read from the cache instead,
+        which is a lot faster for formats that are expensive to decode.
+
+        Parameters
+        ----------
+        source_ds : DataSet
+            the DataSet to cache, needs to be initialized already
+        cache : LocalFSCache or SharedMemoryCache or None
+            where to store the decoded data, by default a ``LocalFSCache``
+            with default settings
+        """
+        self._source_ds = source_ds
+        self._cache = cache or LocalFSCache()
+        self._cache_key = source_ds.get_cache_key()
+
+    def initialize(self):
+        return self
+
+    @property
+    def dtype(self):
+        return self._source_ds.dtype
+
+    @property
+    def shape(self):
+        return self._source_ds.shape
+
+    @property
+    def raw_shape(self):
+        return self._source_ds.raw_shape
+
+    def check_valid(self):
+        return self._source_ds.check_valid()
+
+    @classmethod
+    def detect_params(cls, path):
+        return False
+
+    def get_diagnostics(self):
+        return self._source_ds.get_diagnostics() + [
+            {"name": "cache", "value": repr(self._cache)},
+        ]
+
+    def get_planner(self):
+        return self._source_ds.get_planner()
+
+    def get_tiling_capabilities(self):
+        # cached partitions are arrays; the tiles of the first pass are those of the source:
+        return TilingCapabilities(sig_tiles=True)
+
+    def set_planner(self, planner):
+        # the partitions are those of the source DataSet:
+        self._source_ds.set_planner(planner)
+
+    def get_partitions(self):
+        for partition in self._source_ds.get_partitions():
+            yield CachedPartition(
+                source_partition=partition,
+                cache=self._cache,
+                cache_key=self._cache_key,
+                meta=partition.meta,
+                partition_slice=partition.slice,
+            )
+
+    def __repr__(self):
+        return "<CachedDataSet for %r>" % self._source_ds
+
+
+class CachedPartition(Partition):
+    def __init__(self, source_partition, cache, cache_key, *args, **kwargs):
+        self._source_partition = source_partition
+        self._cache = cache
+        self._cache_key = cache_key
+        super().__init__(*args, **kwargs)
+
+    def get_paths(self):
+        return self._source_partition.get_paths()
+
+    def _get_key(self):
+        return "%s/%s-%s" % (
+            self._cache_key,
+            "_".join(str(o) for o in self.slice.origin),
+            "_".join(str(s) for s in self.shape),
+        )
+
+    def _get_tiles_cached(self, data, crop_to=None, tiling=None):
+        if tiling is not None:
+            tileshape = tiling.get_tileshape(self.shape)
+        else:
+            tileshape = Shape(_default_tileshape(self.shape), sig_dims=self.shape.sig.dims)
+        for tile_slice in self.slice.subslices(shape=tileshape):
+            if crop_to is not None:
+                if tile_slice.intersection_with(crop_to).is_null():
+                    continue
+            yield DataTile(
+                data=data[tile_slice.shift(self.slice).get()],
+                tile_slice=tile_slice
+            )
+
+    def _get_tiles_fill(self):
+        """
+        pass through the tiles of the source partition, while writing them to
+        a new cache entry, which is committed once it is complete
+        """
+        entry = self._cache.create(self._get_key(), shape=self.shape, dtype=self.dtype)
+        if entry is None:
+            yield from self._source_partition.get_tiles()
+            return
+        try:
+            for tile in self._source_partition.get_tiles():
+                entry.data[tile.tile_slice.shift(self.slice).get()] = tile.data
+                yield tile
+            entry.commit()
+        finally:
+            # no-op if committed; otherwise, the consumer stopped early or there was an error
+            entry.abort()
+
+    def get_tiles(self, crop_to=None, tiling=None):
+        data = self._cache.get(self._get_key(), shape=self.shape, dtype=self.dtype)
+        if data is not None:
+            return self._get_tiles_cached(data, crop_to, tiling)
+        if crop_to is not None:
+            return self._source_partition.get_tiles(crop_to=crop_to)
+        return self._get_tiles_fill()
+
+    def get_locations(self):
+        return self._source_partition.get_locations()
+
+    def __repr__(self):
+        return "<CachedPartition for %r>" % self._source_partition
@@ -0,0 +1,291 @@
+import os
+import json
+import collections
+
+import numpy as np
+
+from libertem.common import Slice, Shape
+from libertem.io.codecs import (
+    compress, decompress, shuffle, unshuffle, get_codec_pool, get_codec_threads,
+    available_codecs,
+)
+from .base import DataSet, Partition, DataTile, DataSetException, DataSetMeta
+
+INDEX_FILENAME = "index.json"
+CHUNK_FILENAME_FMT = "chunk-%(idx)08d.bin"
+
+
+def make_index(shape, dtype, sig_dims, codec, shuffle, chunk_frames):
+    """
+    Create the index for a chunked dataset: the frames are split into chunks of
+    ``chunk_frames`` frames each, which are compressed individually.
+
+    Parameters
+    ----------
+    shape : tuple of int
+        shape of the whole dataset
+    dtype : numpy.dtype or str
+        data type of the stored data
+    sig_dims : int
+        number of signal dimensions
+    codec : str
+        one of ``libertem.io.codecs.available_codecs()``
+    shuffle : bool
+        byte shuffle the data before compressing
+    chunk_frames : int
+        number of frames per chunk
+    """
+    num_frames = Shape(shape, sig_dims=sig_dims).nav.size
+    return {
+        "version": 1,
+        "mode": "chunked",
+        "dtype": str(np.dtype(dtype)),
+        "shape": tuple(shape),
+        "sig_dims": sig_dims,
+        "codec": codec,
+        "shuffle": shuffle,
+        "chunks": [
+            {
+                "start": start,
+                "num_frames": min(chunk_frames, num_frames - start),
+                "filename": CHUNK_FILENAME_FMT % {"idx": i},
+            }
+            for i, start in enumerate(range(0, num_frames, chunk_frames))
+        ],
+    }
+
+
+def encode_chunk(data, codec, shuffle_bytes):
+    if shuffle_bytes:
+        data = shuffle(data)
+    else:
+        data = np.ascontiguousarray(data)
+    return compress(codec, data)
+
+
+def decode_chunk(raw, codec, shuffle_bytes, dtype, shape):
+    raw = decompress(codec, raw)
+    if shuffle_bytes:
+        raw = unshuffle(raw, dtype.itemsize)
+    return np.frombuffer(raw, dtype=dtype).reshape(shape)
+
+
+class ChunkedReader(object):
+    def __init__(self, dirname, codec, shuffle, dtype, sig_shape):
+        self._dirname = dirname
+        self._codec = codec
+        self._shuffle = shuffle
+        self._dtype = np.dtype(dtype)
+        self._sig_shape = tuple(sig_shape)
+
+    def get_path(self, chunk):
+        return os.path.join(self._dirname, chunk['filename'])
+
+    def read_chunk(self, chunk):
+        """
+        read and decode ``chunk``; this is run in a thread pool, and both the file I/O
+        and the decompression release the GIL
+        """
+        with open(self.get_path(chunk), "rb") as f:
+            raw = f.read()
+        return decode_chunk(
+            raw, codec=self._codec, shuffle_bytes=self._shuffle, dtype=self._dtype,
+            shape=(chunk['num_frames'],) + self._sig_shape,
+        )
+
+
+class ChunkedDataSet(DataSet):
+    def __init__(self, path, target_size=None, min_num_partitions=None):
+        """
+        Read data stored in the LiberTEM chunked format: a directory with an index.json
+        and one compressed file per chunk of frames.
+
+        Parameters
+        ----------
+        path : str
+            path to the directory or to its index.json
+        target_size : int or None
+            target partition size in bytes (uncompressed); partitions always consist
+            of whole chunks. By default, decided by the partition planner
+        min_num_partitions : int or None
+            minimum number of partitions, by default decided by the partition planner
+        """
+        if os.path.isdir(path):
+            path = os.path.join(path, INDEX_FILENAME)
+        self._index_path = path
+        self._dirname = os.path.dirname(path)
+        self._target_size = target_size
+        self._min_num_partitions = min_num_partitions
+        self._index = None
+        self._meta = None
+
+    def initialize(self):
+        self._index = self._read_index(self._index_path)
+        sig_dims = self._index['sig_dims']
+        shape = Shape(self._index['shape'], sig_dims=sig_dims)
+        self._meta = DataSetMeta(
+            shape=shape,
+            raw_shape=shape.flatten_nav(),
+            dtype=self._index['dtype'],
+        )
+        return self
+
+    @classmethod
+    def _read_index(cls, path):
+        with open(path, "r") as f:
+            index = json.load(f)
+        if index.get('mode') != 'chunked':
+            raise DataSetException("unsupported mode: %s" % index.get('mode'))
+        return index
+
+    @classmethod
+    def detect_params(cls, path):
+        if os.path.isdir(path):
+            path = os.path.join(path, INDEX_FILENAME)
+        if os.path.basename(path) != INDEX_FILENAME:
+            return False
+        try:
+            cls._read_index(path)
+        except (IOError, OSError, ValueError, DataSetException):
+            return False
+        return {"path": path}
+
+    @property
+    def dtype(self):
+        return self._meta.dtype
+
+    @property
+    def shape(self):
+        return self._meta.shape
+
+    @property
+    def raw_shape(self):
+        return self._meta.raw_shape
+
+    def get_reader(self):
+        return ChunkedReader(
+            dirname=self._dirname,
+            codec=self._index['codec'],
+            shuffle=self._index['shuffle'],
+            dtype=self.dtype,
+            sig_shape=self.shape.sig,
+        )
+
+    def check_valid(self):
+        codec = self._index['codec']
+        if codec not in available_codecs():
+            raise DataSetException("codec %s not available, have: %s" % (
+                codec, ", ".join(available_codecs())
+            ))
+        for chunk in self._index['chunks']:
+            path = os.path.join(self._dirname, chunk['filename'])
+            if not os.path.exists(path):
+                raise DataSetException("missing chunk file: %s" % path)
+        return True
+
+    def get_diagnostics(self):
+        compressed_size = sum(
+            os.stat(os.path.join(self._dirname, chunk['filename'])).st_size
+            for chunk in self._index['chunks']
+        )
+        raw_size = self.shape.size * self.dtype.itemsize
+        return [
+            {"name": "codec", "value": self._index['codec']},
+            {"name": "shuffle", "value": str(self._index['shuffle'])},
+            {"name": "number of chunks", "value": str(len(self._index['chunks']))},
+            {"name": "compression ratio",
+             "value": "%.2f" % (raw_size / max(1, compressed_size))},
+        ]
+
+    def _group_chunks(self):
+        """
+        group consecutive chunks into partitions of the size chosen by the planner
+        """
+        chunks = self._index['chunks']
+        num_frames = self.shape.nav.size
+        frames = self.get_planner().get_frames_per_partition(
+            num_frames, self.shape.sig.size * self.dtype.itemsize,
+            target_size=self._target_size, min_num_partitions=self._min_num_partitions,
+        )
+        num_partitions = max(1, min(len(chunks), -(-num_frames // frames)))
+        chunks_per_partition = len(chunks) // num_partitions
+        extra = len(chunks) % num_partitions
+        start = 0
+        for i in range(num_partitions):
+            stop = start + chunks_per_partition + (1 if i < extra else 0)
+            yield chunks[start:stop]
+            start = stop
+
+    def get_partitions(self):
+        sig_shape = tuple(self.shape.sig)
+        sig_dims = self.shape.sig.dims
+        for chunks in self._group_chunks():
+            start = chunks[0]['start']
+            num_frames = sum(chunk['num_frames'] for chunk in chunks)
+            part_slice = Slice(
+                origin=(start,) + tuple([0] * sig_dims),
+                shape=Shape((num_frames,) + sig_shape, sig_dims=sig_dims),
+            )
+            yield ChunkedPartition(
+                chunks=chunks,
+                reader=self.get_reader(),
+                meta=self._meta,
+                partition_slice=part_slice,
+            )
+
+    def __repr__(self):
+        return "<ChunkedDataSet of %s shape=%s>" % (self.dtype, self.shape)
+
+
+class ChunkedPartition(Partition):
+    def __init__(self, chunks, reader, *args, **kwargs):
+        self._chunks = chunks
+        self._reader = reader
+        super().__init__(*args, **kwargs)
+
+    def get_paths(self):
+        return [self._reader.get_path(chunk) for chunk in self._chunks]
+
+    def _chunk_slice(self, chunk):
+        sig_dims = self.shape.sig.dims
+        return Slice(
+            origin=(chunk['start'],) + tuple([0] * sig_dims),
+            shape=Shape((chunk['num_frames'],) + tuple(self.shape.sig), sig_dims=sig_dims),
+        )
+
+    def get_tiles(self, crop_to=None, tiling=None):
+        """
+        Each chunk becomes one tile, so ``tiling`` is not used. Chunks are decoded in
+        a thread pool, a few chunks ahead of the one we are currently yielding.
+        """
+        chunks = []
+        for chunk in self._chunks:
+            chunk_slice = self._chunk_slice(chunk)
+            if crop_to is not None:
+                if chunk_slice.intersection_with(crop_to).is_null():
+                    continue
+            chunks.append((chunk, chunk_slice))
+        pool = get_codec_pool()
+        prefetch = 2 * get_codec_threads()
+        pending = collections.deque()
+        chunk_iter = iter(chunks)
+        while True:
+            for chunk, chunk_slice in chunk_iter:
+                pending.append((pool.submit(self._reader.read_chunk, chunk), chunk_slice))
+                if len(pending) >= prefetch:
+                    break
+            if not pending:
+                break
+            future, tile_slice = pending.popleft()
+            data = future.result()
+            if crop_to is not None and crop_to.shape.sig != self.shape.sig:
+                data = data[(Ellipsis,) + crop_to.get(sig_only=True)]
+                nav_dims = tile_slice.shape.nav.dims
+                tile_slice = Slice(
+                    origin=tile_slice.origin[:nav_dims] + crop_to.origin[nav_dims:],
+                    shape=Shape(
+                        tuple(tile_slice.shape.nav) + tuple(crop_to.shape.sig),
+                        sig_dims=tile_slice.shape.sig.dims,
+                    )
+                )
+            yield DataTile(data=data, tile_slice=tile_slice)
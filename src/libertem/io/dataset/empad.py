@@ -0,0 +1,153 @@
+import os
+from xml.etree import ElementTree
+
+import numpy as np
+
+from libertem.common import Slice, Shape
+from libertem.io.tiling import TilingCapabilities
+from .base import DataSet, DataSetException, DataSetMeta
+from .raw import RawFileReader, RawFilePartition
+
+# each frame has two additional rows with metadata, which we crop off:
+DETECTOR_SIZE_RAW = (130, 128)
+DETECTOR_SIZE = (128, 128)
+DTYPE = np.dtype("<f4")
+
+
+def get_params_from_xml(path):
+    """
+    Read the path of the raw file and the scan size from the EMPAD .xml file
+
+    Returns
+    -------
+    (str, (int, int))
+        full path of the raw file and the scan size as (y, x)
+    """
+    try:
+        root = ElementTree.parse(path).getroot()
+    except ElementTree.ParseError as e:
+        raise DataSetException("could not parse xml file: %s" % e) from e
+    raw_file = root.find("raw_file")
+    scan_y = root.find(".//scan_resolution_y")
+    scan_x = root.find(".//scan_resolution_x")
+    if raw_file is None or scan_y is None or scan_x is None:
+        raise DataSetException("%s does not look like an EMPAD xml file" % path)
+    raw_path = os.path.join(os.path.dirname(path), raw_file.attrib['filename'])
+    return raw_path, (int(scan_y.text), int(scan_x.text))
+
+
+class EMPADDataSet(DataSet):
+    def __init__(self, path, scan_size=None, tileshape=None):
+        """
+        Read EMPAD data in place, without ingesting it first.
+
+        Parameters
+        ----------
+        path : str
+            path to the .xml file written by the acquisition software, or directly
+            to the .raw file (``scan_size`` is required in that case)
+        scan_size : (int, int) or None
+            override the scan size given in the .xml file
+        tileshape : tuple of int or None
+            the data is memory mapped, so tiles are views into the file; by default,
+            the tiles are negotiated with the job
+        """
+        self._path = path
+        self._scan_size = scan_size and tuple(scan_size)
+        self._tileshape = tileshape and tuple(tileshape)
+        self._fixed_tileshape = tileshape is not None
+        self._raw_path = None
+        self._meta = None
+
+    def initialize(self):
+        if os.path.splitext(self._path)[1].lower() == ".xml":
+            raw_path, scan_size = get_params_from_xml(self._path)
+            if self._scan_size is None:
+                self._scan_size = scan_size
+        else:
+            raw_path = self._path
+            if self._scan_size is None:
+                raise DataSetException("scan_size is needed to open EMPAD raw files directly")
+        self._raw_path = raw_path
+        if self._tileshape is None:
+            self._tileshape = (1, min(16, self._scan_size[1])) + DETECTOR_SIZE
+        shape = Shape(self._scan_size + DETECTOR_SIZE, sig_dims=2)
+        self._meta = DataSetMeta(
+            shape=shape,
+            raw_shape=shape,
+            dtype=DTYPE,
+        )
+        return self
+
+    @classmethod
+    def detect_params(cls, path):
+        if not path.lower().endswith(".xml"):
+            return False
+        try:
+            get_params_from_xml(path)
+        except (IOError, OSError, KeyError, ValueError, DataSetException):
+            return False
+        return {"path": path}
+
+    @property
+    def dtype(self):
+        return self._meta.dtype
+
+    @property
+    def shape(self):
+        return self._meta.shape
+
+    @property
+    def raw_shape(self):
+        return self._meta.raw_shape
+
+    def get_reader(self):
+        return RawFileReader(
+            meta=self._meta,
+            path=self._raw_path,
+            scan_size=self._scan_size,
+            detector_size_raw=DETECTOR_SIZE_RAW,
+        )
+
+    def check_valid(self):
+        try:
+            filesize = os.stat(self._raw_path).st_size
+            expected = (
+                self.shape.nav.size * DETECTOR_SIZE_RAW[0] * DETECTOR_SIZE_RAW[1]
+                * self.dtype.itemsize
+            )
+            if filesize != expected:
+                raise DataSetException(
+                    "file size of %s does not match scan size %r (%d != %d)" % (
+                        self._raw_path, self._scan_size, filesize, expected,
+                    )
+                )
+            return True
+        except (IOError, OSError, ValueError) as e:
+            raise DataSetException("invalid dataset: %s" % e)
+
+    def get_diagnostics(self):
+        return [
+            {"name": "raw file", "value": self._raw_path},
+        ]
+
+    def get_tiling_capabilities(self):
+        return TilingCapabilities(fixed=self._fixed_tileshape, sig_tiles=True)
+
+    def get_partitions(self):
+        ds_slice = Slice(origin=(0, 0, 0, 0), shape=self.shape)
+        partition_shape = self.partition_shape(
+            datashape=self.shape,
+            framesize=self.shape.sig.size,
+            dtype=self.dtype,
+        )
+        for pslice in ds_slice.subslices(partition_shape):
+            yield RawFilePartition(
+                tileshape=self._tileshape,
+                meta=self._meta,
+                reader=self.get_reader(),
+                partition_slice=pslice,
+            )
+
+    def __repr__(self):
+        return "<EMPADDataSet of %s shape=%s>" % (self.dtype, self.shape)
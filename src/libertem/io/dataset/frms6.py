@@ -5,13 +5,13 @@ import csv
 import glob
 import math
 import logging
-import itertools
 import configparser
 
 import scipy.io as sio
 import numpy as np
 
 from libertem.common import Slice, Shape
+from libertem.io.tiling import TilingCapabilities
 from .base import DataSet, Partition, DataTile, DataSetException, DataSetMeta
 
 log = logging.getLogger(__name__)
@@ -157,6 +157,15 @@ class FRMS6FileSet(object):
         self._dark_frame = dark_frame
         self._gain_map = gain_map
 
+    def get_paths(self, start, stop):
+        """
+        paths of the files that contain images [`start`, `stop`)
+        """
+        return [
+            f._path for f in self._files
+            if f.start_idx < stop and f.start_idx + f.num_frames > start
+        ]
+
     def read_images(self, start, stop, out, crop_to=None):
         """
         Read [`start`, `stop`) images from the dataset into `out`
@@ -424,24 +433,15 @@ class FRMS6DataSet(DataSet):
     def raw_dtype(self):
         return self._meta.raw_dtype
 
-    def _get_num_partitions(self):
-        """
-        returns the number of partitions the dataset should be split into
-        """
-        # let's try to aim for 512MB per partition
-        res = max(1, self._total_filesize // (512*1024*1024))
-        return res
+    def get_tiling_capabilities(self):
+        # frames are read whole, and cropped afterwards:
+        return TilingCapabilities()
 
     def get_partitions(self):
         num_frames = self.shape.nav.size
-        f_per_part = num_frames // self._get_num_partitions()
-
-        c0 = itertools.count(start=0, step=f_per_part)
-        c1 = itertools.count(start=f_per_part, step=f_per_part)
-        for (start, stop) in zip(c0, c1):
-            if start >= num_frames:
-                break
-            stop = min(stop, num_frames)
+        # plan with the size of the frames on disk:
+        frame_size = self._total_filesize // num_frames
+        for (start, stop) in self.get_frame_ranges(num_frames, frame_size):
             part_slice = Slice(
                 origin=(
                     start, 0, 0,
@@ -465,15 +465,23 @@ class FRMS6Partition(Partition):
         self._num_frames = num_frames
         super().__init__(*args, **kwargs)
 
+    def get_paths(self):
+        return self._fileset.get_paths(
+            self._start_frame, self._start_frame + self._num_frames
+        )
+
     def _get_stackheight(self, target_size=1 * 1024 * 1024):
-        # FIXME: centralize this decision and make it tunable
+        # used if the tiles are not negotiated with the job
         framesize = self.meta.shape.sig.size * self.meta.dtype.itemsize
         return max(1, math.floor(target_size / framesize))
 
-    def get_tiles(self, crop_to=None):
+    def get_tiles(self, crop_to=None, tiling=None):
         start_at_frame = self._start_frame
         num_frames = self._num_frames
-        stackheight = self._get_stackheight()
+        if tiling is not None:
+            stackheight = tiling.depth
+        else:
+            stackheight = self._get_stackheight()
         dtype = self.meta.dtype
         sig_shape = self.meta.shape.sig
         sig_origin = tuple([0] * len(sig_shape))
@@ -1,27 +1,305 @@
+import os
+import math
+import zlib
+import itertools
+import threading
 import contextlib
+import collections
 
 import numpy as np
 import h5py
 
 from libertem.common import Slice, Shape
+from libertem.io.codecs import unshuffle, get_codec_pool
+from libertem.io.tiling import TilingCapabilities
 from .base import DataSet, Partition, DataTile, DataSetException, DataSetMeta
 
 
-def _get_datasets(path):
+class _H5FileCacheEntry(object):
+    __slots__ = ["handle", "mtime", "users", "evicted"]
+
+    def __init__(self, handle, mtime):
+        self.handle = handle
+        self.mtime = mtime
+        self.users = 0
+        self.evicted = False
+
+
+class H5FileCache(object):
+    def __init__(self, max_size=16):
+        """
+        A bounded LRU cache of open, read-only HDF5 files.
+
+        Opening a HDF5 file and parsing its metadata can take a significant amount
+        of time, especially for NeXus files with many groups, so we keep files open
+        between calls. Entries are invalidated if the mtime of the file changes.
+        Evicted files that are still in use are closed once they are released.
+
+        Parameters
+        ----------
+        max_size : int
+            maximum number of files to keep open
+        """
+        self._max_size = max_size
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict()
+
+    @contextlib.contextmanager
+    def open(self, path):
+        """
+        Get the open ``h5py.File`` for ``path``
+        """
+        entry = self._acquire(path)
+        try:
+            yield entry.handle
+        finally:
+            self._release(entry)
+
+    def _acquire(self, path):
+        mtime = os.stat(path).st_mtime_ns
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry.mtime != mtime:
+                self._evict(path)
+                entry = None
+            if entry is None:
+                entry = _H5FileCacheEntry(handle=h5py.File(path, 'r'), mtime=mtime)
+                self._entries[path] = entry
+                while len(self._entries) > self._max_size:
+                    self._evict(next(iter(self._entries)))
+            else:
+                self._entries.move_to_end(path)
+            entry.users += 1
+            return entry
+
+    def _release(self, entry):
+        with self._lock:
+            entry.users -= 1
+            if entry.evicted and entry.users == 0:
+                entry.handle.close()
+
+    def _evict(self, path):
+        entry = self._entries.pop(path)
+        entry.evicted = True
+        if entry.users == 0:
+            entry.handle.close()
+
+    def clear(self):
+        """
+        Close all files that are not in use, and drop all entries
+        """
+        with self._lock:
+            for path in list(self._entries):
+                self._evict(path)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# per-process, so each worker has its own set of open files:
+_file_cache = H5FileCache()
+
+
+def _get_dataset_list(f):
     datasets = []
 
     def _make_list(name, obj):
         if hasattr(obj, 'size') and hasattr(obj, 'shape'):
             datasets.append((name, obj.size, obj.shape, obj.dtype))
 
-    with h5py.File(path, 'r') as f:
-        f.visititems(_make_list)
-        for name, size, shape, dtype in sorted(datasets, key=lambda i: i[0]):
-            yield {"name": name, "value": [
-                {"name": "Size", "value": str(size)},
-                {"name": "Shape", "value": str(shape)},
-                {"name": "Datatype", "value": str(dtype)},
-            ]}
+    f.visititems(_make_list)
+    return datasets
+
+
+def _get_datasets(path):
+    with _file_cache.open(path) as f:
+        datasets = _get_dataset_list(f)
+    for name, size, shape, dtype in sorted(datasets, key=lambda i: i[0]):
+        yield {"name": name, "value": [
+            {"name": "Size", "value": str(size)},
+            {"name": "Shape", "value": str(shape)},
+            {"name": "Datatype", "value": str(dtype)},
+        ]}
+
+
+def _chunk_aligned(size, chunk, limit):
+    """
+    round ``size`` down to a multiple of ``chunk``, but take at least one chunk
+    and never more than ``limit``
+    """
+    return min(limit, max(chunk, (size // chunk) * chunk))
+
+
+def _chunk_multiple(size, chunk, limit):
+    """
+    round ``size`` up to a multiple of ``chunk``, but never more than ``limit``
+    """
+    return min(limit, math.ceil(size / chunk) * chunk)
+
+
+def _get_tileshape(tileshape, chunks, partition_shape):
+    """
+    For chunked datasets, grow the tileshape to a multiple of the chunk shape,
+    so each chunk is read (and decompressed) exactly once.
+    """
+    if chunks is None:
+        return tileshape
+    return Shape(
+        tuple(
+            _chunk_multiple(t, c, p)
+            for (t, c, p) in zip(tileshape, chunks, partition_shape)
+        ),
+        sig_dims=tileshape.sig.dims
+    )
+
+
+# filters we can decode ourselves, outside of the HDF5 filter pipeline:
+_SUPPORTED_FILTERS = {
+    h5py.h5z.FILTER_DEFLATE,
+    h5py.h5z.FILTER_SHUFFLE,
+    h5py.h5z.FILTER_FLETCHER32,
+}
+
+
+def _fletcher32(data):
+    """
+    The Fletcher-32 checksum of the bytes ``data``, as computed by the HDF5
+    fletcher32 filter.
+
+    HDF5 sums big-endian 16 bit words (a trailing odd byte is the high byte of a
+    last word) with end-around carry, that is, modulo 65535, except that a
+    non-zero sum is represented as 65535 instead of 0.
+    """
+    raw = np.frombuffer(data, dtype=np.uint8)
+    if raw.size % 2:
+        raw = np.append(raw, np.uint8(0))
+    words = raw.view(">u2").astype(np.uint64)
+    if not np.any(words):
+        return 0
+    # sum2 is the sum of all running sums of the words:
+    weights = np.arange(words.size, 0, -1, dtype=np.uint64) % 65535
+    sum1 = int(np.sum(words % 65535)) % 65535 or 65535
+    sum2 = int(np.sum(words * weights % 65535)) % 65535 or 65535
+    return (sum2 << 16) | sum1
+
+
+def _verify_fletcher32(raw):
+    """
+    check the checksum at the end of the chunk ``raw``, and return the chunk
+    without it
+    """
+    data, stored = raw[:-4], int.from_bytes(raw[-4:], "little")
+    checksum = _fletcher32(data)
+    # HDF5 before 1.6.3 computed the checksum with swapped bytes on little-endian systems:
+    swapped = ((checksum & 0x00ff00ff) << 8) | ((checksum >> 8) & 0x00ff00ff)
+    if stored not in (checksum, swapped):
+        raise DataSetException("fletcher32 checksum mismatch, the data is corrupted")
+    return data
+
+
+def _get_filters(h5ds):
+    """
+    list of filter codes of the filter pipeline of ``h5ds``, in the order they
+    are applied when writing
+    """
+    plist = h5ds.id.get_create_plist()
+    return [
+        plist.get_filter(i)[0]
+        for i in range(plist.get_nfilters())
+    ]
+
+
+class H5ChunkDecoder(object):
+    def __init__(self, h5ds, filters, pool):
+        """
+        Read raw chunks with ``read_direct_chunk`` and decode them in a thread pool.
+
+        h5py runs the filter pipeline under its global lock, so only a single chunk
+        can be decompressed at a time. The codecs used here (zlib, numpy) release the GIL,
+        which lets decompression scale with the number of threads.
+
+        Parameters
+        ----------
+        h5ds : h5py.Dataset
+            an open, chunked dataset
+        filters : list of int
+            filter codes as returned by ``_get_filters``
+        pool : concurrent.futures.Executor
+            where to run the decoding
+        """
+        self._h5ds = h5ds
+        self._chunks = h5ds.chunks
+        self._dtype = h5ds.dtype
+        self._filters = filters
+        self._pool = pool
+
+    @classmethod
+    def supports(cls, h5ds):
+        if h5ds.chunks is None or not hasattr(h5ds.id, "read_direct_chunk"):
+            return False
+        filters = _get_filters(h5ds)
+        # no need to bypass the HDF5 filter pipeline if there is nothing to decode:
+        return len(filters) > 0 and all(f in _SUPPORTED_FILTERS for f in filters)
+
+    def _decode_into(self, raw, filter_mask, out, chunk_sel):
+        # filters are applied in reverse order when reading:
+        for idx, code in reversed(list(enumerate(self._filters))):
+            if filter_mask & (1 << idx):
+                # filter was skipped for this chunk when writing
+                continue
+            if code == h5py.h5z.FILTER_DEFLATE:
+                raw = zlib.decompress(raw)
+            elif code == h5py.h5z.FILTER_SHUFFLE:
+                raw = unshuffle(raw, self._dtype.itemsize)
+            elif code == h5py.h5z.FILTER_FLETCHER32:
+                raw = _verify_fletcher32(raw)
+        chunk = np.frombuffer(raw, dtype=self._dtype).reshape(self._chunks)
+        out[...] = chunk[chunk_sel]
+
+    def _chunk_origins(self, slice_):
+        return itertools.product(*[
+            range((o // c) * c, o + s, c)
+            for (o, s, c) in zip(slice_.origin, slice_.shape, self._chunks)
+        ])
+
+    def _is_allocated(self, chunk_origin):
+        dsid = self._h5ds.id
+        if not hasattr(dsid, "get_chunk_info_by_coord"):
+            # h5py < 3.0: ``read_direct_chunk`` raises for chunks that were never written
+            return True
+        return dsid.get_chunk_info_by_coord(chunk_origin).byte_offset is not None
+
+    def read_direct(self, out, tile_slice):
+        """
+        Read the data covered by ``tile_slice`` into ``out``
+        """
+        futures = []
+        chunk_shape = Shape(self._chunks, sig_dims=tile_slice.shape.sig.dims)
+        for chunk_origin in self._chunk_origins(tile_slice):
+            chunk_slice = Slice(origin=chunk_origin, shape=chunk_shape)
+            intersection = chunk_slice.intersection_with(tile_slice)
+            out_view = out[intersection.shift(tile_slice).get()]
+            raw = None
+            if self._is_allocated(chunk_origin):
+                try:
+                    filter_mask, raw = self._h5ds.id.read_direct_chunk(chunk_origin)
+                except (OSError, KeyError):
+                    pass
+            if raw is None:
+                # chunks that were never written; let HDF5 handle those so we get
+                # the proper fill value:
+                out_view[...] = self._h5ds[intersection.get()]
+                continue
+            futures.append(self._pool.submit(
+                self._decode_into,
+                raw=raw,
+                filter_mask=filter_mask,
+                out=out_view,
+                chunk_sel=intersection.shift(chunk_slice).get(),
+            ))
+        for future in futures:
+            future.result()
+        return out
 
 
 class H5Reader(object):
@@ -31,21 +309,31 @@ class H5Reader(object):
 
     @contextlib.contextmanager
     def get_h5ds(self):
-        with h5py.File(self._path, 'r') as f:
+        with _file_cache.open(self._path) as f:
             yield f[self._ds_path]
 
+    def get_chunk_decoder(self, h5ds):
+        """
+        returns a ``H5ChunkDecoder`` for ``h5ds``, or None if the HDF5 filter pipeline
+        needs to be used
+        """
+        if not H5ChunkDecoder.supports(h5ds):
+            return None
+        return H5ChunkDecoder(h5ds=h5ds, filters=_get_filters(h5ds), pool=get_codec_pool())
+
 
 class H5DataSet(DataSet):
-    def __init__(self, path, ds_path, tileshape,
-                 target_size=512*1024*1024, min_num_partitions=None, sig_dims=2):
+    def __init__(self, path, ds_path, tileshape=None,
+                 target_size=None, min_num_partitions=None, sig_dims=2):
         self.path = path
         self.ds_path = ds_path
         self.target_size = target_size
         self.sig_dims = sig_dims
-        self.tileshape = Shape(tileshape, sig_dims=self.sig_dims)
+        self.tileshape = tileshape and Shape(tileshape, sig_dims=self.sig_dims)
         self.min_num_partitions = min_num_partitions
         self._dtype = None
         self._raw_shape = None
+        self._chunks = None
 
     def get_reader(self):
         return H5Reader(
@@ -57,6 +345,7 @@ class H5DataSet(DataSet):
         with self.get_reader().get_h5ds() as h5ds:
             self._dtype = h5ds.dtype
             self._raw_shape = Shape(h5ds.shape, sig_dims=self.sig_dims)
+            self._chunks = h5ds.chunks
             self._meta = DataSetMeta(
                 shape=self.shape,
                 raw_shape=self._raw_shape,
@@ -67,20 +356,13 @@ class H5DataSet(DataSet):
     @classmethod
     def detect_params(cls, path):
         try:
-            with h5py.File(path, 'r'):
-                pass
+            with _file_cache.open(path) as f:
+                # try to guess the hdf5 dataset path:
+                datasets = _get_dataset_list(f)
         except (IOError, OSError, KeyError, ValueError):
             # not a h5py file or can't open for some reason:
             return False
 
-        # try to guess the hdf5 dataset path:
-        datasets = []
-
-        def _make_list(name, obj):
-            if hasattr(obj, 'size') and hasattr(obj, 'shape'):
-                datasets.append((name, obj.size, obj.shape, obj.dtype))
-        with h5py.File(path, 'r') as f:
-            f.visititems(_make_list)
         try:
             largest_ds = sorted(datasets, key=lambda i: i[1], reverse=True)[0]
             name, size, shape, dtype = largest_ds
@@ -90,8 +372,6 @@ class H5DataSet(DataSet):
         return {
             "path": path,
             "ds_path": name,
-            # FIXME: shape may not be 4D, number of frames may not match L3 size
-            "tileshape": (1, 8) + shape[2:],
         }
 
     @property
@@ -123,21 +403,40 @@ class H5DataSet(DataSet):
                 {"name": "datasets", "value": list(_get_datasets(self.path))},
             ]
 
-    def get_partitions(self):
-        ds_shape = Shape(self.raw_shape, sig_dims=self.sig_dims)
-        ds_slice = Slice(origin=(0, 0, 0, 0), shape=ds_shape)
-        dtype = self.dtype
+    def _get_partition_shape(self):
         partition_shape = self.partition_shape(
             datashape=self.raw_shape,
             framesize=self.raw_shape.sig.size,
-            dtype=dtype,
+            dtype=self.dtype,
             target_size=self.target_size,
             min_num_partitions=self.min_num_partitions,
         )
+        if self._chunks is None:
+            return partition_shape
+        # axes that span the whole dataset are trivially aligned to the chunk grid:
+        return tuple(
+            p if p == s else _chunk_aligned(p, c, s)
+            for (p, c, s) in zip(partition_shape, self._chunks, self.raw_shape)
+        )
+
+    def get_tiling_capabilities(self):
+        return TilingCapabilities(fixed=self.tileshape is not None, sig_tiles=True)
+
+    def get_partitions(self):
+        ds_shape = Shape(self.raw_shape, sig_dims=self.sig_dims)
+        ds_slice = Slice(origin=tuple([0] * ds_shape.dims), shape=ds_shape)
+        partition_shape = self._get_partition_shape()
+        # used if the tiles are not negotiated with the job:
+        tileshape = self.tileshape or Shape(
+            tuple([1] * (ds_shape.nav.dims - 1))
+            + (min(8, ds_shape[ds_shape.nav.dims - 1]),)
+            + tuple(ds_shape.sig),
+            sig_dims=self.sig_dims,
+        )
         for pslice in ds_slice.subslices(partition_shape):
-            # TODO: where should the tileshape be set? let the user choose for now
             yield H5Partition(
-                tileshape=self.tileshape,
+                tileshape=_get_tileshape(tileshape, self._chunks, partition_shape),
+                chunks=self._chunks,
                 meta=self._meta,
                 reader=self.get_reader(),
                 partition_slice=pslice,
@@ -148,31 +447,46 @@ class H5DataSet(DataSet):
 
 
 class H5Partition(Partition):
-    def __init__(self, tileshape, reader, *args, **kwargs):
+    def __init__(self, tileshape, reader, chunks=None, *args, **kwargs):
         self.tileshape = tileshape
         self.reader = reader
+        self._chunks = chunks
         super().__init__(*args, **kwargs)
 
-    def get_tiles(self, crop_to=None):
+    def get_paths(self):
+        return [self.reader._path]
+
+    def get_tiles(self, crop_to=None, tiling=None):
         if crop_to is not None:
             if crop_to.shape.sig != self.meta.shape.sig:
                 raise DataSetException("H5DataSet only supports whole-frame crops for now")
-        data = np.ndarray(self.tileshape, dtype=self.dtype)
+        tileshape = self.tileshape
+        if tiling is not None:
+            tileshape = _get_tileshape(
+                tiling.get_tileshape(self.shape), self._chunks, tuple(self.shape)
+            )
+        data = np.ndarray(tileshape, dtype=self.dtype)
         with self.reader.get_h5ds() as dataset:
-            subslices = list(self.slice.subslices(shape=self.tileshape))
+            decoder = self.reader.get_chunk_decoder(dataset)
+            if decoder is not None:
+                read_direct = decoder.read_direct
+            else:
+                def read_direct(out, tile_slice):
+                    dataset.read_direct(out, source_sel=tile_slice.get())
+            subslices = list(self.slice.subslices(shape=tileshape))
             for tile_slice in subslices:
                 if crop_to is not None:
                     intersection = tile_slice.intersection_with(crop_to)
                     if intersection.is_null():
                         continue
-                if tile_slice.shape != self.tileshape:
+                if tile_slice.shape != tileshape:
                     # at the border, can't reuse buffer
                     # hmm. aren't there only like 3 different shapes at the border?
                     # FIXME: use buffer pool to reuse buffers of same shape
                     border_data = np.ndarray(tile_slice.shape, dtype=self.dtype)
-                    dataset.read_direct(border_data, source_sel=tile_slice.get())
+                    read_direct(border_data, tile_slice)
                     yield DataTile(data=border_data, tile_slice=tile_slice)
                 else:
                     # reuse buffer
-                    dataset.read_direct(data, source_sel=tile_slice.get())
+                    read_direct(data, tile_slice)
                     yield DataTile(data=data, tile_slice=tile_slice)
@@ -110,7 +110,8 @@ class BinaryHDFSPartition(Partition):
         self._reader = reader
         super().__init__(*args, **kwargs)
 
-    def get_tiles(self, crop_to=None):
+    def get_tiles(self, crop_to=None, tiling=None):
+        # the tileshape is given by the ingest format, so ``tiling`` is not used
         if crop_to is not None:
             if crop_to.shape.sig != self.meta.shape.sig:
                 raise DataSetException("BinaryHDFSDataSet only supports whole-frame crops for now")
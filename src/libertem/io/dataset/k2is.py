@@ -13,6 +13,7 @@ import numba
 from ncempy.io import dm
 
 from libertem.common import Slice, Shape
+from libertem.io.tiling import TilingCapabilities
 from .base import DataSet, Partition, DataTile, DataSetException, DataSetMeta
 
 log = logging.getLogger(__name__)
@@ -563,27 +564,16 @@ class K2ISDataSet(DataSet):
             fs = K2FileSet(self._files, start_offsets=self._start_offsets)
         return fs
 
-    def _get_num_partitions(self):
-        """
-        returns the number of partitions the dataset should be split into
-        """
-        size = sum(sector.filesize
-                   for sector in self._fileset.sectors)
-        # let's try to aim for 512MB per partition
-        res = max(1, size // (512*1024*1024))
-        return res
+    def get_tiling_capabilities(self):
+        # each sector is read in blocks; whole frames are assembled from all sectors:
+        return TilingCapabilities(native_sig_shape=BLOCK_SHAPE)
 
     def get_partitions(self, strat='READ_STACKED'):
         fs = self._fileset
         num_frames = self.shape.nav.size
-        f_per_part = num_frames // self._get_num_partitions()
-
-        c0 = itertools.count(start=0, step=f_per_part)
-        c1 = itertools.count(start=f_per_part, step=f_per_part)
-        for (start, stop) in zip(c0, c1):
-            if start >= num_frames:
-                break
-            stop = min(stop, num_frames)
+        # plan with the size of the frames on disk:
+        frame_size = sum(sector.filesize for sector in self._fileset.sectors) // num_frames
+        for (start, stop) in self.get_frame_ranges(num_frames, frame_size):
             part_slice = Slice(
                 origin=(
                     start, 0, 0,
@@ -615,11 +605,19 @@ class K2ISPartition(Partition):
         self._strategy = strategy
         super().__init__(*args, **kwargs)
 
-    def get_tiles(self, crop_to=None, strat=None):
+    def get_paths(self):
+        return [sector.fname for sector in self._sectors]
+
+    def get_tiles(self, crop_to=None, tiling=None, strat=None):
+        stackheight = 16
+        if tiling is not None:
+            stackheight = tiling.depth
+            if strat is None and tiling.sig_shape == tuple(self.shape.sig):
+                strat = 'READ_FULL_FRAMES'
         if strat is None:
             strat = self._strategy
         if strat == 'READ_STACKED':
-            yield from self._read_stacked(crop_to=crop_to)
+            yield from self._read_stacked(crop_to=crop_to, stackheight=stackheight)
         elif strat == 'READ_FULL_FRAMES':
             yield from self._read_full_frames(crop_to=crop_to)
         else:
@@ -632,7 +630,7 @@ class K2ISPartition(Partition):
                 stack.enter_context(sector)
                 for sector in self._sectors
             ]
-            for frame in range(self._start_frame, self._start_frame + self._num_frames + 1):
+            for frame in range(self._start_frame, self._start_frame + self._num_frames):
                 tile_slice = Slice(
                     origin=(frame, 0, 0),
                     shape=Shape(frame_buf.shape, sig_dims=2),
@@ -651,12 +649,13 @@ class K2ISPartition(Partition):
                     tile_slice=tile_slice
                 )
 
-    def _read_stacked(self, crop_to=None):
+    def _read_stacked(self, crop_to=None, stackheight=16):
         for sector in self._sectors:
             with sector as s:
                 yield from s.read_stacked(
                     start_at_frame=self._start_frame,
                     num_frames=self._num_frames,
+                    stackheight=stackheight,
                     crop_to=crop_to,
                 )
 
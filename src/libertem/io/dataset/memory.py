@@ -0,0 +1,170 @@
+import numpy as np
+
+from libertem.common import Slice, Shape
+from libertem.io.shm import SharedArray, have_shm
+from libertem.io.tiling import TilingCapabilities
+from .base import DataSet, Partition, DataTile, DataSetMeta
+
+
+def _default_tileshape(shape):
+    """
+    whole frames, up to 16 of them along the last navigation axis
+    """
+    nav_dims = shape.nav.dims
+    return (
+        tuple([1] * (nav_dims - 1))
+        + (min(16, shape[nav_dims - 1]),)
+        + tuple(shape.sig)
+    )
+
+
+class MemoryReader(object):
+    def __init__(self, data):
+        self._data = data
+
+    def get_paths(self):
+        return []
+
+    @property
+    def data(self):
+        if isinstance(self._data, SharedArray):
+            return self._data.data
+        return self._data
+
+
+class MemoryDataSet(DataSet):
+    def __init__(self, data, tileshape=None, partition_shape=None, sig_dims=2,
+                 effective_shape=None, use_shm=None):
+        """
+        Use an in-memory numpy array as a DataSet
+
+        If the data is in shared memory, tasks running on workers of the local node
+        only receive a handle instead of a copy of the data. Workers on other nodes
+        can't access the data in this case. By default, the ``Context`` that loads or
+        runs on this DataSet moves the data into shared memory if all workers of its
+        executor run on the local node, see ``set_shared_memory``.
+
+        Parameters
+        ----------
+        data : numpy.ndarray
+            the data, with the signal in the last ``sig_dims`` dimensions
+        tileshape : tuple of int or None
+            shape of the tiles; by default, the tiles are negotiated with the job
+        partition_shape : tuple of int or None
+            shape of the partitions; by default, decided by the partition planner
+        sig_dims : int
+            number of signal dimensions
+        effective_shape : tuple of int or None
+            if given, the shape imprinted on the data, for example to interpret a
+            3D array as 4D
+        use_shm : bool or None
+            always (True) or never (False) place the data in shared memory, which
+            needs Python >= 3.8; by default, depending on the executor
+        """
+        self._use_shm = use_shm
+        if use_shm:
+            self._data = SharedArray.from_array(data)
+        else:
+            self._data = data
+        raw_shape = Shape(data.shape, sig_dims=sig_dims)
+        self._fixed_tileshape = tileshape is not None
+        if tileshape is None:
+            tileshape = _default_tileshape(raw_shape)
+        if partition_shape is not None:
+            partition_shape = Shape(partition_shape, sig_dims=sig_dims)
+        self.tileshape = Shape(tileshape, sig_dims=sig_dims)
+        self._partition_shape = partition_shape
+        self.sig_dims = sig_dims
+        self._effective_shape = effective_shape and Shape(effective_shape, sig_dims) or None
+        self._meta = DataSetMeta(
+            shape=self.shape,
+            raw_shape=self.raw_shape,
+            dtype=data.dtype,
+        )
+
+    def initialize(self):
+        return self
+
+    @property
+    def data(self):
+        return self.get_reader().data
+
+    @property
+    def dtype(self):
+        return self._meta.dtype
+
+    @property
+    def raw_shape(self):
+        return Shape(self._data.shape, sig_dims=self.sig_dims)
+
+    @property
+    def shape(self):
+        return self._effective_shape or self.raw_shape
+
+    def check_valid(self):
+        return True
+
+    def set_shared_memory(self, enabled):
+        if self._use_shm is not None or not have_shm():
+            return
+        if enabled and not isinstance(self._data, SharedArray):
+            self._data = SharedArray.from_array(self._data)
+        elif not enabled and isinstance(self._data, SharedArray):
+            shared = self._data
+            self._data = np.array(shared.data)
+            shared.close()
+
+    @classmethod
+    def detect_params(cls, path):
+        return False
+
+    def get_reader(self):
+        return MemoryReader(data=self._data)
+
+    def get_tiling_capabilities(self):
+        return TilingCapabilities(fixed=self._fixed_tileshape, sig_tiles=True)
+
+    def get_partitions(self):
+        ds_slice = Slice(origin=tuple([0] * self.raw_shape.dims), shape=self.raw_shape)
+        partition_shape = self._partition_shape
+        if partition_shape is None:
+            partition_shape = self.get_planner().get_partition_shape(self.raw_shape, self.dtype)
+        for pslice in ds_slice.subslices(partition_shape):
+            yield MemoryPartition(
+                tileshape=self.tileshape,
+                meta=self._meta,
+                reader=self.get_reader(),
+                partition_slice=pslice,
+            )
+
+    def __repr__(self):
+        return "<MemoryDataSet of %s shape=%s>" % (self.dtype, self.shape)
+
+
+class MemoryPartition(Partition):
+    def __init__(self, tileshape, reader, *args, **kwargs):
+        self.tileshape = tileshape
+        self.reader = reader
+        super().__init__(*args, **kwargs)
+
+    def get_paths(self):
+        return self.reader.get_paths()
+
+    def get_tiles(self, crop_to=None, tiling=None):
+        tileshape = self.tileshape
+        if tiling is not None:
+            tileshape = tiling.get_tileshape(self.shape)
+        data = self.reader.data
+        subslices = self.slice.subslices(shape=tileshape)
+        for tile_slice in subslices:
+            if crop_to is not None:
+                intersection = tile_slice.intersection_with(crop_to)
+                if intersection.is_null():
+                    continue
+            yield DataTile(
+                data=data[tile_slice.get()],
+                tile_slice=tile_slice
+            )
+
+    def __repr__(self):
+        return "<MemoryPartition for %r>" % self.slice
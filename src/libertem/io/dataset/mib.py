@@ -2,16 +2,206 @@ import re
 import io
 import os
 import glob
+import json
+import hashlib
+import bisect
 import logging
-import functools
+from concurrent.futures import ThreadPoolExecutor
 
+import numba
 import numpy as np
 
 from libertem.common import Slice, Shape
+from libertem.io.utils import get_cache_dir
+from libertem.io.tiling import TilingCapabilities
+from libertem.io.live import LiveAcquisition
 from .base import DataSet, Partition, DataTile, DataSetException, DataSetMeta
 
 log = logging.getLogger(__name__)
 
+# bump this if the fields that are stored in the header index change:
+HEADER_INDEX_VERSION = 1
+
+
+@numba.njit
+def decode_r1_swap(inp, out):
+    """
+    RAW 1bit format: each pixel is a single bit, in 64bit words with swapped byte order
+    """
+    for stripe in range(inp.shape[0] // 8):
+        for byte in range(8):
+            inp_byte = inp[(stripe + 1) * 8 - (byte + 1)]
+            for bitpos in range(8):
+                out[64 * stripe + 8 * byte + bitpos] = (inp_byte >> bitpos) & 1
+
+
+@numba.njit
+def decode_r6_swap(inp, out):
+    """
+    RAW 6bit format: one byte per pixel, reversed in groups of 8 pixels
+    """
+    for i in range(out.shape[0]):
+        col = i % 8
+        pos = i // 8
+        out[(pos + 1) * 8 - col - 1] = inp[i]
+
+
+@numba.njit
+def decode_r12_swap(inp, out):
+    """
+    RAW 12bit format: big endian 16bit values, reversed in groups of 4 pixels
+    """
+    for i in range(out.shape[0]):
+        col = i % 4
+        pos = i // 4
+        out[(pos + 1) * 4 - col - 1] = (np.uint16(inp[i * 2]) << 8) | np.uint16(inp[i * 2 + 1])
+
+
+@numba.njit
+def decode_r24_swap(inp, out):
+    """
+    RAW 24bit format: two frames in the RAW 12bit format after one header, the
+    first one contains the most significant bits
+    """
+    num_px = out.shape[0]
+    for i in range(num_px):
+        col = i % 4
+        pos = i // 4
+        high = (np.uint32(inp[i * 2]) << 8) | np.uint32(inp[i * 2 + 1])
+        low = (
+            (np.uint32(inp[2 * num_px + i * 2]) << 8) | np.uint32(inp[2 * num_px + i * 2 + 1])
+        )
+        out[(pos + 1) * 4 - col - 1] = (high << 12) | low
+
+
+@numba.njit
+def reassemble_2x2(inp, out):
+    """
+    Quad layout: each row of ``inp`` contains the same row of all four chips, in the
+    order [4 | 3 | 2 | 1]. In ``out``, the chips are arranged like this, with chips
+    3 and 4 rotated by 180 degrees::
+
+        | 1 | 2 |
+        | 3 | 4 |
+    """
+    chip_h = out.shape[0] // 2
+    chip_w = out.shape[1] // 2
+    for row in range(chip_h):
+        for col in range(chip_w):
+            out[row, col] = inp[row, 3 * chip_w + col]
+            out[row, chip_w + col] = inp[row, 2 * chip_w + col]
+            out[2 * chip_h - 1 - row, chip_w - 1 - col] = inp[row, chip_w + col]
+            out[2 * chip_h - 1 - row, 2 * chip_w - 1 - col] = inp[row, col]
+
+
+# counter depth -> (decoder, decoded dtype, bytes per pixel on disk)
+RAW_FORMATS = {
+    1: (decode_r1_swap, "uint8", 1 / 8),
+    6: (decode_r6_swap, "uint8", 1),
+    12: (decode_r12_swap, "uint16", 2),
+    24: (decode_r24_swap, "uint32", 4),
+}
+
+
+def _get_np_dtype(dtype, counter_depth):
+    dtype = dtype.lower()
+    num_bits = int(dtype[1:])
+    if dtype[0] == "u":
+        if num_bits % 8 != 0:
+            raise DataSetException("unsupported pixel depth: %s" % dtype)
+        return ">u%d" % (num_bits // 8)
+    elif dtype[0] == "r":
+        if counter_depth not in RAW_FORMATS:
+            raise DataSetException("unsupported raw counter depth: %r" % counter_depth)
+        return RAW_FORMATS[counter_depth][1]
+    raise DataSetException("unknown pixel depth: %s" % dtype)
+
+
+def get_header_size(header):
+    """
+    the size of the header that starts with ``header``, which should be at least
+    the first 100 bytes of a frame
+    """
+    return int(header[:100].decode("ascii").split(",")[2])
+
+
+def parse_header(header):
+    """
+    Parse the header of a frame
+
+    Parameters
+    ----------
+    header : bytes
+        the complete header, as given by ``get_header_size``
+
+    Returns
+    -------
+    dict
+        the fields of the header that are needed to decode the frame
+    """
+    header_size_bytes = get_header_size(header)
+    if len(header) < header_size_bytes:
+        raise DataSetException("incomplete header")
+    parts = [p.strip(" \x00") for p in header[:header_size_bytes].decode("ascii").split(",")]
+    # the header is padded to header_size_bytes:
+    while parts and not parts[-1]:
+        parts.pop()
+    image_size = (int(parts[5]), int(parts[4]))
+    raw = parts[6].lower().startswith("r")
+    # the counter depth is the last field of the header:
+    try:
+        counter_depth = int(parts[-1])
+    except ValueError:
+        counter_depth = None
+    sensor_layout = parts[7].upper() if len(parts) > 7 else "1X1"
+    dtype = _get_np_dtype(parts[6], counter_depth)
+    if raw:
+        if sensor_layout not in ("1X1", "2X2"):
+            raise DataSetException(
+                "unsupported sensor layout for raw mode: %s" % sensor_layout
+            )
+        bytes_per_pixel = RAW_FORMATS[counter_depth][2]
+    else:
+        bytes_per_pixel = int(parts[6][1:]) // 8
+    return {
+        'header_size_bytes': header_size_bytes,
+        'dtype': dtype,
+        'raw': raw,
+        'counter_depth': counter_depth,
+        'sensor_layout': sensor_layout,
+        'bytes_per_pixel': bytes_per_pixel,
+        'image_size': image_size,
+        'image_size_bytes': int(image_size[0] * image_size[1] * bytes_per_pixel),
+        'sequence_first_image': int(parts[1]),
+    }
+
+
+def decode_frame(fields, data, out):
+    """
+    Decode the pixel data of a single frame, without its header
+
+    Parameters
+    ----------
+    fields : dict
+        the header fields, see ``parse_header``
+    data : numpy.ndarray
+        the pixel data, of dtype uint8
+    out : numpy.ndarray
+        output buffer of shape ``fields['image_size']``
+    """
+    if not fields['raw']:
+        out[:] = data.view(fields['dtype']).reshape(fields['image_size'])
+        return out
+    decoder = RAW_FORMATS[fields['counter_depth']][0]
+    if fields['sensor_layout'] == "2X2":
+        image_size = fields['image_size']
+        decoded = np.zeros((image_size[0] // 2, image_size[1] * 2), dtype=fields['dtype'])
+        decoder(data, decoded.reshape((-1,)))
+        reassemble_2x2(decoded, out)
+    else:
+        decoder(data, out.reshape((-1,)))
+    return out
+
 
 class MIBFile(object):
     def __init__(self, path, fields=None):
@@ -21,34 +211,28 @@ class MIBFile(object):
         else:
             self._fields = fields
 
-    def _get_np_dtype(self, dtype):
-        dtype = dtype.lower()
-        assert dtype[0] == "u"
-        num_bytes = int(dtype[1:]) // 8
-        return ">u%d" % num_bytes
-
     def read_header(self):
-        with io.open(file=self.path, mode="r", encoding="ascii") as f:
-            header = f.read(100)
-            filesize = os.fstat(f.fileno()).st_size
-        parts = header.split(",")
-        image_size = (int(parts[5]), int(parts[4]))
-        header_size_bytes = int(parts[2])
-        bytes_per_pixel = int(parts[6][1:]) // 8
-        num_images = filesize // (
-            image_size[0] * image_size[1] * bytes_per_pixel + header_size_bytes
-        )
-        self._fields = {
-            'header_size_bytes': header_size_bytes,
-            'dtype': self._get_np_dtype(parts[6]),
-            'bytes_per_pixel': bytes_per_pixel,
-            'image_size': image_size,
-            'sequence_first_image': int(parts[1]),
-            'filesize': filesize,
-            'num_images': num_images,
-        }
+        # binary mode: a text decoder would read ahead into the pixel data
+        with io.open(file=self.path, mode="rb") as f:
+            header_size_bytes = get_header_size(f.read(100))
+            f.seek(0)
+            fields = parse_header(f.read(header_size_bytes))
+            st = os.fstat(f.fileno())
+        fields.update({
+            'filesize': st.st_size,
+            'mtime_ns': st.st_mtime_ns,
+            'num_images': st.st_size // (fields['image_size_bytes'] + header_size_bytes),
+        })
+        self._fields = fields
         return self._fields
 
+    def is_unchanged(self, fields):
+        """
+        check if ``fields``, read earlier, are still valid for this file
+        """
+        st = os.stat(self.path)
+        return (st.st_size, st.st_mtime_ns) == (fields.get('filesize'), fields.get('mtime_ns'))
+
     @property
     def fields(self):
         if not self._fields:
@@ -85,9 +269,53 @@ class MIBFile(object):
         # reshape to (num_frames, pixels_y, pixels_x)
         return mapped.reshape((num, self.fields['image_size'][0], self.fields['image_size'][1]))
 
+    def _raw_frames(self, num, offset):
+        """
+        the encoded bytes of raw mode frames, as views into the memmapped file
+
+        Returns
+        -------
+        numpy.ndarray
+            of shape (num, image_size_bytes) and dtype uint8
+        """
+        hsize = self.fields['header_size_bytes']
+        size = self.fields['image_size_bytes']
+        mapped = np.memmap(self.path, dtype=np.uint8, mode='r',
+                           offset=offset * (size + hsize))
+        mapped = mapped[:num * (size + hsize)].reshape((num, size + hsize))
+        return mapped[:, hsize:]
+
+    def _decode_frames(self, num, offset, out, crop_to):
+        decoder = RAW_FORMATS[self.fields['counter_depth']][0]
+        image_size = self.fields['image_size']
+        quad = self.fields['sensor_layout'] == "2X2"
+        cropped = crop_to is not None and tuple(crop_to.shape.sig) != image_size
+        frame = None
+        if quad or cropped:
+            frame = np.zeros(image_size, dtype=self.fields['dtype'])
+        if quad:
+            # the chips of a quad are interleaved by rows in the file:
+            decoded = np.zeros((image_size[0] // 2, image_size[1] * 2),
+                               dtype=self.fields['dtype'])
+        for i, raw_frame in enumerate(self._raw_frames(num=num, offset=offset)):
+            if quad:
+                decoder(raw_frame, decoded.reshape((-1,)))
+                reassemble_2x2(decoded, frame)
+            elif cropped:
+                decoder(raw_frame, frame.reshape((-1,)))
+            else:
+                # unpack directly into the tile buffer:
+                decoder(raw_frame, out[i].reshape((-1,)))
+                continue
+            if cropped:
+                out[i] = frame[crop_to.get(sig_only=True)]
+            else:
+                out[i] = frame
+
     def read_frames(self, num, offset, out, crop_to):
         """
-        Read a number of frames into an existing buffer, skipping the headers
+        Read a number of frames into an existing buffer, skipping the headers and
+        decoding raw mode frames
 
         Parameters
         ----------
@@ -101,6 +329,9 @@ class MIBFile(object):
         crop_to : Slice
             crop to the signal part of this Slice
         """
+        if self.fields['raw']:
+            self._decode_frames(num=num, offset=offset, out=out, crop_to=crop_to)
+            return out
         frames = self._frames(num=num, offset=offset)
         if crop_to is not None:
             frames = frames[(...,) + crop_to.get(sig_only=True)]
@@ -108,22 +339,180 @@ class MIBFile(object):
         return out
 
 
+def _read_fields(path, cached_fields=None):
+    f = MIBFile(path)
+    if cached_fields is not None and f.is_unchanged(cached_fields):
+        return cached_fields
+    return f.read_header()
+
+
+class _LiveFiles(object):
+    def __init__(self, pattern):
+        """
+        The files of a MIB acquisition that is still running: new files can appear,
+        and the last file can grow
+        """
+        self._pattern = pattern
+        self._headers = {}
+        # incremented when headers change, so users of get_files know when to update:
+        self.generation = 0
+
+    def _is_final(self, files, idx):
+        # a file is complete if the next file continues where it ends:
+        if idx + 1 >= len(files):
+            return False
+        fields = files[idx].fields
+        end = fields['sequence_first_image'] + fields['num_images']
+        return end == files[idx + 1].fields['sequence_first_image']
+
+    def refresh(self):
+        """
+        read the headers of new files, and of files that may not be complete yet
+        """
+        files = self.get_files()
+        final = {f.path for idx, f in enumerate(files) if self._is_final(files, idx)}
+        for path in glob.glob(self._pattern):
+            if path in final:
+                continue
+            cached = self._headers.get(path)
+            try:
+                fields = _read_fields(path, cached)
+            except (IOError, OSError, ValueError, IndexError, DataSetException):
+                # the header is not completely written yet:
+                continue
+            if fields is not cached:
+                self._headers[path] = fields
+                self.generation += 1
+
+    @property
+    def headers(self):
+        return self._headers
+
+    def get_files(self):
+        files = [MIBFile(path, fields) for path, fields in self._headers.items()]
+        return list(sorted(files, key=lambda f: f.fields['sequence_first_image']))
+
+    def written_until(self, start):
+        """
+        the end of the consecutive frames that are written, beginning with frame ``start``
+        """
+        end = start
+        for f in self.get_files():
+            first = f.fields['sequence_first_image'] - 1
+            if first > end:
+                break
+            end = max(end, first + f.fields['num_images'])
+        return end
+
+
+class MIBHeaderIndex(object):
+    def __init__(self, path):
+        """
+        Persistent index of the headers of the files of a MIB dataset, so they don't
+        need to be read again when the dataset is opened the next time.
+
+        Parameters
+        ----------
+        path : str
+            path of the JSON index file
+        """
+        self.path = path
+
+    def load(self):
+        """
+        Returns
+        -------
+        dict
+            header fields by path of the .mib file; empty if there is no valid index
+        """
+        try:
+            with open(self.path, "r") as f:
+                index = json.load(f)
+        except (IOError, OSError, ValueError):
+            return {}
+        if index.get('version') != HEADER_INDEX_VERSION:
+            return {}
+        headers = index['headers']
+        for fields in headers.values():
+            fields['image_size'] = tuple(fields['image_size'])
+        return headers
+
+    def store(self, headers):
+        tmp_path = "%s.%d.tmp" % (self.path, os.getpid())
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(tmp_path, "w") as f:
+                json.dump({'version': HEADER_INDEX_VERSION, 'headers': headers}, f)
+            os.replace(tmp_path, self.path)
+        except (IOError, OSError) as e:
+            log.warning("could not write MIB header index %s: %s", self.path, e)
+
+    def scan(self, paths, num_threads=16):
+        """
+        Read the headers of ``paths`` with a thread pool, re-using the entries of the
+        index for files that didn't change, and update the index
+
+        Returns
+        -------
+        dict
+            header fields by path
+        """
+        cached = self.load()
+        with ThreadPoolExecutor(max_workers=max(1, min(num_threads, len(paths)))) as pool:
+            fields = list(pool.map(
+                lambda path: _read_fields(path, cached.get(path)), paths
+            ))
+        headers = dict(zip(paths, fields))
+        if headers != cached:
+            self.store(headers)
+        return headers
+
+
 class MIBDataSet(DataSet):
-    def __init__(self, path, tileshape, scan_size):
+    def __init__(self, path, tileshape=None, scan_size=None, index_path=None, live=False,
+                 live_timeout=60):
+        """
+        Read Merlin Medipix MIB files, which may be split into many files
+
+        Parameters
+        ----------
+        path : str
+            path to one of the .mib files, or to the .hdr file
+        tileshape : tuple of int or None
+            by default, the tiles are negotiated with the job
+        scan_size : tuple of int
+            the scan size
+        index_path : str or None
+            where to keep the index of the file headers; by default, in
+            ``$LIBERTEM_CACHE_DIR``
+        live : bool
+            the acquisition is still running: jobs wait for frames that are not
+            written yet, see ``get_progress``
+        live_timeout : float
+            in live mode, give up if no new frames arrive for this many seconds
+        """
         self._sig_dims = 2
         self._path = path
-        self._tileshape = Shape(tileshape, sig_dims=self._sig_dims)
-        self._scan_size = tuple(scan_size)
+        self._index_path = index_path
+        self._tileshape = tileshape and Shape(tileshape, sig_dims=self._sig_dims)
+        self._scan_size = scan_size and tuple(scan_size)
+        self._live = live
+        self._live_timeout = live_timeout
+        self._acquisition = None
+        self._live_files = None
         self._filename_cache = None
         self._files_sorted = None
-        # ._preread_headers() calls ._files() which passes the cached headers down to MIBFile,
-        # if they exist. So we need to make sure to initialize self._headers
-        # before calling _preread_headers!
+        # header fields by path, read in initialize and passed down to the MIBFiles:
         self._headers = {}
         self._meta = None
 
     def initialize(self):
-        self._headers = self._preread_headers()
+        if self._scan_size is None:
+            raise DataSetException("scan_size is required for MIB files")
+        if self._live:
+            self._headers = self._wait_for_first_frame()
+        else:
+            self._headers = self._preread_headers()
         self._files_sorted = list(sorted(self._files(),
                                          key=lambda f: f.fields['sequence_first_image']))
 
@@ -141,44 +530,95 @@ class MIBDataSet(DataSet):
         self._meta = meta
         return self
 
+    def _wait_for_first_frame(self):
+        self._acquisition = LiveAcquisition(
+            num_frames=int(np.prod(self._scan_size)), timeout=self._live_timeout,
+        )
+        self._live_files = _LiveFiles(self._pattern())
+
+        def _written():
+            self._live_files.refresh()
+            return self._live_files.written_until(0)
+
+        self._acquisition.wait_for(1, _written)
+        return dict(self._live_files.headers)
+
+    def get_progress(self):
+        """
+        How much of a live acquisition is written
+
+        Returns
+        -------
+        dict
+            see ``LiveAcquisition.get_progress``
+        """
+        if self._acquisition is None:
+            num_frames = self.shape.nav.size
+            return LiveAcquisition(num_frames=num_frames).get_progress(self._num_images())
+        self._live_files.refresh()
+        return self._acquisition.get_progress(self._live_files.written_until(0))
+
     @classmethod
     def detect_params(cls, path):
         if path.endswith(".mib"):
             return {
                 "path": path,
-                "tileshape": (1, 8, 256, 256),
             }
         return False
 
+    def get_header_index(self):
+        path = self._index_path
+        if path is None:
+            key = hashlib.sha1(os.path.abspath(self._pattern()).encode("utf8")).hexdigest()
+            path = os.path.join(get_cache_dir(), "mib-index", "%s.json" % key)
+        return MIBHeaderIndex(path)
+
     def _preread_headers(self):
-        res = {}
-        for f in self._files():
-            res[f.path] = f.fields
-        return res
+        return self.get_header_index().scan(self._filenames())
 
-    def _filenames(self):
-        if self._filename_cache is not None:
-            return self._filename_cache
+    def _pattern(self):
         path, ext = os.path.splitext(self._path)
         ext = ext.lower()
         if ext == '.mib':
-            pattern = "%s*.mib" % (
+            return "%s*.mib" % (
                 re.sub(r'[0-9]+$', '', path)
             )
         elif ext == '.hdr':
-            pattern = "%s*.mib" % path
+            return "%s*.mib" % path
         else:
             raise DataSetException("unknown extension")
-        fns = glob.glob(pattern)
+
+    def _filenames(self):
+        if self._filename_cache is not None:
+            return self._filename_cache
+        fns = sorted(glob.glob(self._pattern()))
         self._filename_cache = fns
         return fns
 
     def _files(self):
-        for path in self._filenames():
-            yield MIBFile(path, self._headers.get(path))
+        if self._files_sorted is not None:
+            return self._files_sorted
+        return [
+            MIBFile(path, self._headers.get(path))
+            for path in self._filenames()
+        ]
 
     def _num_images(self):
-        return sum(f.fields['num_images'] for f in self._files())
+        return sum(fields['num_images'] for fields in self._headers.values())
+
+    def _check_frame_ranges(self):
+        """
+        the files have to continue where the previous file ends; in live mode,
+        the last files may not be written yet
+        """
+        end = 1
+        for f in self._files_sorted:
+            first = f.fields['sequence_first_image']
+            if first < end or (first > end and not self._live):
+                raise DataSetException(
+                    "%s starts at frame %d, expected frame %d" % (f.path, first, end)
+                )
+            end = first + f.fields['num_images']
 
     @property
     def dtype(self):
@@ -202,54 +642,68 @@ class MIBDataSet(DataSet):
         try:
             s = self._scan_size
             num_images = self._num_images()
-            if s[0] * s[1] != num_images:
+            # in live mode, the frames that are not written yet are missing:
+            if self._live:
+                valid = num_images <= s[0] * s[1]
+            else:
+                valid = num_images == s[0] * s[1]
+            if not valid:
                 raise DataSetException(
                     "scan_size (%r) does not match number of images (%d)" % (
                         s, num_images
                     )
                 )
-            if self._tileshape.sig != self.raw_shape.sig:
+            self._check_frame_ranges()
+            if self._tileshape is not None and self._tileshape.sig != self.raw_shape.sig:
                 raise DataSetException(
                     "MIB only supports tileshapes that match whole frames, %r != %r" % (
                         self._tileshape.sig, self.raw_shape.sig
                     )
                 )
-            if self._tileshape[0] != 1:
-                raise DataSetException(
-                    "MIB only supports tileshapes that don't cross rows"
-                )
-            # FIXME: this should not generally be required!
-            """
-            for f in self._files():
-                if f.fields['num_images'] % self._scan_size[0] != 0:
-                    raise DataSetException(
-                        "only supporting rectangular shapes per file for now"
-                    )
-            """
+            return True
         except (IOError, OSError, KeyError, ValueError) as e:
             raise DataSetException("invalid dataset: %s" % e)
 
+    def get_tiling_capabilities(self):
+        # frames are read whole, and cropped afterwards:
+        return TilingCapabilities(fixed=self._tileshape is not None)
+
     def get_partitions(self):
         """
-        we keep it simple: one MIB file == one partition
+        Partitions are ranges of frames chosen by the planner, independent of the
+        files: a partition can span many small files, or a part of a large file.
         """
-
-        @functools.lru_cache(maxsize=None)
-        def pshape_for_length(length):
-            return Shape((length,) + tuple(self.raw_shape.sig), sig_dims=self._sig_dims)
-
-        for f in self._files_sorted:
-            idx = f.fields['sequence_first_image'] - 1
-            length = f.fields['num_images']
-
-            pshape = pshape_for_length(length)
-            pslice = Slice(origin=(idx, 0, 0), shape=pshape)
-
+        # used if the tiles are not negotiated with the job:
+        tileshape = self._tileshape or Shape(
+            (1, min(8, self.shape[1])) + tuple(self.raw_shape.sig), sig_dims=self._sig_dims
+        )
+        fields = self._files_sorted[0].fields
+        num_frames = self.shape.nav.size
+        # plan with the size of the frames on disk, including the headers:
+        frame_size = (
+            fields['image_size_bytes'] + fields['header_size_bytes']
+        )
+        first_frames = [f.fields['sequence_first_image'] - 1 for f in self._files_sorted]
+        for (start, stop) in self.get_frame_ranges(num_frames, frame_size):
+            # the files that contain frames of [start, stop):
+            first_file = max(0, bisect.bisect_right(first_frames, start) - 1)
+            last_file = bisect.bisect_left(first_frames, stop)
+            pslice = Slice(
+                origin=(start, 0, 0),
+                shape=Shape((stop - start,) + tuple(self.raw_shape.sig), sig_dims=self._sig_dims),
+            )
+            if self._live:
+                # the files are found by the partition when the frames are written:
+                files = []
+            else:
+                files = self._files_sorted[first_file:last_file]
             yield MIBPartition(
-                tileshape=self._tileshape,
+                tileshape=tileshape,
+                files=files,
                 meta=self._meta,
-                partfile=f,
                 partition_slice=pslice,
+                acquisition=self._acquisition,
+                live_files=self._live_files,
             )
 
     def __repr__(self):
@@ -257,39 +711,85 @@ class MIBDataSet(DataSet):
 
 
 class MIBPartition(Partition):
-    def __init__(self, tileshape, partfile, *args, **kwargs):
+    def __init__(self, tileshape, files, *args, acquisition=None, live_files=None, **kwargs):
         self.tileshape = tileshape
-        self.partfile = partfile
+        self._set_files(files)
+        self._acquisition = acquisition
+        self._live_files = live_files
+        self._generation = None
         super().__init__(*args, **kwargs)
         assert all(s > 0 for s in self.shape), "invalid shape (%r)" % (self.shape,)
 
-    def get_tiles(self, crop_to=None):
-        stackheight = self.tileshape.nav.size
+    def _set_files(self, files):
+        self._files = files
+        self._first_frames = [f.fields['sequence_first_image'] - 1 for f in files]
+
+    def get_paths(self):
+        return [f.path for f in self._files]
 
-        num_tiles = self.partfile.fields['num_images'] // stackheight
+    def _wait_for_frames(self, start, stop):
+        """
+        in live mode, wait until the frames [start, stop) are written
+        """
+        live_files = self._live_files
+        if live_files.written_until(start) < stop:
+            def _written():
+                live_files.refresh()
+                return live_files.written_until(start)
+            self._acquisition.wait_for(stop, _written)
+        if self._generation != live_files.generation:
+            self._set_files(live_files.get_files())
+            self._generation = live_files.generation
+
+    def _read_frames(self, start, out, crop_to=None):
+        """
+        read the frames [start, start + len(out)) of the dataset into ``out``,
+        across file boundaries
+        """
+        stop = start + out.shape[0]
+        idx = max(0, bisect.bisect_right(self._first_frames, start) - 1)
+        while start < stop:
+            if idx >= len(self._files):
+                raise DataSetException("frame %d is not in any file" % start)
+            f = self._files[idx]
+            offset = start - self._first_frames[idx]
+            num = min(stop - start, f.fields['num_images'] - offset)
+            if offset < 0 or num <= 0:
+                raise DataSetException("frame %d is not in %s" % (start, f.path))
+            pos = out.shape[0] - (stop - start)
+            f.read_frames(num=num, offset=offset, out=out[pos:pos + num], crop_to=crop_to)
+            start += num
+            idx += 1
+
+    def get_tiles(self, crop_to=None, tiling=None):
+        if tiling is not None:
+            stackheight = tiling.depth
+        else:
+            stackheight = self.tileshape.nav.size
 
-        tshape = self.tileshape.flatten_nav()
+        sig_shape = tuple(self.shape.sig)
         sig_origin = (0, 0)
-        if crop_to is not None and tshape.sig != crop_to.shape.sig:
-            tshape = Shape(tuple(tshape.nav) + tuple(crop_to.shape.sig), sig_dims=tshape.sig.dims)
+        if crop_to is not None and self.shape.sig != crop_to.shape.sig:
+            sig_shape = tuple(crop_to.shape.sig)
             sig_origin = crop_to.origin[1:]
-        data = np.ndarray(tshape, dtype=self.dtype)
-        for t in range(num_tiles):
-            tile_slice = Slice(origin=(t * stackheight + self.slice.origin[0],) + sig_origin,
-                               shape=tshape)
-            if crop_to is not None:
-                intersection = tile_slice.intersection_with(crop_to)
-                if intersection.is_null():
-                    continue
-            self.partfile.read_frames(num=stackheight, offset=t * stackheight, out=data,
-                                      crop_to=crop_to)
-            assert all([
-                item > 0
-                for item in tile_slice.shift(self.slice).shape
-            ])
-            assert all([
-                item >= 0
-                for item in tile_slice.shift(self.slice).origin
-            ])
-
+        start_frame = self.slice.origin[0]
+        stop_frame = start_frame + self.shape[0]
+        if crop_to is not None:
+            # only read the frames in crop_to:
+            start_frame = max(start_frame, crop_to.origin[0])
+            stop_frame = min(stop_frame, crop_to.origin[0] + crop_to.shape[0])
+        data_full = np.ndarray((stackheight,) + sig_shape, dtype=self.dtype)
+        for start in range(start_frame, stop_frame, stackheight):
+            num = min(stackheight, stop_frame - start)
+            data = data_full[:num]
+            tshape = Shape((num,) + sig_shape, sig_dims=self.shape.sig.dims)
+            tile_slice = Slice(origin=(start,) + sig_origin, shape=tshape)
+            if self._acquisition is not None:
+                self._wait_for_frames(start, start + num)
+            self._read_frames(start=start, out=data, crop_to=crop_to)
             yield DataTile(data=data, tile_slice=tile_slice)
+
+    def __repr__(self):
+        return "<MIBPartition frames %d:%d in %d files>" % (
+            self.slice.origin[0], self.slice.origin[0] + self.shape[0], len(self._files)
+        )
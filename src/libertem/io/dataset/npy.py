@@ -0,0 +1,107 @@
+import numpy as np
+
+from libertem.common import Slice, Shape
+from libertem.io.tiling import TilingCapabilities
+from .base import DataSet, DataSetException, DataSetMeta
+from .memory import MemoryPartition, _default_tileshape
+
+
+class NPYReader(object):
+    def __init__(self, path):
+        self._path = path
+
+    def get_paths(self):
+        return [self._path]
+
+    @property
+    def data(self):
+        return np.load(self._path, mmap_mode='r')
+
+
+class NPYDataSet(DataSet):
+    def __init__(self, path, tileshape=None, sig_dims=2, scan_size=None):
+        """
+        Read data from a numpy .npy file, which is memory mapped
+
+        Parameters
+        ----------
+        path : str
+            path to the .npy file
+        tileshape : tuple of int or None
+            shape of the tiles; by default, the tiles are negotiated with the job
+        sig_dims : int
+            number of signal dimensions
+        scan_size : tuple of int or None
+            if given, interpret the navigation dimensions with this shape
+        """
+        self._path = path
+        self._tileshape = tileshape and tuple(tileshape)
+        self._fixed_tileshape = tileshape is not None
+        self._sig_dims = sig_dims
+        self._scan_size = scan_size and tuple(scan_size)
+        self._meta = None
+
+    def initialize(self):
+        data = self.get_reader().data
+        raw_shape = Shape(data.shape, sig_dims=self._sig_dims)
+        if self._scan_size is not None:
+            shape = Shape(self._scan_size + tuple(raw_shape.sig), sig_dims=self._sig_dims)
+        else:
+            shape = raw_shape
+        if self._tileshape is None:
+            self._tileshape = _default_tileshape(raw_shape)
+        self._meta = DataSetMeta(
+            shape=shape,
+            raw_shape=raw_shape,
+            dtype=data.dtype,
+        )
+        return self
+
+    @classmethod
+    def detect_params(cls, path):
+        if path.lower().endswith(".npy"):
+            return {"path": path}
+        return False
+
+    @property
+    def dtype(self):
+        return self._meta.dtype
+
+    @property
+    def shape(self):
+        return self._meta.shape
+
+    @property
+    def raw_shape(self):
+        return self._meta.raw_shape
+
+    def get_reader(self):
+        return NPYReader(path=self._path)
+
+    def get_tiling_capabilities(self):
+        return TilingCapabilities(fixed=self._fixed_tileshape, sig_tiles=True)
+
+    def check_valid(self):
+        try:
+            data = self.get_reader().data
+            if self.shape.size != data.size:
+                raise DataSetException(
+                    "scan_size %r does not match shape %r" % (self._scan_size, data.shape)
+                )
+            return True
+        except (IOError, OSError, ValueError) as e:
+            raise DataSetException("invalid dataset: %s" % e)
+
+    def get_partitions(self):
+        ds_slice = Slice(origin=tuple([0] * self.raw_shape.dims), shape=self.raw_shape)
+        partition_shape = self.get_planner().get_partition_shape(self.raw_shape, self.dtype)
+        for pslice in ds_slice.subslices(partition_shape):
+            yield MemoryPartition(
+                tileshape=Shape(self._tileshape, sig_dims=self._sig_dims),
+                meta=self._meta,
+                reader=self.get_reader(),
+                partition_slice=pslice,
+            )
+
+    def __repr__(self):
+        return "<NPYDataSet of %s shape=%s>" % (self.dtype, self.shape)
@@ -1,6 +1,11 @@
+import os
+import json
+
 import numpy as np
 
 from libertem.common import Slice, Shape
+from libertem.io.tiling import TilingCapabilities
+from libertem.io.live import LiveAcquisition
 from .base import DataSet, Partition, DataTile, DataSetException, DataSetMeta
 
 
@@ -17,15 +22,56 @@ class RawFileReader(object):
         ds_slice = Slice(origin=(0, 0, 0, 0), shape=self._meta.shape)
         return f[ds_slice.get()]  # crop off the two extra rows
 
+    def _frame_size(self):
+        return int(np.prod(self._detector_size_raw)) * self._meta.dtype.itemsize
+
+    def num_frames_written(self):
+        try:
+            return os.stat(self._path).st_size // self._frame_size()
+        except (IOError, OSError):
+            return 0
+
+    def open_frames(self, num_frames):
+        """
+        map the first ``num_frames`` frames of a file that may still be written,
+        as an array of shape (num_frames,) + detector_size_raw
+        """
+        return np.memmap(self._path, dtype=self._meta.dtype, mode='r',
+                         shape=(num_frames,) + self._detector_size_raw)
+
 
 class RawFileDataSet(DataSet):
-    def __init__(self, path, scan_size, dtype, detector_size_raw, crop_detector_to, tileshape=None):
+    def __init__(self, path, scan_size, dtype, detector_size_raw, crop_detector_to, tileshape=None,
+                 live=False, live_timeout=60):
+        """
+        Read a file of frames without headers
+
+        Parameters
+        ----------
+        path : str
+            path to the file
+        scan_size : tuple of int
+            the scan size
+        dtype : numpy.dtype or str
+            data type of the file
+        detector_size_raw : tuple of int
+            frame size in the file
+        crop_detector_to : tuple of int
+            crop the frames to this size
+        tileshape : tuple of int or None
+            by default, the tiles are negotiated with the job
+        live : bool
+            the file is still being written: jobs wait for frames that are not
+            written yet, see ``get_progress``
+        live_timeout : float
+            in live mode, give up if no new frames arrive for this many seconds
+        """
         self._path = path
         self._scan_size = tuple(scan_size)
         assert len(detector_size_raw) == 2
         self._detector_size_raw = tuple(detector_size_raw)  # example: (130, 128)
         self._detector_size = tuple(crop_detector_to)                # example: (128, 128)
-        self._min_num_partitions = None  # FIXME
+        self._fixed_tileshape = tileshape is not None
         if tileshape is None:
             # raw files are memory mapped -> works well with large tiles
             # (actual tiles are then as large as the partitions)
@@ -37,10 +83,56 @@ class RawFileDataSet(DataSet):
             raw_shape=Shape(self._scan_size + self._detector_size, sig_dims=self._sig_dims),
             dtype=np.dtype(dtype)
         )
+        self._acquisition = None
+        if live:
+            self._acquisition = LiveAcquisition(
+                num_frames=self._meta.shape.nav.size, timeout=live_timeout,
+            )
 
     def initialize(self):
         return self
 
+    @classmethod
+    def detect_params(cls, path):
+        """
+        Detect the output of ``ConvertJob`` with ``output_format="raw"``: a directory
+        with an index.json that describes a single raw file
+        """
+        if os.path.isdir(path):
+            path = os.path.join(path, "index.json")
+        if os.path.basename(path) != "index.json":
+            return False
+        try:
+            with open(path, "r") as f:
+                index = json.load(f)
+        except (IOError, OSError, ValueError):
+            return False
+        if index.get('mode') != 'raw':
+            return False
+        # RawFileDataSet only supports 2D scans of 2D frames:
+        if index.get('sig_dims') != 2 or len(index['shape']) != 4:
+            return False
+        detector_size = tuple(index['shape'][2:])
+        return {
+            "path": os.path.join(os.path.dirname(path), index['filename']),
+            "scan_size": tuple(index['shape'][:2]),
+            "dtype": index['dtype'],
+            "detector_size_raw": detector_size,
+            "crop_detector_to": detector_size,
+        }
+
+    def get_progress(self):
+        """
+        How much of a live acquisition is written
+
+        Returns
+        -------
+        dict
+            see ``LiveAcquisition.get_progress``
+        """
+        acquisition = self._acquisition or LiveAcquisition(num_frames=self.shape.nav.size)
+        return acquisition.get_progress(self.get_reader().num_frames_written())
+
     @property
     def dtype(self):
         return self._meta.dtype
@@ -64,6 +156,10 @@ class RawFileDataSet(DataSet):
     def check_valid(self):
         try:
             reader = self.get_reader()
+            if self._acquisition is not None:
+                if not os.path.exists(self._path):
+                    raise DataSetException("file %s does not exist" % self._path)
+                return True
             reader.open_file()
             # TODO: check file size match
             # TODO: try to read from file?
@@ -71,22 +167,24 @@ class RawFileDataSet(DataSet):
         except (IOError, OSError, ValueError) as e:
             raise DataSetException("invalid dataset: %s" % e)
 
+    def get_tiling_capabilities(self):
+        # tiles are views into the memory map, so they can have any shape:
+        return TilingCapabilities(fixed=self._fixed_tileshape, sig_tiles=True)
+
     def get_partitions(self):
         ds_slice = Slice(origin=(0, 0, 0, 0), shape=self.shape)
         partition_shape = self.partition_shape(
             datashape=self.shape,
             framesize=self._detector_size[0] * self._detector_size[1],
             dtype=self.dtype,
-            target_size=256*1024*1024,
-            min_num_partitions=self._min_num_partitions,
         )
         for pslice in ds_slice.subslices(partition_shape):
-            # TODO: where should the tileshape be set? let the user choose for now
             yield RawFilePartition(
                 tileshape=self._tileshape,
                 meta=self._meta,
                 reader=self.get_reader(),
                 partition_slice=pslice,
+                acquisition=self._acquisition,
             )
 
     def __repr__(self):
@@ -94,24 +192,74 @@ class RawFileDataSet(DataSet):
 
 
 class RawFilePartition(Partition):
-    def __init__(self, tileshape, reader, *args, **kwargs):
+    def __init__(self, tileshape, reader, *args, acquisition=None, **kwargs):
         self.tileshape = tileshape
         self.reader = reader
+        self._acquisition = acquisition
         super().__init__(*args, **kwargs)
 
-    def get_tiles(self, crop_to=None):
-        if crop_to is not None:
-            if crop_to.shape.sig != self.meta.shape.sig:
-                raise DataSetException("RawFileDataSet only supports whole-frame crops for now")
-        f = self.reader.open_file()
-        subslices = list(self.slice.subslices(shape=self.tileshape))
+    def get_paths(self):
+        return [self.reader._path]
+
+    def _crop_sig(self, tile_slice, intersection):
+        """
+        restrict the signal part of ``tile_slice`` to the signal part of ``intersection``
+        """
+        nav_dims = tile_slice.shape.nav.dims
+        return Slice(
+            origin=tile_slice.origin[:nav_dims] + intersection.origin[nav_dims:],
+            shape=Shape(
+                tuple(tile_slice.shape.nav) + tuple(intersection.shape.sig),
+                sig_dims=tile_slice.shape.sig.dims
+            ),
+        )
+
+    def get_tiles(self, crop_to=None, tiling=None):
+        crop_sig = crop_to is not None and crop_to.shape.sig != self.meta.shape.sig
+        tileshape = self.tileshape
+        if tiling is not None:
+            tileshape = tiling.get_tileshape(self.shape)
+        if self._acquisition is None:
+            f = self.reader.open_file()
+        else:
+            frames = None
+        subslices = list(self.slice.subslices(shape=tileshape))
         for tile_slice in subslices:
             if crop_to is not None:
                 intersection = tile_slice.intersection_with(crop_to)
                 if intersection.is_null():
                     continue
-            # NOTE: no need to re-use buffer, as there is none (mmap!)
+            if crop_sig:
+                tile_slice = self._crop_sig(tile_slice, intersection)
+            if self._acquisition is not None:
+                data, frames = self._get_live_data(tile_slice, frames)
+            else:
+                # NOTE: no need to re-use buffer, as there is none (mmap!)
+                data = f[tile_slice.get()]
             yield DataTile(
-                data=f[tile_slice.get()],
+                data=data,
                 tile_slice=tile_slice
             )
+
+    def _get_live_data(self, tile_slice, frames):
+        """
+        wait until the frames of ``tile_slice`` are written, and read them from
+        ``frames``, the frames that were mapped for the previous tile, if any
+
+        Returns
+        -------
+        (numpy.ndarray, numpy.ndarray)
+            the data of the tile, and the frames that are mapped now
+        """
+        frame_idx = tile_slice.get_frame_indices(self.meta.shape.nav)
+        start, stop = int(frame_idx.flat[0]), int(frame_idx.flat[-1]) + 1
+        if frames is None or frames.shape[0] < stop:
+            # map the file again only if it grew past the frames we mapped before:
+            num_written = self._acquisition.wait_for(stop, self.reader.num_frames_written)
+            frames = self.reader.open_frames(min(num_written, self.meta.shape.nav.size))
+        if frame_idx.size == stop - start:
+            data = frames[start:stop]
+        else:
+            data = frames[frame_idx.reshape((-1,))]
+        data = data.reshape(tuple(tile_slice.shape.nav) + data.shape[1:])
+        return data[(Ellipsis,) + tile_slice.get(sig_only=True)], frames
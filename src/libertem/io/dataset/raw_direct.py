@@ -5,6 +5,7 @@ import os
 import numpy as np
 
 from libertem.common import Slice, Shape
+from libertem.io.tiling import TilingCapabilities
 from .base import DataSet, Partition, DataTile, DataSetException, DataSetMeta
 from libertem.io.direct import open_direct, empty_aligned, readinto_direct
 
@@ -52,7 +53,8 @@ class DirectRawFileReader(object):
 
 
 class DirectRawFileDataSet(DataSet):
-    def __init__(self, path, scan_size, dtype, detector_size, stackheight, enable_direct=True):
+    def __init__(self, path, scan_size, dtype, detector_size, stackheight=None,
+                 enable_direct=True):
         self._path = path
         self._scan_size = tuple(scan_size)
         self._detector_size = detector_size
@@ -100,24 +102,17 @@ class DirectRawFileDataSet(DataSet):
         except (IOError, OSError, ValueError) as e:
             raise DataSetException("invalid dataset: %s" % e)
 
-    def _get_num_partitions(self):
-        """
-        returns the number of partitions the dataset should be split into
-        """
-        # let's try to aim for 1024MB per partition
-        res = max(1, self._filesize // (1024*1024*1024))
-        return res
+    def get_tiling_capabilities(self):
+        # direct I/O needs large requests to reach the full throughput of the device:
+        return TilingCapabilities(
+            fixed=self._stackheight is not None, min_size=4 * 1024 * 1024,
+        )
 
     def get_partitions(self):
         num_frames = self.shape.nav.size
-        f_per_part = num_frames // self._get_num_partitions()
-
-        c0 = itertools.count(start=0, step=f_per_part)
-        c1 = itertools.count(start=f_per_part, step=f_per_part)
-        for (start, stop) in zip(c0, c1):
-            if start >= num_frames:
-                break
-            stop = min(stop, num_frames)
+        # plan with the size of the frames on disk:
+        frame_size = self._filesize // num_frames
+        for (start, stop) in self.get_frame_ranges(num_frames, frame_size):
             part_slice = Slice(
                 origin=(
                     start, 0, 0,
@@ -126,7 +121,8 @@ class DirectRawFileDataSet(DataSet):
                             sig_dims=self.shape.sig.dims)
             )
             yield DirectRawFilePartition(
-                stackheight=self._stackheight,
+                # used if the tiles are not negotiated with the job:
+                stackheight=self._stackheight or max(1, (4 * 1024 * 1024) // frame_size),
                 meta=self._meta,
                 reader=self.get_reader(),
                 partition_slice=part_slice,
@@ -146,13 +142,18 @@ class DirectRawFilePartition(Partition):
         self.num_frames = num_frames
         super().__init__(*args, **kwargs)
 
-    def get_tiles(self, crop_to=None):
+    def get_paths(self):
+        return [self.reader._path]
+
+    def get_tiles(self, crop_to=None, tiling=None):
         if crop_to is not None:
             if crop_to.shape.sig != self.meta.shape.sig:
                 raise DataSetException(
                     "DirectRawFileDataSet only supports whole-frame crops for now"
                 )
         stackheight = self.stackheight
+        if tiling is not None:
+            stackheight = tiling.depth
         start_frame = self.start_frame
         num_frames = self.num_frames
         shape_sig = tuple(self.shape.sig)
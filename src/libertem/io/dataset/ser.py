@@ -1,13 +1,13 @@
 import os
 import math
 import logging
-import itertools
 import contextlib
 
 import numpy as np
 from ncempy.io.ser import fileSER
 
 from libertem.common import Slice, Shape
+from libertem.io.tiling import TilingCapabilities
 from .base import DataSet, Partition, DataTile, DataSetException, DataSetMeta
 
 log = logging.getLogger(__name__)
@@ -104,24 +104,15 @@ class SERDataSet(DataSet):
         except (IOError, OSError) as e:
             raise DataSetException("invalid dataset: %s" % e) from e
 
-    def _get_num_partitions(self):
-        """
-        returns the number of partitions the dataset should be split into
-        """
-        # let's try to aim for 512MB per partition
-        res = max(1, self._filesize // (512*1024*1024))
-        return res
+    def get_tiling_capabilities(self):
+        # frames are read whole, and cropped afterwards:
+        return TilingCapabilities()
 
     def get_partitions(self):
         num_frames = self.shape.nav.size
-        f_per_part = num_frames // self._get_num_partitions()
-
-        c0 = itertools.count(start=0, step=f_per_part)
-        c1 = itertools.count(start=f_per_part, step=f_per_part)
-        for (start, stop) in zip(c0, c1):
-            if start >= num_frames:
-                break
-            stop = min(stop, num_frames)
+        # plan with the size of the frames on disk:
+        frame_size = self._filesize // num_frames
+        for (start, stop) in self.get_frame_ranges(num_frames, frame_size):
             part_slice = Slice(
                 origin=(
                     start, 0, 0,
@@ -148,15 +139,21 @@ class SERPartition(Partition):
         self._num_frames = num_frames
         super().__init__(*args, **kwargs)
 
+    def get_paths(self):
+        return [self._reader._path]
+
     def _get_stackheight(self, target_size=1 * 1024 * 1024):
-        # FIXME: centralize this decision and make it tunable
+        # used if the tiles are not negotiated with the job
         framesize = self.meta.shape.sig.size * self.dtype.itemsize
-        return min(1, math.floor(target_size / framesize))
+        return max(1, math.floor(target_size / framesize))
 
-    def get_tiles(self, crop_to=None):
+    def get_tiles(self, crop_to=None, tiling=None):
         start_at_frame = self._start_frame
         num_frames = self._num_frames
-        stackheight = self._get_stackheight()
+        if tiling is not None:
+            stackheight = tiling.depth
+        else:
+            stackheight = self._get_stackheight()
         dtype = self.dtype
         sig_shape = self.meta.shape.sig
         sig_origin = tuple([0] * len(sig_shape))
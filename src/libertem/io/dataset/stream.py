@@ -0,0 +1,447 @@
+import time
+import socket
+import logging
+import threading
+
+import numpy as np
+
+from libertem.common import Slice, Shape
+from libertem.io.tiling import TilingCapabilities
+from libertem.io.live import LiveAcquisition
+from .base import DataSet, Partition, DataTile, DataSetException, DataSetMeta
+from .mib import MIBFile, get_header_size, parse_header, decode_frame
+
+log = logging.getLogger(__name__)
+
+# messages are prefixed with "MPX,<length>,", the length has ten digits:
+MESSAGE_PREFIX = b"MPX,"
+MESSAGE_PREFIX_SIZE = len(MESSAGE_PREFIX) + 11
+
+
+def _recv_exactly(sock, size):
+    buf = bytearray(size)
+    view = memoryview(buf)
+    pos = 0
+    while pos < size:
+        num = sock.recv_into(view[pos:])
+        if num == 0:
+            raise EOFError("connection closed")
+        pos += num
+    return buf
+
+
+def read_message(sock):
+    """
+    Read one message of the Merlin TCP protocol: an acquisition header, starting with
+    ``HDR``, or a frame, consisting of a frame header and the pixel data
+    """
+    prefix = _recv_exactly(sock, MESSAGE_PREFIX_SIZE)
+    if not prefix.startswith(MESSAGE_PREFIX):
+        raise DataSetException("invalid message prefix: %r" % bytes(prefix))
+    length = int(prefix[len(MESSAGE_PREFIX):-1])
+    return _recv_exactly(sock, length)
+
+
+def make_message(payload):
+    return MESSAGE_PREFIX + b"%010d," % len(payload) + payload
+
+
+class FrameStream(object):
+    def __init__(self, host, port, num_frames, buffer_size, timeout):
+        """
+        Receives the frames of a stream in a background thread, and decodes them into a
+        ring buffer. Readers have to read the frames in order; the frames before the
+        last frame that was read are dropped, so the receiver can continue.
+
+        Parameters
+        ----------
+        host : str
+        port : int
+        num_frames : int
+            number of frames of the acquisition
+        buffer_size : int
+            size of the ring buffer in bytes
+        timeout : float
+            give up if no new frames arrive for this many seconds
+        """
+        self._host = host
+        self._port = port
+        self._num_frames = num_frames
+        self._buffer_size = buffer_size
+        self._timeout = timeout
+        self._cond = threading.Condition()
+        self._received = 0
+        self._released = 0
+        self._error = None
+        self._closed = False
+        self._sock = None
+        self._thread = None
+        self.fields = None
+        self.buffer = None
+
+    def connect(self):
+        """
+        connect, and read the first frame, which tells us the shape and dtype of
+        the frames
+        """
+        try:
+            self._sock = socket.create_connection((self._host, self._port),
+                                                  timeout=self._timeout)
+            message = read_message(self._sock)
+            while message.startswith(b"HDR"):
+                message = read_message(self._sock)
+        except (OSError, EOFError) as e:
+            raise DataSetException("could not connect to %s:%d: %s" % (
+                self._host, self._port, e
+            ))
+        self.fields = parse_header(bytes(message[:get_header_size(bytes(message[:100]))]))
+        frame_size = (
+            int(np.prod(self.fields['image_size'])) * np.dtype(self.fields['dtype']).itemsize
+        )
+        num_slots = max(1, min(self._num_frames, self._buffer_size // frame_size))
+        self.buffer = np.zeros((num_slots,) + self.fields['image_size'],
+                               dtype=self.fields['dtype'])
+        self._decode(message, 0)
+        self._received = 1
+        self._thread = threading.Thread(target=self._receive, daemon=True)
+        self._thread.start()
+        return self
+
+    @property
+    def num_slots(self):
+        return self.buffer.shape[0]
+
+    def _decode(self, message, idx):
+        data = np.frombuffer(message, dtype=np.uint8)[self.fields['header_size_bytes']:]
+        decode_frame(self.fields, data, self.buffer[idx % self.num_slots])
+
+    def _receive(self):
+        try:
+            while self._received < self._num_frames:
+                message = read_message(self._sock)
+                if message.startswith(b"HDR"):
+                    continue
+                with self._cond:
+                    # wait until the slot of the frame is free:
+                    while self._received - self._released >= self.num_slots:
+                        if self._closed:
+                            return
+                        self._cond.wait()
+                self._decode(message, self._received)
+                with self._cond:
+                    self._received += 1
+                    self._cond.notify_all()
+        except Exception as e:
+            with self._cond:
+                if not self._closed:
+                    self._error = e
+                self._cond.notify_all()
+        finally:
+            self._sock.close()
+
+    def read_frames(self, start, out):
+        """
+        Wait for the frames [start, start + len(out)) and copy them to ``out``. The
+        frames before ``start + len(out)`` can't be read again afterwards.
+        """
+        stop = start + out.shape[0]
+        if out.shape[0] > self.num_slots:
+            raise DataSetException("can't read more than %d frames at once" % self.num_slots)
+        with self._cond:
+            if start < self._released:
+                raise DataSetException(
+                    "frame %d was already read, streams can only be read once, "
+                    "in order" % start
+                )
+            # make room for the frames we are waiting for:
+            self._released = max(self._released, stop - self.num_slots)
+            self._cond.notify_all()
+            received = self._received
+            last_change = time.monotonic()
+            while self._received < stop:
+                if self._error is not None:
+                    raise DataSetException("error receiving frames: %s" % self._error)
+                if self._received != received:
+                    received = self._received
+                    last_change = time.monotonic()
+                remaining = self._timeout - (time.monotonic() - last_change)
+                if remaining <= 0:
+                    raise DataSetException(
+                        "no new frames for %ds, %d of %d frames received" % (
+                            self._timeout, received, self._num_frames
+                        )
+                    )
+                self._cond.wait(timeout=remaining)
+            idx = np.arange(start, stop) % self.num_slots
+            out[:] = self.buffer[idx]
+            self._released = stop
+            self._cond.notify_all()
+        return out
+
+    @property
+    def num_received(self):
+        return self._received
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        try:
+            self._sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+
+# the streams of this process, by their id; sockets can't be
+# sent to other processes, so the partitions look them up here:
+_streams = {}
+
+
+class StreamDataSet(DataSet):
+    def __init__(self, host, port, scan_size, buffer_size=256*1024*1024, timeout=60):
+        """
+        Receive frames from a detector that streams them over TCP, using the framing
+        of the Merlin TCP protocol. The frames are processed in the order in which
+        they arrive, and each stream can only be processed by a single job.
+        The stream is received in the process that initializes the dataset, so jobs
+        have to run in that process, for example with the ``InlineJobExecutor``.
+        Use ``Context.run_iter`` to get results while the frames arrive.
+
+        Parameters
+        ----------
+        host : str
+            host of the detector
+        port : int
+            port of the detector
+        scan_size : tuple of int
+            the scan size
+        buffer_size : int
+            size of the ring buffer for the received frames, in bytes
+        timeout : float
+            give up if no new frames arrive for this many seconds
+        """
+        self._host = host
+        self._port = port
+        self._scan_size = tuple(scan_size)
+        self._buffer_size = buffer_size
+        self._timeout = timeout
+        self._sig_dims = 2
+        self._stream_id = None
+        self._num_slots = None
+        self._meta = None
+
+    def initialize(self):
+        stream = FrameStream(
+            host=self._host, port=self._port, num_frames=int(np.prod(self._scan_size)),
+            buffer_size=self._buffer_size, timeout=self._timeout,
+        ).connect()
+        self._stream_id = id(stream)
+        _streams[self._stream_id] = stream
+        self._num_slots = stream.num_slots
+        shape = Shape(self._scan_size + stream.fields['image_size'], sig_dims=self._sig_dims)
+        self._meta = DataSetMeta(
+            shape=shape,
+            raw_shape=shape.flatten_nav(),
+            dtype=stream.fields['dtype'],
+        )
+        return self
+
+    @classmethod
+    def detect_params(cls, path):
+        return False
+
+    @property
+    def dtype(self):
+        return self._meta.dtype
+
+    @property
+    def shape(self):
+        return self._meta.shape
+
+    @property
+    def raw_shape(self):
+        return self._meta.raw_shape
+
+    def check_valid(self):
+        return True
+
+    def get_progress(self):
+        """
+        How many frames were received
+
+        Returns
+        -------
+        dict
+            see ``LiveAcquisition.get_progress``
+        """
+        acquisition = LiveAcquisition(num_frames=self.shape.nav.size)
+        return acquisition.get_progress(_get_stream(self._stream_id).num_received)
+
+    def close(self):
+        """
+        close the connection
+        """
+        stream = _streams.pop(self._stream_id, None)
+        if stream is not None:
+            stream.close()
+
+    def get_tiling_capabilities(self):
+        # tiles can't be larger than the ring buffer:
+        return TilingCapabilities(max_depth=self._num_slots)
+
+    def get_partitions(self):
+        num_frames = self.shape.nav.size
+        frame_size = self.raw_shape.sig.size * self.dtype.itemsize
+        for (start, stop) in self.get_frame_ranges(num_frames, frame_size):
+            pslice = Slice(
+                origin=(start, 0, 0),
+                shape=Shape((stop - start,) + tuple(self.raw_shape.sig), sig_dims=self._sig_dims),
+            )
+            yield StreamPartition(
+                stream_id=self._stream_id,
+                num_slots=self._num_slots,
+                meta=self._meta,
+                partition_slice=pslice,
+            )
+
+    def __repr__(self):
+        return "<StreamDataSet %s:%d shape=%s>" % (self._host, self._port, self.shape)
+
+
+def _get_stream(stream_id):
+    try:
+        return _streams[stream_id]
+    except KeyError:
+        raise DataSetException(
+            "the stream is not open in this process; stream datasets have to be "
+            "processed in the process that initialized them"
+        )
+
+
+class StreamPartition(Partition):
+    def __init__(self, stream_id, num_slots, *args, **kwargs):
+        self._stream_id = stream_id
+        self._num_slots = num_slots
+        super().__init__(*args, **kwargs)
+
+    def get_paths(self):
+        return []
+
+    def get_locations(self):
+        return None
+
+    def split(self, num_parts, min_frames=1):
+        # the frames can only be read in order:
+        return [self]
+
+    def get_tiles(self, crop_to=None, tiling=None):
+        stream = _get_stream(self._stream_id)
+        if tiling is not None:
+            stackheight = tiling.depth
+        else:
+            stackheight = min(8, self._num_slots)
+        sig_shape = tuple(self.shape.sig)
+        start_frame = self.slice.origin[0]
+        num_frames = self.shape[0]
+        data_full = np.zeros((stackheight,) + sig_shape, dtype=self.dtype)
+        for offset in range(0, num_frames, stackheight):
+            num = min(stackheight, num_frames - offset)
+            data = data_full[:num]
+            tile_slice = Slice(
+                origin=(start_frame + offset, 0, 0),
+                shape=Shape((num,) + sig_shape, sig_dims=self.shape.sig.dims),
+            )
+            if crop_to is not None:
+                intersection = tile_slice.intersection_with(crop_to)
+                if intersection.is_null():
+                    continue
+            stream.read_frames(start_frame + offset, data)
+            if crop_to is not None and crop_to.shape.sig != self.shape.sig:
+                data = data[(Ellipsis,) + crop_to.get(sig_only=True)]
+                tile_slice = Slice(
+                    origin=(start_frame + offset,) + tuple(crop_to.origin[1:]),
+                    shape=Shape((num,) + tuple(crop_to.shape.sig),
+                                sig_dims=self.shape.sig.dims),
+                )
+            yield DataTile(data=data, tile_slice=tile_slice)
+
+
+class ReplayServer(object):
+    def __init__(self, paths, host="127.0.0.1", port=0, frame_delay=0):
+        """
+        A stand-in for a detector, for testing: sends the frames of MIB files to each
+        client that connects, using the framing of the Merlin TCP protocol
+
+        Parameters
+        ----------
+        paths : list of str
+            the .mib files, they are sent in the order of their sequence numbers
+        host : str
+            address to listen on
+        port : int
+            port to listen on, by default a free port is chosen, see ``port``
+        frame_delay : float
+            seconds to wait between frames
+        """
+        self._files = list(sorted(
+            (MIBFile(path) for path in paths),
+            key=lambda f: f.fields['sequence_first_image'],
+        ))
+        self._host = host
+        self._port = port
+        self._frame_delay = frame_delay
+        self._sock = None
+        self._thread = None
+        self._stopped = threading.Event()
+
+    @property
+    def port(self):
+        return self._sock.getsockname()[1]
+
+    def start(self):
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._sock.bind((self._host, self._port))
+        self._sock.listen(1)
+        # so the server notices when it is stopped:
+        self._sock.settimeout(0.1)
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+        return self
+
+    def _serve(self):
+        while not self._stopped.is_set():
+            try:
+                conn, addr = self._sock.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                return
+            conn.settimeout(None)
+            with conn:
+                try:
+                    self._send(conn)
+                except OSError as e:
+                    log.info("client %s disconnected: %s", addr, e)
+
+    def _send(self, conn):
+        conn.sendall(make_message(b"HDR,\n"))
+        for f in self._files:
+            fields = f.fields
+            frame_size = fields['header_size_bytes'] + fields['image_size_bytes']
+            with open(f.path, "rb") as fh:
+                for i in range(fields['num_images']):
+                    if self._stopped.wait(self._frame_delay):
+                        return
+                    conn.sendall(make_message(fh.read(frame_size)))
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+        self._sock.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,104 @@
+import os
+import json
+import collections
+
+import numpy as np
+
+from libertem.io.codecs import default_codec, get_codec_pool, get_codec_threads
+from libertem.io.dataset.chunked import make_index, encode_chunk
+
+
+def read_frames(data, start, stop, sig_dims=2):
+    """
+    read frames ``start:stop`` from ``data`` (numpy array or h5py dataset),
+    counting frames over the flattened navigation dimensions
+    """
+    nav_dims = len(data.shape) - sig_dims
+    sig_shape = tuple(data.shape[nav_dims:])
+    if nav_dims == 1:
+        return np.asarray(data[start:stop])
+    row_size = int(np.prod(data.shape[1:nav_dims], dtype=np.int64))
+    first_row = start // row_size
+    last_row = (stop + row_size - 1) // row_size
+    rows = np.asarray(data[first_row:last_row]).reshape((-1,) + sig_shape)
+    offset = first_row * row_size
+    return rows[start - offset:stop - offset]
+
+
+class ChunkedSink(object):
+    def __init__(self, codec=None, shuffle=True, chunk_size=4*1024*1024):
+        """
+        Write data to a local directory in the LiberTEM chunked format,
+        which can be read with ``ChunkedDataSet``
+
+        Parameters
+        ----------
+        codec : str or None
+            compression codec, by default the fastest one available
+        shuffle : bool
+            byte shuffle before compressing (default True)
+        chunk_size : int
+            approximate uncompressed size of each chunk in bytes
+        """
+        self.codec = codec or default_codec()
+        self.shuffle = shuffle
+        self.chunk_size = chunk_size
+
+    def prepare_output(self, output_path):
+        os.makedirs(output_path, exist_ok=True)
+
+    def make_index(self, data, dtype, min_num_partitions=None, target_size=None):
+        """
+        create the json-serializable index structure. partitions are formed
+        when reading, so ``min_num_partitions`` and ``target_size`` are
+        only accepted for compatibility with the other sinks
+        """
+        sig_dims = 2
+        frame_bytes = int(np.prod(data.shape[-sig_dims:])) * np.dtype(dtype).itemsize
+        return make_index(
+            shape=data.shape,
+            dtype=dtype,
+            sig_dims=sig_dims,
+            codec=self.codec,
+            shuffle=self.shuffle,
+            chunk_frames=max(1, self.chunk_size // frame_bytes),
+        )
+
+    def _write_chunk(self, data, filename, dtype):
+        data = data.astype(dtype, copy=False)
+        encoded = encode_chunk(data, codec=self.codec, shuffle_bytes=self.shuffle)
+        with open(filename, "wb") as f:
+            f.write(encoded)
+
+    def write_partitions(self, idx, dataset, output_path, dtype):
+        """
+        compress and write all chunks; reading happens in this thread, while
+        converting, compressing and writing happens in a thread pool
+        """
+        pool = get_codec_pool()
+        max_pending = 2 * get_codec_threads()
+        pending = collections.deque()
+        try:
+            for chunk in idx["chunks"]:
+                data = read_frames(
+                    dataset, chunk['start'], chunk['start'] + chunk['num_frames'],
+                    sig_dims=idx['sig_dims'],
+                )
+                pending.append(pool.submit(
+                    self._write_chunk,
+                    data=data,
+                    filename=os.path.join(output_path, chunk["filename"]),
+                    dtype=dtype,
+                ))
+                while len(pending) >= max_pending:
+                    pending.popleft().result()
+        finally:
+            for future in pending:
+                future.result()
+
+    def write_index(self, idx, output_filename):
+        """
+        write json-serializable ``idx`` to ``output_filename``
+        """
+        with open(output_filename, "w") as f:
+            json.dump(idx, f)
@@ -1,7 +1,27 @@
+import json
+
 import click
+import numpy as np
+
 from libertem.cli_tweaks import console_tweaks
+from libertem.api import Context
+from libertem.executor.dask import DaskJobExecutor
+from libertem.executor.inline import InlineJobExecutor
+from libertem.io.dataset import detect
+from libertem.job.convert import ConvertJob
 from .hdf5 import H5Ingestor
 from .empad import EMPADIngestor
+from .chunked import ChunkedSink
+from .sink import LocalBinarySink
+
+
+def _make_sink(output_format, codec):
+    if output_format == "chunked":
+        return ChunkedSink(codec=codec)
+    elif output_format == "local":
+        return LocalBinarySink()
+    # the ingestors create their HDFS sink themselves
+    return None
 
 
 @click.group()
@@ -12,7 +32,7 @@ def main():
 @main.command()
 @click.argument('input_filename', type=click.Path())
 @click.argument('input_dataset_path')
-@click.argument('output_path_hdfs')
+@click.argument('output_path')
 @click.option('--namenode-host', help='hostname of your HDFS namenode', default='localhost')
 @click.option('--namenode-port', help='port of your HDFS namenode', default=8020, type=int)
 @click.option('--replication', help='number of HDFS replicas', default=3, type=int)
@@ -22,23 +42,31 @@ def main():
               help='partition size in MB; large enough for low overhead, '
                    'small enough for fast feedback',
               default=512)
-def hdf5(input_filename, input_dataset_path, output_path_hdfs,
+@click.option('--output-format',
+              help='write to HDFS, or to a local directory as raw partitions (local) '
+                   'or in the compressed chunked format (chunked)',
+              default='hdfs', type=click.Choice(['hdfs', 'local', 'chunked']))
+@click.option('--codec', help='compression codec for the chunked format (default: fastest '
+                              'available)', default=None)
+def hdf5(input_filename, input_dataset_path, output_path,
          namenode_host, namenode_port, replication, dest_dtype,
-         target_partition_size):
+         target_partition_size, output_format, codec):
     """
     Ingest the dataset at INPUT_DATASET_PATH in INPUT_FILENAME and save
-    it to HDFS at OUTPUT_PATH_HDFS (will be created as a directory)
+    it to HDFS at OUTPUT_PATH_HDFS (will be created as a directory); with
+    --output-format=local or chunked, OUTPUT_PATH_HDFS is a local directory instead
     """
     console_tweaks()
     i = H5Ingestor(
         namenode=namenode_host,
         namenode_port=namenode_port,
         replication=replication,
+        sink=_make_sink(output_format, codec),
     )
     i.main(
         input_filename=input_filename,
         input_dataset_path=input_dataset_path,
-        output_path_hdfs=output_path_hdfs,
+        output_path=output_path,
         dest_dtype=dest_dtype,
         target_partition_size=target_partition_size*1024*1024,
     )
@@ -46,7 +74,7 @@ def hdf5(input_filename, input_dataset_path, output_path_hdfs,
 
 @main.command()
 @click.argument('input_filename', type=click.Path())
-@click.argument('output_path_hdfs')
+@click.argument('output_path')
 @click.option('--namenode-host', help='hostname of your HDFS namenode', default='localhost')
 @click.option('--namenode-port', help='port of your HDFS namenode', default=8020, type=int)
 @click.option('--replication', help='number of HDFS replicas', default=3, type=int)
@@ -59,12 +87,19 @@ def hdf5(input_filename, input_dataset_path, output_path_hdfs,
               help='partition size in MB; large enough for low overhead, '
                    'small enough for fast feedback',
               default=512)
-def empad(input_filename, output_path_hdfs, shape_in, src_dtype, crop_to,
+@click.option('--output-format',
+              help='write to HDFS, or to a local directory as raw partitions (local) '
+                   'or in the compressed chunked format (chunked)',
+              default='hdfs', type=click.Choice(['hdfs', 'local', 'chunked']))
+@click.option('--codec', help='compression codec for the chunked format (default: fastest '
+                              'available)', default=None)
+def empad(input_filename, output_path, shape_in, src_dtype, crop_to,
          namenode_host, namenode_port, replication, dest_dtype,
-         target_partition_size):
+         target_partition_size, output_format, codec):
     """
     Ingest the dataset in INPUT_FILENAME and save
-    it to HDFS at OUTPUT_PATH_HDFS (will be created as a directory)
+    it to HDFS at OUTPUT_PATH_HDFS (will be created as a directory); with
+    --output-format=local or chunked, OUTPUT_PATH_HDFS is a local directory instead
     """
     # TODO: maybe read the XML file to find scan dimensions etc.?
     console_tweaks()
@@ -72,13 +107,90 @@ def empad(input_filename, output_path_hdfs, shape_in, src_dtype, crop_to,
         namenode=namenode_host,
         namenode_port=namenode_port,
         replication=replication,
+        sink=_make_sink(output_format, codec),
     )
     i.main(
         input_filename=input_filename,
-        output_path_hdfs=output_path_hdfs,
+        output_path=output_path,
         dest_dtype=dest_dtype,
         target_partition_size=target_partition_size*1024*1024,
         shape_in=tuple(int(p) for p in shape_in.split(",")),
         src_dtype=src_dtype,
         crop_to=tuple(int(p) for p in crop_to.split(",")),
     )
+
+
+def _parse_params(params):
+    result = {}
+    for param in params:
+        key, value = param.split("=", 1)
+        try:
+            result[key] = json.loads(value)
+        except ValueError:
+            result[key] = value
+    return result
+
+
+@main.command()
+@click.argument('input_path', type=click.Path())
+@click.argument('output_path', type=click.Path())
+@click.option('--type', 'filetype', help='type of the input dataset, detected if not given',
+              default=None)
+@click.option('--param', 'params', multiple=True,
+              help='additional parameter for the input dataset as key=value, with the value '
+                   'parsed as JSON if possible; can be given multiple times')
+@click.option('--dest-dtype', help='destination datatype, if your data should be converted',
+              default=None)
+@click.option('--crop', help='crop frames to y,x,height,width', default=None)
+@click.option('--dark', help='.npy file with a dark frame to subtract',
+              type=click.Path(exists=True), default=None)
+@click.option('--gain', help='.npy file with a gain map to multiply with',
+              type=click.Path(exists=True), default=None)
+@click.option('--output-format', help='a single raw file, or the compressed chunked format',
+              default='raw', type=click.Choice(['raw', 'chunked']))
+@click.option('--codec', help='compression codec for the chunked format (default: fastest '
+                              'available)', default=None)
+@click.option('--scheduler', help='address of the dask scheduler to use, or "inline" to convert '
+                                  'in this process; by default a local cluster is started',
+              default=None)
+def convert(input_path, output_path, filetype, params, dest_dtype, crop, dark, gain,
+            output_format, codec, scheduler):
+    """
+    Convert the dataset at INPUT_PATH into a layout that is fast to read, and save
+    it, together with an index.json, to OUTPUT_PATH (will be created as a directory)
+    """
+    console_tweaks()
+    dataset_params = {"path": input_path}
+    if filetype is None:
+        detected = detect(input_path)
+        if not detected:
+            raise click.UsageError("could not detect the type of %s, please use --type"
+                                   % input_path)
+        filetype = detected.pop("type")
+        dataset_params.update(detected)
+    dataset_params.update(_parse_params(params))
+    crop_origin, crop_shape = None, None
+    if crop is not None:
+        crop = tuple(int(p) for p in crop.split(","))
+        crop_origin, crop_shape = crop[:2], crop[2:]
+    if scheduler == "inline":
+        executor = InlineJobExecutor()
+    elif scheduler is not None:
+        executor = DaskJobExecutor.connect(scheduler)
+    else:
+        executor = None
+    with Context(executor=executor) as ctx:
+        ds = ctx.load(filetype, **dataset_params)
+        job = ConvertJob(
+            dataset=ds,
+            output_path=output_path,
+            dtype=dest_dtype,
+            crop_origin=crop_origin,
+            crop_shape=crop_shape,
+            dark=np.load(dark) if dark else None,
+            gain=np.load(gain) if gain else None,
+            output_format=output_format,
+            codec=codec,
+        )
+        num_frames = ctx.run(job)
+    click.echo("converted %d frames" % num_frames[0])
@@ -8,7 +8,7 @@ from .sink import HDFSBinarySink
 
 
 class EMPADIngestor(object):
-    def __init__(self, namenode='localhost', namenode_port=8020, replication=3):
+    def __init__(self, namenode='localhost', namenode_port=8020, replication=3, sink=None):
         """
         Move data from a local EMPAD raw file to a HDFS filesystem
 
@@ -20,14 +20,18 @@ class EMPADIngestor(object):
             port of the HDFS namenode (default 8020)
         replication : int
             number of replicas (default 3)
+        sink : object or None
+            write to this sink instead of HDFS, like ``LocalBinarySink`` or ``ChunkedSink``
         """
-        self.sink = HDFSBinarySink(
-            namenode=namenode,
-            namenode_port=namenode_port,
-            replication=replication
-        )
+        if sink is None:
+            sink = HDFSBinarySink(
+                namenode=namenode,
+                namenode_port=namenode_port,
+                replication=replication
+            )
+        self.sink = sink
 
-    def main(self, input_filename, output_path_hdfs, target_partition_size,
+    def main(self, input_filename, output_path, target_partition_size,
              shape_in=(256, 256, 130, 128), crop_to=(128, 128),
              src_dtype="float32", dest_dtype=None):
         """
@@ -37,8 +41,8 @@ class EMPADIngestor(object):
         ----------
         input_filename : str
             path to EMPAD raw input file
-        output_path_hdfs : str
-            output HDFS path (will be created as a directory)
+        output_path : str
+            output path, on HDFS or a local filesystem (will be created as a directory)
         src_dtype : str (default: float32)
             input datatype
         dest_dtype : str or None
@@ -50,11 +54,11 @@ class EMPADIngestor(object):
         crop_to : (int, int)
             crop frames to this sensor size
         """
-        index_fname = os.path.join(output_path_hdfs, "index.json")
+        index_fname = os.path.join(output_path, "index.json")
         with open(input_filename, mode="r") as input_f:
             in_ds = np.fromfile(input_f, dtype=src_dtype)
             in_ds = in_ds.reshape(shape_in)[:, :, :crop_to[0], :crop_to[1]]
-            self.sink.prepare_output(output_path_hdfs)
+            self.sink.prepare_output(output_path)
             s = in_ds.shape
             assert len(s) == 4
             dest_dtype = dest_dtype or in_ds.dtype
@@ -66,7 +70,7 @@ class EMPADIngestor(object):
             self.sink.write_index(idx, index_fname)
             self.sink.write_partitions(
                 idx=idx,
-                output_path_hdfs=output_path_hdfs,
+                output_path=output_path,
                 dataset=in_ds,
                 dtype=dest_dtype
             )
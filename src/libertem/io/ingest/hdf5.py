@@ -6,7 +6,7 @@ from .sink import HDFSBinarySink
 
 
 class H5Ingestor(object):
-    def __init__(self, namenode='localhost', namenode_port=8020, replication=3):
+    def __init__(self, namenode='localhost', namenode_port=8020, replication=3, sink=None):
         """
         Move data from a local HDF5 file to a HDFS filesystem
 
@@ -18,14 +18,18 @@ class H5Ingestor(object):
             port of the HDFS namenode (default 8020)
         replication : int
             number of replicas (default 3)
+        sink : object or None
+            write to this sink instead of HDFS, like ``LocalBinarySink`` or ``ChunkedSink``
         """
-        self.sink = HDFSBinarySink(
-            namenode=namenode,
-            namenode_port=namenode_port,
-            replication=replication
-        )
+        if sink is None:
+            sink = HDFSBinarySink(
+                namenode=namenode,
+                namenode_port=namenode_port,
+                replication=replication
+            )
+        self.sink = sink
 
-    def main(self, input_filename, input_dataset_path, output_path_hdfs,
+    def main(self, input_filename, input_dataset_path, output_path,
              target_partition_size, dest_dtype=None):
         """
         Ingest data from ``input_filename`` HDF5 file to HFDS
@@ -36,17 +40,17 @@ class H5Ingestor(object):
             path to HDF5 input file
         input_dataset_path : str
             path to the dataset inside the HDF5 file you want to ingest
-        output_path_hdfs : str
-            output HDFS path (will be created as a directory)
+        output_path : str
+            output path, on HDFS or a local filesystem (will be created as a directory)
         dest_dtype : str or None
             convert to this datatype while ingesting (default: keep input datatype)
         target_partition_size : int
             target partition size in bytes
         """
-        index_fname = os.path.join(output_path_hdfs, "index.json")
+        index_fname = os.path.join(output_path, "index.json")
         with h5py.File(input_filename, mode="r") as input_f:
             in_ds = input_f[input_dataset_path]
-            self.sink.prepare_output(output_path_hdfs)
+            self.sink.prepare_output(output_path)
             s = in_ds.shape
             assert len(s) == 4
             dest_dtype = dest_dtype or in_ds.dtype
@@ -58,7 +62,7 @@ class H5Ingestor(object):
             self.sink.write_index(idx, index_fname)
             self.sink.write_partitions(
                 idx=idx,
-                output_path_hdfs=output_path_hdfs,
+                output_path=output_path,
                 dataset=in_ds,
                 dtype=dest_dtype
             )
@@ -1,68 +1,166 @@
 import os
 import json
-import hdfs3
+import queue
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+try:
+    import hdfs3
+except ImportError:
+    hdfs3 = None
 
 from libertem.io.utils import get_partition_shape
 
 
-class HDFSBinarySink(object):
-    def __init__(self, namenode, namenode_port, replication):
+class BinarySink(object):
+    def __init__(self, block_size=16*1024*1024, num_writers=2, max_pending_blocks=4):
         """
-        Move data from a local data source to a HDFS filesystem
+        Base class for sinks that write the data as one raw binary file per partition,
+        together with an index.json that describes the partitioning.
+
+        Partitions are streamed in blocks of about ``block_size`` bytes: each block is
+        read from the input and converted into its own buffer in one step, and then
+        written in a thread pool, so reading the next partition overlaps with writing
+        the current one. At most ``max_pending_blocks`` blocks per partition wait for
+        their writer, which bounds the memory usage independently of the partition size.
+
+        Subclasses implement ``mkdir`` and ``open``.
 
         Parameters
         ----------
-        namenode : str
-            hostname of the HDFS namenode
-        namenode_port : int
-            port of the HDFS namenode (default 8020)
-        replication : int
-            number of replicas (default 3)
+        block_size : int
+            size of the blocks in bytes
+        num_writers : int
+            number of partitions that are written concurrently
+        max_pending_blocks : int
+            number of blocks that can be queued for each writer
         """
-        self.namenode = namenode
-        self.namenode_port = namenode_port
-        self.replication = replication
-        self.hdfs = hdfs3.HDFileSystem(namenode, port=namenode_port)
+        self.block_size = block_size
+        self.num_writers = num_writers
+        self.max_pending_blocks = max_pending_blocks
+
+    def mkdir(self, path):
+        raise NotImplementedError()
 
-    def prepare_output(self, output_path_hdfs):
+    def open(self, filename, nbytes=None):
+        """
+        open ``filename`` for writing ``nbytes`` bytes (if known), returns a
+        file-like object
+        """
+        raise NotImplementedError()
+
+    def prepare_output(self, output_path):
         # FIXME: check for existance of output directory, bail out if exists
         # FIXME: add force=True param to force even if output path exists
-        self.hdfs.mkdir(output_path_hdfs)
+        self.mkdir(output_path)
 
     def make_partitions(self, data, partition_shape):
-        assert data.shape[0] % partition_shape[0] == 0
-        assert data.shape[1] % partition_shape[1] == 0
+        """
+        split the scan into rectangles of ``partition_shape``; the partitions at the
+        bottom and right edges are smaller if the scan size is not divisible by it
+        """
+        h, w = partition_shape[0], partition_shape[1]
         partitions = [
-            {"origin": (y * partition_shape[0], x * partition_shape[1]),
-             "shape": partition_shape}
-            for x in range(data.shape[1] // partition_shape[1])
-            for y in range(data.shape[0] // partition_shape[0])
+            {"origin": (y, x),
+             "shape": (min(h, data.shape[0] - y), min(w, data.shape[1] - x))
+             + tuple(partition_shape[2:])}
+            for x in range(0, data.shape[1], w)
+            for y in range(0, data.shape[0], h)
         ]
         return partitions
 
-    def write_partition(self, data, filename, dtype):
-        data = data.astype(dtype)
-        fd = self.hdfs.open(filename, "wb", block_size=data.nbytes, replication=self.replication)
+    def _iter_blocks(self, origin, shape, frame_bytes):
+        """
+        split the partition at ``origin`` with ``shape`` into blocks that are contiguous
+        in the output file: whole scan rows if they fit into a block, parts of a scan
+        row otherwise
+        """
+        frames_per_block = max(1, self.block_size // frame_bytes)
+        y0, x0 = origin
+        h, w = shape[0], shape[1]
+        if frames_per_block >= w:
+            rows_per_block = frames_per_block // w
+            for y in range(y0, y0 + h, rows_per_block):
+                yield (
+                    slice(y, min(y + rows_per_block, y0 + h)),
+                    slice(x0, x0 + w),
+                )
+        else:
+            for y in range(y0, y0 + h):
+                for x in range(x0, x0 + w, frames_per_block):
+                    yield (
+                        slice(y, y + 1),
+                        slice(x, min(x + frames_per_block, x0 + w)),
+                    )
+
+    def _write_blocks(self, filename, nbytes, blocks):
+        bytes_written = 0
+        fd = self.open(filename, nbytes)
         try:
-            assert data.tobytes() is not None
-            bytes_written = fd.write(data.tobytes())
-            assert bytes_written is not None
-            assert bytes_written == data.nbytes, "%d != %d" % (bytes_written, data.nbytes)
+            while True:
+                block = blocks.get()
+                if block is None:
+                    break
+                fd.write(memoryview(block).cast("B"))
+                bytes_written += block.nbytes
         finally:
             fd.close()
+        assert bytes_written == nbytes, "%d != %d" % (bytes_written, nbytes)
+
+    def _put(self, blocks, item, future):
+        """
+        put ``item`` into the ``blocks`` queue, unless the writer consuming it has failed
+        """
+        while True:
+            try:
+                blocks.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                if future.done():
+                    future.result()
+                    raise RuntimeError("writer for %r stopped early" % future)
+
+    def write_partition(self, dataset, origin, shape, filename, dtype, pool):
+        """
+        read and convert the partition at ``origin`` with ``shape`` from ``dataset``,
+        and write it to ``filename`` using ``pool``. returns the future of the writer.
+        """
+        dtype = np.dtype(dtype)
+        frame_bytes = int(np.prod(shape[2:])) * dtype.itemsize
+        nbytes = int(np.prod(shape)) * dtype.itemsize
+        blocks = queue.Queue(maxsize=self.max_pending_blocks)
+        future = pool.submit(self._write_blocks, filename, nbytes, blocks)
+        try:
+            for ys, xs in self._iter_blocks(origin, shape, frame_bytes):
+                src = dataset[ys, xs]
+                # convert while copying into a fresh buffer, instead of astype + tobytes:
+                block = np.empty(src.shape, dtype=dtype)
+                block[:] = src
+                self._put(blocks, block, future)
+        finally:
+            if not future.done():
+                self._put(blocks, None, future)
+        return future
 
-    def write_partitions(self, idx, dataset, output_path_hdfs, dtype):
-        for p in idx["partitions"]:
-            dataslice = dataset[
-                p['origin'][0]:(p['origin'][0] + p['shape'][0]),
-                p['origin'][1]:(p['origin'][1] + p['shape'][1]), :, :]
-            assert dataslice.shape == p['shape'],\
-                "%r != %r (origin=%r)" % (dataslice.shape, p['shape'], p['origin'])
-            self.write_partition(
-                data=dataslice,
-                filename=os.path.join(output_path_hdfs, p["filename"]),
-                dtype=dtype,
-            )
+    def write_partitions(self, idx, dataset, output_path, dtype):
+        futures = []
+        with ThreadPoolExecutor(max_workers=self.num_writers) as pool:
+            for p in idx["partitions"]:
+                futures.append(self.write_partition(
+                    dataset=dataset,
+                    origin=p['origin'],
+                    shape=p['shape'],
+                    filename=os.path.join(output_path, p["filename"]),
+                    dtype=dtype,
+                    pool=pool,
+                ))
+                # raise errors early:
+                for f in futures:
+                    if f.done():
+                        f.result()
+        for f in futures:
+            f.result()
 
     def make_index(self, data, dtype, min_num_partitions=16, target_size=512*1024*1024):
         """
@@ -85,6 +183,7 @@ class HDFSBinarySink(object):
             "dtype": str(dtype),
             "mode": "rect",
             "shape": data.shape,
+            "sig_dims": len(data.shape) - 2,
             "partitions": [
                 {
                     "origin": p['origin'],
@@ -98,11 +197,58 @@ class HDFSBinarySink(object):
 
     def write_index(self, idx, output_filename):
         """
-        write json-serializable ``idx`` to ``output_filename`` on hdfs
+        write json-serializable ``idx`` to ``output_filename``
         """
-        fd = self.hdfs.open(output_filename, "wb", replication=self.replication)
+        idx_bytes = json.dumps(idx).encode("utf8")
+        fd = self.open(output_filename)
         try:
-            idx_bytes = json.dumps(idx).encode("utf8")
             fd.write(idx_bytes)
         finally:
             fd.close()
+
+
+class HDFSBinarySink(BinarySink):
+    def __init__(self, namenode, namenode_port, replication, **kwargs):
+        """
+        Move data from a local data source to a HDFS filesystem
+
+        Parameters
+        ----------
+        namenode : str
+            hostname of the HDFS namenode
+        namenode_port : int
+            port of the HDFS namenode (default 8020)
+        replication : int
+            number of replicas (default 3)
+
+        Additional keyword arguments are passed to ``BinarySink``.
+        """
+        super().__init__(**kwargs)
+        self.namenode = namenode
+        self.namenode_port = namenode_port
+        self.replication = replication
+        if hdfs3 is None:
+            raise RuntimeError("the hdfs3 package is needed for writing to HDFS")
+        self.hdfs = hdfs3.HDFileSystem(namenode, port=namenode_port)
+
+    def mkdir(self, path):
+        self.hdfs.mkdir(path)
+
+    def open(self, filename, nbytes=None):
+        kwargs = {}
+        if nbytes is not None:
+            # one HDFS block per partition, so each partition lives on well-defined hosts
+            kwargs["block_size"] = nbytes
+        return self.hdfs.open(filename, "wb", replication=self.replication, **kwargs)
+
+
+class LocalBinarySink(BinarySink):
+    """
+    Write to a directory on a local filesystem, for example NVMe scratch space.
+    Takes the same keyword arguments as ``BinarySink``.
+    """
+    def mkdir(self, path):
+        os.makedirs(path, exist_ok=True)
+
+    def open(self, filename, nbytes=None):
+        return open(filename, "wb")
@@ -0,0 +1,74 @@
+import time
+
+from libertem.io.dataset.base import DataSetException
+
+
+class LiveAcquisition(object):
+    def __init__(self, num_frames, timeout=60, poll_interval=0.05):
+        """
+        Waits for the frames of a dataset that is still being written. Partitions
+        of live datasets use this before reading a tile, so jobs can be started
+        as soon as the scan starts and process the frames as they arrive.
+
+        Parameters
+        ----------
+        num_frames : int
+            number of frames the acquisition will have, from the scan size
+        timeout : float
+            give up if no new frames arrive for this many seconds
+        poll_interval : float
+            seconds between checks for new frames
+        """
+        self.num_frames = num_frames
+        self.timeout = timeout
+        self.poll_interval = poll_interval
+
+    def wait_for(self, num_frames, get_num_available):
+        """
+        Wait until the first ``num_frames`` frames are written
+
+        Parameters
+        ----------
+        num_frames : int
+            number of frames that are needed
+        get_num_available : callable
+            returns the number of frames, counted from the start, that are
+            completely written
+
+        Returns
+        -------
+        int
+            the number of available frames
+        """
+        num_frames = min(num_frames, self.num_frames)
+        last_available = None
+        last_change = time.monotonic()
+        while True:
+            available = get_num_available()
+            if available >= num_frames:
+                return available
+            now = time.monotonic()
+            if available != last_available:
+                last_available = available
+                last_change = now
+            elif now - last_change > self.timeout:
+                raise DataSetException(
+                    "no new frames for %ds, %d of %d frames written" % (
+                        self.timeout, available, self.num_frames
+                    )
+                )
+            time.sleep(self.poll_interval)
+
+    def get_progress(self, num_available):
+        """
+        Returns
+        -------
+        dict
+            with keys ``frames_available``, ``frames_expected`` and ``fraction``
+        """
+        num_available = min(num_available, self.num_frames)
+        return {
+            "frames_available": num_available,
+            "frames_expected": self.num_frames,
+            "fraction": num_available / max(1, self.num_frames),
+        }
@@ -0,0 +1,177 @@
+import math
+import multiprocessing
+
+import numpy as np
+import psutil
+
+
+class PartitionPlanner(object):
+    def __init__(self, num_workers=None, worker_memory=None, partitions_per_worker=2,
+                 min_size=4*1024*1024, max_size=512*1024*1024, memory_fraction=0.125):
+        """
+        Decides how a dataset is split into partitions, depending on the size of the
+        dataset and its frames and on the resources of the cluster. Partition boundaries
+        are frame-granular: a partition is not required to consist of whole scan rows.
+
+        Parameters
+        ----------
+        num_workers : int or None
+            total number of worker threads, defaults to the number of CPU cores
+        worker_memory : int or None
+            memory per worker thread in bytes, defaults to the total memory divided
+            by ``num_workers``
+        partitions_per_worker : int
+            aim for at least this many partitions per worker, so small datasets
+            still use all workers and the load can be balanced
+        min_size : int
+            don't make partitions smaller than this many bytes, to limit the per-task
+            overhead; datasets that are smaller than this are not split
+        max_size : int
+            upper limit for the partition size in bytes
+        memory_fraction : float
+            a partition uses at most this fraction of ``worker_memory``
+        """
+        if num_workers is None:
+            num_workers = multiprocessing.cpu_count()
+        if worker_memory is None:
+            worker_memory = psutil.virtual_memory().total // num_workers
+        self.num_workers = num_workers
+        self.worker_memory = worker_memory
+        self.partitions_per_worker = partitions_per_worker
+        self.min_size = min_size
+        self.max_size = max_size
+        self.memory_fraction = memory_fraction
+
+    def __repr__(self):
+        return "<PartitionPlanner num_workers=%d worker_memory=%d>" % (
+            self.num_workers, self.worker_memory
+        )
+
+    def get_partition_size(self, total_size, target_size=None, min_num_partitions=None):
+        """
+        The partition size in bytes for a dataset of ``total_size`` bytes
+
+        Parameters
+        ----------
+        total_size : int
+            size of the dataset in bytes
+        target_size : int or None
+            override the upper limit for the partition size
+        min_num_partitions : int or None
+            override the minimum number of partitions, which defaults to
+            ``num_workers * partitions_per_worker``; if given, partitions can be
+            smaller than ``min_size``
+        """
+        if target_size is None:
+            target_size = min(self.max_size, int(self.worker_memory * self.memory_fraction))
+        min_size = min(self.min_size, target_size)
+        if min_num_partitions is None:
+            min_num_partitions = self.num_workers * self.partitions_per_worker
+        else:
+            # an explicit number of partitions takes precedence over ``min_size``:
+            min_size = 1
+        size = min(target_size, -(-total_size // max(1, min_num_partitions)))
+        return max(size, min_size, 1)
+
+    def get_frames_per_partition(self, num_frames, frame_size, **kwargs):
+        """
+        The number of frames per partition, chosen so that all partitions have about
+        the same number of frames
+
+        Parameters
+        ----------
+        num_frames : int
+            number of frames in the dataset
+        frame_size : int
+            size of a frame in bytes
+        kwargs
+            passed to ``get_partition_size``
+        """
+        num_frames = max(1, num_frames)
+        size = self.get_partition_size(num_frames * frame_size, **kwargs)
+        frames = max(1, size // max(1, frame_size))
+        num_partitions = math.ceil(num_frames / frames)
+        return math.ceil(num_frames / num_partitions)
+
+    def get_frame_ranges(self, num_frames, frame_size, **kwargs):
+        """
+        Split a dataset of ``num_frames`` frames into partitions
+
+        Returns
+        -------
+        list of (int, int)
+            the (start, stop) frame indices of the partitions
+        """
+        frames = self.get_frames_per_partition(num_frames, frame_size, **kwargs)
+        num_partitions = math.ceil(num_frames / frames)
+        # the first partitions get one more frame if they can't be equal:
+        bounds = [
+            i * (num_frames // num_partitions) + min(i, num_frames % num_partitions)
+            for i in range(num_partitions + 1)
+        ]
+        return list(zip(bounds[:-1], bounds[1:]))
+
+    def get_partition_shape(self, shape, dtype, **kwargs):
+        """
+        A partition shape for ``Slice.subslices``: partitions consist of whole rows of
+        the navigation dimensions if they are large enough, otherwise they are a part
+        of a single row.
+
+        Parameters
+        ----------
+        shape : Shape
+            shape of the dataset
+        dtype : numpy.dtype or str
+            data type of the dataset
+        kwargs
+            passed to ``get_partition_size``
+
+        Returns
+        -------
+        tuple of int
+            the partition shape, including the signal dimensions
+        """
+        nav_shape = tuple(shape.nav)
+        sig_shape = tuple(shape.sig)
+        frame_size = int(np.prod(sig_shape, dtype=np.int64)) * np.dtype(dtype).itemsize
+        num_frames = int(np.prod(nav_shape, dtype=np.int64))
+        frames = self.get_frames_per_partition(num_frames, frame_size, **kwargs)
+        return get_nav_shape(nav_shape, frames) + sig_shape
+
+
+def get_nav_shape(nav_shape, frames):
+    """
+    A block of at most ``frames`` frames in the navigation dimensions ``nav_shape``, as
+    used for ``Slice.subslices``: whole rows if possible, otherwise a part of a single row.
+    """
+    remaining = frames
+    shape = [1] * len(nav_shape)
+    for axis in reversed(range(len(nav_shape))):
+        size = nav_shape[axis]
+        if remaining >= size:
+            shape[axis] = size
+            remaining //= size
+            continue
+        # split this axis into parts of about the same size:
+        num_parts = math.ceil(size / max(1, remaining))
+        shape[axis] = math.ceil(size / num_parts)
+        break
+    return tuple(shape)
+
+
+_default_planner = None
+
+
+def get_default_planner():
+    """
+    The planner that is used by datasets that don't have their own planner
+    """
+    global _default_planner
+    if _default_planner is None:
+        _default_planner = PartitionPlanner()
+    return _default_planner
+
+
+def set_default_planner(planner):
+    global _default_planner
+    _default_planner = planner
@@ -0,0 +1,167 @@
+import weakref
+
+import numpy as np
+
+try:
+    from multiprocessing import shared_memory, resource_tracker
+except ImportError:  # Python < 3.8
+    shared_memory = None
+
+
+def have_shm():
+    return shared_memory is not None
+
+
+def _attach(name):
+    """
+    attach to the existing shared memory block ``name``, without taking ownership
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13 registers the block with the resource tracker of the attaching
+        # process, which would then unlink it when this process exits:
+        shm = shared_memory.SharedMemory(name=name)
+        resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+def create_persistent(name, size):
+    """
+    create the shared memory block ``name`` that is not tied to the lifetime of this
+    process; it needs to be removed with ``unlink_persistent``
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, create=True, size=size, track=False)
+    except TypeError:
+        shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        resource_tracker.unregister(shm._name, "shared_memory")
+        return shm
+
+
+def unlink_persistent(name):
+    """
+    remove the shared memory block ``name`` created by ``create_persistent``
+    """
+    try:
+        shm = _attach(name)
+    except FileNotFoundError:
+        return
+    if getattr(shm, "_track", True):
+        # before Python 3.13, unlink also unregisters from the resource tracker:
+        resource_tracker.register(shm._name, "shared_memory")
+    release(shm, unlink=True)
+
+
+def release(shm, unlink):
+    """
+    close the ``SharedMemory`` object ``shm``, and remove its block if ``unlink``
+    is True; closing is deferred while arrays from ``as_array`` still map it
+    """
+    try:
+        shm.close()
+    except BufferError:
+        # arrays mapping the block are still alive; the mapping is released together
+        # with the last of them
+        pass
+    if unlink:
+        try:
+            shm.unlink()
+        except FileNotFoundError:
+            pass
+
+
+class _Mapping(object):
+    """
+    exposes a shared memory block to numpy; arrays created from it (and all views
+    of them) keep the ``SharedMemory`` object, and thus the mapping, alive
+    """
+    def __init__(self, shm, shape, dtype):
+        self._shm = shm
+        count = int(np.prod(shape, dtype=np.int64))
+        self._arr = np.frombuffer(shm.buf, dtype=dtype, count=count).reshape(shape)
+        self.__array_interface__ = self._arr.__array_interface__
+
+    def __del__(self):
+        # release our view of the buffer first, so the SharedMemory object can be closed
+        self._arr = None
+
+
+def as_array(shm, shape, dtype):
+    """
+    a numpy array of ``shape`` and ``dtype`` that maps the ``SharedMemory`` object
+    ``shm``, and keeps it alive
+    """
+    return np.asarray(_Mapping(shm, shape, dtype))
+
+
+class SharedArray(object):
+    def __init__(self, name, shape, dtype, shm=None, owner=False):
+        """
+        A numpy array that lives in a POSIX shared memory block. When pickled,
+        only the name of the block is transferred, so other processes on the same node
+        can map the data without copying it.
+
+        The process that created the block owns it, and unlinks it once the owning
+        ``SharedArray`` is garbage collected or ``close`` is called.
+
+        Use ``SharedArray.from_array`` or ``SharedArray.empty`` to create instances.
+        """
+        self.name = name
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self._shm = shm
+        self._owner = owner
+        self._finalizer = None
+        if shm is not None:
+            self._finalizer = weakref.finalize(self, release, shm, owner)
+
+    @classmethod
+    def empty(cls, shape, dtype):
+        if shared_memory is None:
+            raise RuntimeError("shared memory is only available on Python >= 3.8")
+        nbytes = max(1, int(np.prod(shape, dtype=np.int64)) * np.dtype(dtype).itemsize)
+        shm = shared_memory.SharedMemory(create=True, size=nbytes)
+        return cls(name=shm.name, shape=shape, dtype=dtype, shm=shm, owner=True)
+
+    @classmethod
+    def from_array(cls, arr):
+        result = cls.empty(shape=arr.shape, dtype=arr.dtype)
+        result.data[:] = arr
+        return result
+
+    @property
+    def data(self):
+        """
+        the array, mapped from shared memory
+        """
+        if self._shm is None:
+            self._shm = _attach(self.name)
+            self._finalizer = weakref.finalize(self, release, self._shm, False)
+        return as_array(self._shm, self.shape, self.dtype)
+
+    @property
+    def nbytes(self):
+        return int(np.prod(self.shape, dtype=np.int64)) * self.dtype.itemsize
+
+    def close(self):
+        """
+        Unmap the data; if this instance owns the shared memory block, also free it.
+        Arrays returned from ``data`` keep their mapping until they are garbage collected.
+        """
+        if self._finalizer is not None:
+            self._finalizer()
+        self._shm = None
+
+    def __getstate__(self):
+        return {
+            "name": self.name,
+            "shape": self.shape,
+            "dtype": self.dtype,
+        }
+
+    def __setstate__(self, state):
+        self.__init__(**state)
+
+    def __repr__(self):
+        return "<SharedArray %s shape=%r dtype=%s>" % (self.name, self.shape, self.dtype)
@@ -0,0 +1,273 @@
+import os
+import json
+import math
+import time
+import socket
+import logging
+
+import numpy as np
+
+from libertem.common import Slice, Shape
+from libertem.io.planner import get_nav_shape
+from libertem.io.utils import get_cache_dir
+
+log = logging.getLogger(__name__)
+
+# tiles of about this size stay in the cache while they are processed:
+DEFAULT_TILE_SIZE = 1024 * 1024
+# data that is used again for each frame of a tile, like the masks, should fit in L2:
+DEFAULT_RESIDENT_SIZE = 256 * 1024
+
+
+class TilingPreferences(object):
+    def __init__(self, whole_frames=False, target_size=DEFAULT_TILE_SIZE,
+                 resident_bytes_per_pixel=0, resident_size=DEFAULT_RESIDENT_SIZE,
+                 max_depth=None):
+        """
+        The tiles a ``Job`` would like to process
+
+        Parameters
+        ----------
+        whole_frames : bool
+            the job needs tiles that contain whole frames
+        target_size : int
+            size of a tile in bytes
+        resident_bytes_per_pixel : int
+            bytes per signal pixel that the job uses for each frame of a tile, for example
+            ``num_masks * itemsize`` when applying masks. If the data for whole frames
+            doesn't fit in ``resident_size``, tiles are split in the signal dimensions.
+        resident_size : int
+            how much of this data should stay in the cache, in bytes
+        max_depth : int or None
+            upper limit for the number of frames per tile
+        """
+        self.whole_frames = whole_frames
+        self.target_size = target_size
+        self.resident_bytes_per_pixel = resident_bytes_per_pixel
+        self.resident_size = resident_size
+        self.max_depth = max_depth
+
+
+class TilingCapabilities(object):
+    def __init__(self, fixed=False, sig_tiles=False, native_sig_shape=None, min_size=0,
+                 max_depth=None):
+        """
+        The tiles a ``DataSet`` can produce efficiently
+
+        Parameters
+        ----------
+        fixed : bool
+            the tiles are decided by the DataSet alone, for example because the user
+            gave a tileshape
+        sig_tiles : bool
+            the DataSet can read parts of frames, split along the first signal axis
+        native_sig_shape : tuple of int or None
+            the signal shape of the tiles the DataSet reads, like the blocks of a K2IS
+            sector; jobs that need whole frames still get whole frames
+        min_size : int
+            smaller reads are inefficient for this format, in bytes
+        max_depth : int or None
+            upper limit for the number of frames per tile
+        """
+        self.fixed = fixed
+        self.sig_tiles = sig_tiles
+        self.native_sig_shape = native_sig_shape and tuple(native_sig_shape)
+        self.min_size = min_size
+        self.max_depth = max_depth
+
+
+class Tiling(object):
+    def __init__(self, depth, sig_shape, tune=False):
+        """
+        The result of the negotiation: tiles of ``depth`` frames, each part of a frame
+        of shape ``sig_shape``.
+
+        Parameters
+        ----------
+        depth : int
+            number of frames per tile
+        sig_shape : tuple of int
+            signal shape of the tiles
+        tune : bool
+            refine ``depth`` with a short benchmark on each host, see ``TilingTuner``
+        """
+        self.depth = depth
+        self.sig_shape = tuple(sig_shape)
+        self.tune = tune
+
+    def with_depth(self, depth):
+        return Tiling(depth=depth, sig_shape=self.sig_shape)
+
+    def get_tileshape(self, partition_shape):
+        """
+        The tileshape for ``Slice.subslices`` of a partition of shape ``partition_shape``
+        """
+        nav_shape = get_nav_shape(tuple(partition_shape.nav), self.depth)
+        return Shape(nav_shape + self.sig_shape, sig_dims=len(self.sig_shape))
+
+    def __repr__(self):
+        return "<Tiling depth=%d sig_shape=%r>" % (self.depth, self.sig_shape)
+
+
+def _get_sig_shape(sig_shape, itemsize, preferences):
+    """
+    split frames along the first signal axis, so the data that is used for each signal
+    pixel fits in ``preferences.resident_size``
+    """
+    if preferences.resident_bytes_per_pixel <= 0:
+        return sig_shape
+    row_size = int(np.prod(sig_shape[1:], dtype=np.int64))
+    rows = preferences.resident_size // (preferences.resident_bytes_per_pixel * row_size)
+    rows = max(1, min(sig_shape[0], rows))
+    # parts of about the same size:
+    num_parts = math.ceil(sig_shape[0] / rows)
+    return (math.ceil(sig_shape[0] / num_parts),) + tuple(sig_shape[1:])
+
+
+def negotiate_tiling(preferences, capabilities, shape, dtype):
+    """
+    Find the tiles that suit both the job and the dataset
+
+    Parameters
+    ----------
+    preferences : TilingPreferences
+        what the job would like to process
+    capabilities : TilingCapabilities
+        what the dataset can produce
+    shape : Shape
+        shape of the dataset
+    dtype : numpy.dtype or str
+        dtype of the tiles
+
+    Returns
+    -------
+    Tiling or None
+        None if the dataset decides about the tiles alone
+    """
+    if capabilities.fixed:
+        return None
+    itemsize = np.dtype(dtype).itemsize
+    sig_shape = tuple(shape.sig)
+    if preferences.whole_frames:
+        pass
+    elif capabilities.native_sig_shape is not None:
+        sig_shape = capabilities.native_sig_shape
+    elif capabilities.sig_tiles:
+        sig_shape = _get_sig_shape(sig_shape, itemsize, preferences)
+    tile_frame_size = int(np.prod(sig_shape, dtype=np.int64)) * itemsize
+    target_size = max(preferences.target_size, capabilities.min_size)
+    depth = max(1, target_size // tile_frame_size)
+    for limit in (preferences.max_depth, capabilities.max_depth):
+        if limit is not None:
+            depth = max(1, min(depth, limit))
+    return Tiling(depth=depth, sig_shape=sig_shape)
+
+
+class TilingTuner(object):
+    def __init__(self, path=None, factors=(0.25, 0.5, 1, 2, 4)):
+        """
+        Refine the negotiated tile depth with a short benchmark that reads the first
+        frames of a partition with different depths. Only reading and decoding
+        is timed, not the computation of the job. The results are stored per host,
+        so each host runs the benchmark once for each format, dtype and tile shape.
+
+        Parameters
+        ----------
+        path : str or None
+            where to store the results, by default a file in ``$LIBERTEM_CACHE_DIR``
+            named after the host
+        factors : tuple of float
+            the depths that are tried, relative to the negotiated depth
+        """
+        if path is None:
+            path = os.path.join(get_cache_dir(), "tiling-%s.json" % socket.gethostname())
+        self.path = path
+        self.factors = factors
+        self._results = None
+
+    def _load(self):
+        try:
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except (IOError, OSError, ValueError):
+            return {}
+
+    def _store(self, key, depth):
+        results = self._load()
+        results[key] = depth
+        tmp_path = "%s.%d.tmp" % (self.path, os.getpid())
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(tmp_path, "w") as f:
+                json.dump(results, f)
+            os.replace(tmp_path, self.path)
+        except (IOError, OSError) as e:
+            log.warning("could not store tiling benchmark results: %s", e)
+        self._results = results
+
+    def _get_key(self, partition, tiling):
+        return "%s:%s:%s:%d" % (
+            type(partition).__name__, partition.dtype,
+            "x".join(str(s) for s in tiling.sig_shape), tiling.depth,
+        )
+
+    def get_candidates(self, tiling):
+        return sorted({max(1, int(tiling.depth * f)) for f in self.factors})
+
+    def _read(self, partition, crop_to, tiling):
+        for tile in partition.get_tiles(crop_to=crop_to, tiling=tiling):
+            tile.data.sum()
+
+    def benchmark(self, partition, tiling):
+        """
+        Returns
+        -------
+        int
+            the depth with which the first frames of ``partition`` were read fastest
+        """
+        candidates = self.get_candidates(tiling)
+        nav_shape = tuple(partition.shape.nav)
+        num_frames = min(partition.shape.nav.size, 2 * candidates[-1])
+        crop_to = Slice(
+            origin=partition.slice.origin,
+            shape=Shape(
+                get_nav_shape(nav_shape, num_frames) + tuple(partition.shape.sig),
+                sig_dims=partition.shape.sig.dims
+            ),
+        )
+        timings = []
+        for depth in candidates:
+            candidate = tiling.with_depth(depth)
+            # the first pass also loads the data into the page cache:
+            self._read(partition, crop_to, candidate)
+            t0 = time.perf_counter()
+            self._read(partition, crop_to, candidate)
+            timings.append((time.perf_counter() - t0, depth))
+        log.debug("tiling benchmark for %r: %r", partition, timings)
+        return min(timings)[1]
+
+    def tune(self, partition, tiling):
+        """
+        The tiling for ``partition``, with the depth that was fastest on this host
+        """
+        if self._results is None:
+            self._results = self._load()
+        key = self._get_key(partition, tiling)
+        depth = self._results.get(key)
+        if depth is None:
+            depth = self.benchmark(partition, tiling)
+            self._store(key, depth)
+        return tiling.with_depth(depth)
+
+
+_tuner = None
+
+
+def get_tuner():
+    """
+    The ``TilingTuner`` of this process
+    """
+    global _tuner
+    if _tuner is None:
+        _tuner = TilingTuner()
+    return _tuner
@@ -1,6 +1,8 @@
-import multiprocessing
+import os
+import tempfile
 
-import numpy as np
+from libertem.common import Shape
+from libertem.io.planner import get_default_planner
 
 try:
     import pwd
@@ -13,37 +15,84 @@ except ModuleNotFoundError:
     from libertem.win_tweaks import get_owner_name  # noqa: F401
 
 
-def get_partition_shape(datashape, framesize, dtype, target_size, min_num_partitions=None):
+def get_cache_dir():
+    """
+    Directory for local caches, ``$LIBERTEM_CACHE_DIR`` or a directory in the system
+    temp directory
+    """
+    return os.environ.get(
+        "LIBERTEM_CACHE_DIR",
+        os.path.join(tempfile.gettempdir(), "libertem-cache"),
+    )
+
+
+def get_partition_shape(datashape, framesize, dtype, target_size=None,
+                        min_num_partitions=None, planner=None):
     """
     Calculate partition shape for the given ``target_size``
     Parameters
     ----------
-    datashape : (int, int, int, int)
-        size of the whole dataset
+    datashape : Shape or tuple of int
+        size of the whole dataset; a tuple is taken to have two signal dimensions
     framesize : int
         number of pixels per frame
     dtype : numpy.dtype or str
         data type of the dataset
-    target_size : int
-        target size in bytes - how large should each partition be?
-    min_num_partitions : int
-        minimum number of partitions desired, defaults to twice the number of CPU cores
+    target_size : int or None
+        target size in bytes - how large should each partition be? By default,
+        decided by the planner
+    min_num_partitions : int or None
+        minimum number of partitions desired, defaults to twice the number of workers
+    planner : PartitionPlanner or None
+        defaults to the default planner
     Returns
     -------
-    (int, int, int, int)
+    tuple of int
         the shape calculated from the given parameters
     """
-    min_num_partitions = min_num_partitions or multiprocessing.cpu_count()
-    # FIXME: allow for partitions smaller than one scan row
-    # FIXME: allow specifying the "aspect ratio" for a partition?
-    num_frames = datashape[0] * datashape[1]
-    bytes_per_frame = framesize * np.dtype(str(dtype)).itemsize
-    frames_per_partition = target_size // bytes_per_frame
-    num_partitions = num_frames // frames_per_partition
-    num_partitions = max(min_num_partitions, num_partitions)
+    if not isinstance(datashape, Shape):
+        datashape = Shape(tuple(datashape), sig_dims=2)
+    planner = planner or get_default_planner()
+    return planner.get_partition_shape(
+        datashape, dtype, target_size=target_size, min_num_partitions=min_num_partitions,
+    )
+
+
+def get_devices(paths):
+    """
+    Storage devices (``st_dev``) the files at ``paths`` are stored on; files that
+    can't be accessed are skipped
+
+    Parameters
+    ----------
+    paths : list of str
+        paths of files
+
+    Returns
+    -------
+    list of int
+        sorted device ids
+    """
+    devices = set()
+    for path in paths:
+        try:
+            devices.add(os.stat(path).st_dev)
+        except OSError:
+            continue
+    return sorted(devices)
 
-    # number of partitions should evenly divide number of scan rows:
-    # assert datashape[1] % num_partitions == 0,\
-    #     "%d %% %d != 0 (datashape=%r)" % (datashape[1], num_partitions, datashape)
 
-    return (max(1, datashape[0] // num_partitions), datashape[1], datashape[2], datashape[3])
+def is_rotational(device):
+    """
+    Is the block device ``device`` (a ``st_dev`` value) a spinning disk? Only
+    known on Linux, returns None otherwise.
+    """
+    base = "/sys/dev/block/%d:%d" % (os.major(device), os.minor(device))
+    # for a partition, the queue information is found at the whole disk:
+    for queue in ("queue", os.path.join("..", "queue")):
+        try:
+            with open(os.path.join(base, queue, "rotational")) as f:
+                return f.read().strip() == "1"
+        except OSError:
+            continue
+    return None
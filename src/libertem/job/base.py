@@ -1,15 +1,47 @@
+import copy
+
 import numpy as np
 
+from libertem.io.tiling import TilingPreferences, negotiate_tiling, get_tuner
+
 
 class Job(object):
     """
     A computation on a DataSet. Inherit from this class and implement ``get_tasks``
     to yield tasks for your specific computation.
     """
+    # refine the negotiated tiling with a short benchmark on each host:
+    tune_tiling = False
 
     def __init__(self, dataset):
         self.dataset = dataset
 
+    def get_tiling_preferences(self):
+        """
+        The tiles this job would like to process; override if the computation
+        profits from a specific tiling
+        """
+        return TilingPreferences()
+
+    def get_tiling(self):
+        """
+        Negotiate the tiling between this job and its DataSet, for passing it to the tasks
+
+        Returns
+        -------
+        Tiling or None
+            None if the DataSet decides about the tiles alone
+        """
+        tiling = negotiate_tiling(
+            preferences=self.get_tiling_preferences(),
+            capabilities=self.dataset.get_tiling_capabilities(),
+            shape=self.dataset.raw_shape,
+            dtype=self.dataset.dtype,
+        )
+        if tiling is not None:
+            tiling.tune = self.tune_tiling
+        return tiling
+
     def get_tasks(self):
         """
         Yields
@@ -40,13 +72,33 @@ class Task(object):
     for your specific computation.
     """
 
-    def __init__(self, partition, idx):
+    def __init__(self, partition, idx, tiling=None):
         self.partition = partition
         self.idx = idx
+        self.tiling = tiling
 
     def get_locations(self):
         return self.partition.get_locations()
 
+    def get_tiles(self, crop_to=None):
+        """
+        The tiles of ``self.partition``, with the tiling that was negotiated by the job
+        """
+        tiling = self.tiling
+        if tiling is not None and tiling.tune:
+            tiling = get_tuner().tune(self.partition, tiling)
+        return self.partition.get_tiles(crop_to=crop_to, tiling=tiling)
+
+    def for_partition(self, partition):
+        """
+        A copy of this task that works on ``partition``, a part of ``self.partition``.
+        Used by executors to split tasks; return None if the results can't be combined
+        from the results of the parts.
+        """
+        task = copy.copy(self)
+        task.partition = partition
+        return task
+
     def __call__(self):
         raise NotImplementedError()
 
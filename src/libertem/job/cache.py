@@ -0,0 +1,164 @@
+import os
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from libertem.io.utils import get_cache_dir
+
+log = logging.getLogger(__name__)
+
+
+def get_result_key(analysis):
+    """
+    The key for the result of ``analysis``: identifies the dataset, including size
+    and modification time of all files it reads (see ``DataSet.get_cache_key``), the
+    type of the analysis, and its parameters. None if the result can't be cached,
+    because the parameters can't be compared, or because the dataset doesn't read
+    from files, so we can't tell if the data changed.
+    """
+    analysis_key = analysis.get_cache_key()
+    if analysis_key is None:
+        return None
+    dataset = analysis.dataset
+    if not any(partition.get_paths() for partition in dataset.get_partitions()):
+        return None
+    key = repr((dataset.get_cache_key(), analysis_key, tuple(dataset.shape)))
+    return hashlib.sha1(key.encode("utf8")).hexdigest()
+
+
+class ResultCache(object):
+    def __init__(self, max_memory=256*1024*1024, path=None, max_disk=4*1024*1024*1024):
+        """
+        Cache for the results of analyses, so running an analysis again on the same
+        data with the same parameters returns immediately. Results are kept in memory
+        and on disk; both are bounded in size and evict the least recently used
+        results first. The cache can be used from several threads.
+
+        Parameters
+        ----------
+        max_memory : int
+            size budget of the results that are kept in memory, in bytes
+        path : str or None
+            directory for the results on disk, by default in ``$LIBERTEM_CACHE_DIR``
+        max_disk : int
+            size budget of the results on disk, in bytes; 0 disables the disk tier
+        """
+        if path is None:
+            path = os.path.join(get_cache_dir(), "results")
+        self.max_memory = max_memory
+        self.path = path
+        self.max_disk = max_disk
+        self._memory = OrderedDict()
+        self._memory_size = 0
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.path, key + ".npy")
+
+    def get(self, key):
+        """
+        a copy of the result for ``key``, or None on a miss
+        """
+        path = self._path(key)
+        with self._lock:
+            result = self._memory.get(key)
+            if result is not None:
+                self._memory.move_to_end(key)
+        if result is not None:
+            self._touch(path)
+            return result.copy()
+        if self.max_disk == 0:
+            return None
+        try:
+            result = np.load(path, allow_pickle=False)
+        except (IOError, OSError, ValueError):
+            return None
+        self._touch(path)
+        self._put_memory(key, result)
+        return result.copy()
+
+    def _touch(self, path):
+        # file times are our LRU order on disk:
+        try:
+            os.utime(path)
+        except (IOError, OSError):
+            pass
+
+    def put(self, key, result):
+        """
+        store a copy of ``result`` for ``key``
+        """
+        result = np.array(result)
+        self._put_memory(key, result)
+        if result.nbytes > self.max_disk:
+            return
+        path = self._path(key)
+        tmp_path = "%s.%d.tmp" % (path, os.getpid())
+        try:
+            os.makedirs(self.path, exist_ok=True)
+            with open(tmp_path, "wb") as f:
+                np.save(f, result, allow_pickle=False)
+            os.replace(tmp_path, path)
+        except (IOError, OSError, ValueError) as e:
+            log.warning("could not store result: %s", e)
+            return
+        self.evict()
+
+    def _put_memory(self, key, result):
+        if result.nbytes > self.max_memory:
+            return
+        with self._lock:
+            old = self._memory.pop(key, None)
+            if old is not None:
+                self._memory_size -= old.nbytes
+            self._memory[key] = result
+            self._memory_size += result.nbytes
+            while self._memory_size > self.max_memory:
+                _, evicted = self._memory.popitem(last=False)
+                self._memory_size -= evicted.nbytes
+
+    def _entries(self):
+        try:
+            filenames = os.listdir(self.path)
+        except FileNotFoundError:
+            return
+        for fn in filenames:
+            if not fn.endswith(".npy"):
+                continue
+            path = os.path.join(self.path, fn)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            yield st.st_mtime_ns, st.st_size, path
+
+    def evict(self):
+        """
+        remove the least recently used results from disk until they fit into ``max_disk``
+        """
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_disk:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def clear(self):
+        """
+        remove all results, in memory and on disk
+        """
+        with self._lock:
+            self._memory.clear()
+            self._memory_size = 0
+        for _, _, path in list(self._entries()):
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
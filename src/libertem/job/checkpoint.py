@@ -0,0 +1,222 @@
+import os
+import time
+import asyncio
+import pickle
+import logging
+
+from libertem.io.utils import get_cache_dir
+from .base import ResultTile
+from .incremental import _PartialTask, _TaskListJob
+
+log = logging.getLogger(__name__)
+
+
+class CheckpointStore(object):
+    def __init__(self, path=None):
+        """
+        Keeps checkpoints of running jobs on disk: the result of the partitions that
+        are done, and which partitions these are.
+
+        Parameters
+        ----------
+        path : str or None
+            directory for the checkpoints, by default in ``$LIBERTEM_CACHE_DIR``
+        """
+        if path is None:
+            path = os.path.join(get_cache_dir(), "checkpoints")
+        self.path = path
+
+    def _path(self, key):
+        return os.path.join(self.path, key + ".pickle")
+
+    def load(self, key):
+        """
+        Returns
+        -------
+        dict or None
+            the checkpoint for ``key``, with the keys ``result`` and ``partitions``,
+            a dict from partition index to the slice of the partition
+        """
+        try:
+            with open(self._path(key), "rb") as f:
+                return pickle.load(f)
+        except (IOError, OSError, EOFError, pickle.UnpicklingError):
+            return None
+
+    def save(self, key, result, partitions):
+        path = self._path(key)
+        tmp_path = "%s.%d.tmp" % (path, os.getpid())
+        try:
+            os.makedirs(self.path, exist_ok=True)
+            with open(tmp_path, "wb") as f:
+                pickle.dump(
+                    {"result": result, "partitions": partitions},
+                    f, protocol=pickle.HIGHEST_PROTOCOL
+                )
+            os.replace(tmp_path, path)
+        except (IOError, OSError) as e:
+            log.warning("could not store checkpoint: %s", e)
+
+    def remove(self, key):
+        try:
+            os.unlink(self._path(key))
+        except FileNotFoundError:
+            pass
+
+
+class _StoredResultTile(ResultTile):
+    def __init__(self, data):
+        self.data = data
+
+    @property
+    def dtype(self):
+        return self.data.dtype
+
+    def reduce_into_result(self, result):
+        result += self.data
+        return result
+
+
+class CheckpointedRun(object):
+    def __init__(self, job, key, store, interval=60):
+        """
+        Run ``job``, and store a checkpoint every ``interval`` seconds, and when the
+        job fails. If there is a checkpoint for ``key``, the partitions that are
+        in it are not run again. The checkpoint is removed once the job is done.
+
+        Parts of split tasks are kept in memory until all parts of their partition
+        are done, so a checkpoint only contains complete partitions.
+
+        Parameters
+        ----------
+        job : Job
+            the job to run; ``ResultTile.reduce_into_result`` must add the results
+            of its tasks to the result
+        key : str
+            identifies the job and its data, see ``get_result_key``
+        store : CheckpointStore
+        interval : float
+            seconds between checkpoints
+        """
+        self.key = key
+        self.store = store
+        self.interval = interval
+        self._job = job
+        self.job = None
+        self.stored = []
+        self.out = None
+        self.done = {}
+        self._partitions = {}
+        self._pending = {}
+        self._last_save = None
+
+    def start(self):
+        """
+        Load the checkpoint, and prepare ``self.job``, which runs the remaining tasks,
+        and ``self.stored``, the result tiles of the partitions that are already done
+        """
+        tasks = list(self._job.get_tasks())
+        self.out = self._job.get_result_buffer()
+        stored = []
+        state = self.store.load(self.key)
+        if state is not None and self._matches(state, tasks):
+            self.out[...] = state['result']
+            self.done = dict(state['partitions'])
+            stored = [_StoredResultTile(state['result'])]
+            log.info("resuming from checkpoint, %d of %d partitions are done",
+                     len(self.done), len(tasks))
+        remaining = [task for task in tasks if task.idx not in self.done]
+        self._partitions = {task.idx: task.partition for task in remaining}
+        self.job = _TaskListJob(self._job, [_PartialTask(task) for task in remaining])
+        self.stored = stored
+        self._last_save = time.monotonic()
+
+    def _matches(self, state, tasks):
+        result = state['result']
+        if result.shape != self.out.shape or result.dtype != self.out.dtype:
+            return False
+        slices = {task.idx: task.partition.slice for task in tasks}
+        return all(
+            slices.get(idx) == pslice
+            for idx, pslice in state['partitions'].items()
+        )
+
+    def add(self, result, save=True):
+        """
+        Record the ``_PartialResult`` of a task, and store a checkpoint if it is due
+        and ``save`` is True
+
+        Returns
+        -------
+        list of ResultTile
+            the result tiles of the task
+        """
+        pending = self._pending.setdefault(result.idx, [0, []])
+        pending[0] += result.partition.shape.nav.size
+        pending[1].append(result.tiles)
+        partition = self._partitions[result.idx]
+        if pending[0] == partition.shape.nav.size:
+            for tiles in pending[1]:
+                for tile in tiles:
+                    tile.reduce_into_result(self.out)
+            del self._pending[result.idx]
+            self.done[result.idx] = partition.slice
+        if save and self.save_due():
+            self.save()
+        return result.tiles
+
+    def save_due(self):
+        return time.monotonic() - self._last_save >= self.interval
+
+    def save(self):
+        if self.done:
+            self.store.save(self.key, self.out, self.done)
+        self._last_save = time.monotonic()
+
+    def finish(self):
+        self.store.remove(self.key)
+
+    def run(self, executor):
+        """
+        Like ``JobExecutor.run_job``: yields the result tiles of the checkpoint, if
+        any, and of the tasks that are run
+        """
+        if self.job is None:
+            self.start()
+        if self.stored:
+            yield self.stored
+        completed = False
+        try:
+            for result in executor.run_job(self.job):
+                yield self.add(result)
+            completed = True
+        finally:
+            self._done(completed)
+
+    async def run_async(self, executor, **kwargs):
+        """
+        Like ``run``, for an ``AsyncJobExecutor``; ``kwargs`` are passed to its ``run_job``
+        """
+        if self.job is None:
+            self.start()
+        if self.stored:
+            yield self.stored
+        # pickling and writing the checkpoint blocks, so it runs in a thread:
+        loop = asyncio.get_event_loop()
+        completed = False
+        try:
+            async for result in executor.run_job(self.job, **kwargs):
+                tiles = self.add(result, save=False)
+                if self.save_due():
+                    await loop.run_in_executor(None, self.save)
+                yield tiles
+            completed = True
+        finally:
+            await loop.run_in_executor(None, self._done, completed)
+
+    def _done(self, completed):
+        if completed:
+            self.finish()
+        else:
+            # also when the job is cancelled:
+            self.save()
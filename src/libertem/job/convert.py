@@ -0,0 +1,336 @@
+import os
+import json
+
+import numpy as np
+
+from libertem.common import Slice, Shape
+from libertem.io.codecs import default_codec
+from libertem.io.dataset.base import DataSetException
+from libertem.io.tiling import TilingPreferences
+from libertem.io.dataset.chunked import (
+    INDEX_FILENAME, CHUNK_FILENAME_FMT, encode_chunk,
+)
+from .base import Job, Task, ResultTile
+
+RAW_FILENAME = "data.raw"
+
+
+class RawOutput(object):
+    def __init__(self, path, shape, dtype):
+        """
+        write frames into a raw file, which is memory mapped on the worker
+
+        Parameters
+        ----------
+        path : str
+            path to the (already allocated) output file
+        shape : tuple of int
+            shape of the output, with the navigation dimensions flattened
+        dtype : numpy.dtype
+            output dtype
+        """
+        self._path = path
+        self._shape = tuple(shape)
+        self._dtype = dtype
+        self._mm = None
+
+    def write(self, frames, sig_slice, data):
+        if self._mm is None:
+            self._mm = np.memmap(self._path, dtype=self._dtype, mode='r+', shape=self._shape)
+        if frames[-1] - frames[0] + 1 == len(frames):
+            frames = slice(frames[0], frames[-1] + 1)
+        self._mm[(frames,) + sig_slice] = data
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.flush()
+            self._mm = None
+
+
+class ChunkedOutput(object):
+    def __init__(self, dirname, chunks, sig_shape, dtype, codec, shuffle):
+        """
+        collect frames into chunk buffers, and compress and write each chunk as soon
+        as it is complete
+
+        Parameters
+        ----------
+        dirname : str
+            output directory
+        chunks : list of dict
+            the chunks of the index that are written by this task
+        sig_shape : tuple of int
+            shape of the output frames
+        dtype : numpy.dtype
+            output dtype
+        codec : str
+            compression codec
+        shuffle : bool
+            byte shuffle before compressing
+        """
+        self._dirname = dirname
+        self._chunks = chunks
+        self._sig_shape = tuple(sig_shape)
+        self._dtype = dtype
+        self._codec = codec
+        self._shuffle = shuffle
+        self._buffers = {}
+        self._filled = {}
+
+    def _flush(self, idx):
+        chunk = self._chunks[idx]
+        encoded = encode_chunk(
+            self._buffers.pop(idx), codec=self._codec, shuffle_bytes=self._shuffle
+        )
+        del self._filled[idx]
+        with open(os.path.join(self._dirname, chunk['filename']), "wb") as f:
+            f.write(encoded)
+
+    def write(self, frames, sig_slice, data):
+        sig_size = int(np.prod(data.shape[1:]))
+        for idx, chunk in enumerate(self._chunks):
+            start = chunk['start']
+            stop = start + chunk['num_frames']
+            mask = (frames >= start) & (frames < stop)
+            if not np.any(mask):
+                continue
+            if idx not in self._buffers:
+                self._buffers[idx] = np.zeros(
+                    (chunk['num_frames'],) + self._sig_shape, dtype=self._dtype
+                )
+                self._filled[idx] = 0
+            self._buffers[idx][(frames[mask] - start,) + sig_slice] = data[mask]
+            self._filled[idx] += int(np.count_nonzero(mask)) * sig_size
+            if self._filled[idx] >= chunk['num_frames'] * int(np.prod(self._sig_shape)):
+                self._flush(idx)
+
+    def close(self):
+        # chunks that were not covered completely by the tiles of the input:
+        for idx in list(self._buffers.keys()):
+            self._flush(idx)
+
+
+class ConvertJob(Job):
+    def __init__(self, output_path, dtype=None, crop_origin=None, crop_shape=None,
+                 dark=None, gain=None, output_format="raw", codec=None, shuffle=True,
+                 chunk_size=4*1024*1024, *args, **kwargs):
+        """
+        Convert a dataset into a layout that is fast to read: a single raw file or
+        the compressed chunked format, in the directory ``output_path``, together with
+        an index.json. Each partition is converted by its own task, so the conversion
+        runs in parallel. The output directory needs to be accessible from all workers.
+
+        Parameters
+        ----------
+        output_path : str
+            output directory, will be created
+        dtype : numpy.dtype or str or None
+            output dtype; defaults to the input dtype, or float32 if corrections are given
+        crop_origin, crop_shape : tuple of int or None
+            crop the frames to this region
+        dark : numpy.ndarray or None
+            dark frame that is subtracted from each frame, in the uncropped signal shape
+        gain : numpy.ndarray or None
+            gain map that each frame is multiplied with, in the uncropped signal shape
+        output_format : str
+            "raw" or "chunked"
+        codec, shuffle, chunk_size
+            compression settings for the chunked format, see ``ChunkedSink``
+        """
+        super().__init__(*args, **kwargs)
+        if output_format not in ("raw", "chunked"):
+            raise ValueError("unknown output format: %s" % output_format)
+        sig_shape = tuple(self.dataset.shape.sig)
+        self.output_path = output_path
+        self.crop_origin = tuple(crop_origin or [0] * len(sig_shape))
+        self.crop_shape = tuple(crop_shape or sig_shape)
+        self.dark = dark
+        self.gain = gain
+        if dtype is None:
+            if dark is not None or gain is not None:
+                dtype = "float32"
+            else:
+                dtype = self.dataset.dtype
+        self.dtype = np.dtype(dtype)
+        self.output_format = output_format
+        self.codec = codec or default_codec()
+        self.shuffle = shuffle
+        self.chunk_size = chunk_size
+
+    def get_output_shape(self):
+        return Shape(
+            tuple(self.dataset.shape.nav) + self.crop_shape,
+            sig_dims=self.dataset.shape.sig.dims
+        )
+
+    def get_crop_slice(self):
+        """
+        the region of the output, in the coordinates of ``dataset.raw_shape``
+        """
+        raw_shape = self.dataset.raw_shape
+        return Slice(
+            origin=tuple([0] * raw_shape.nav.dims) + self.crop_origin,
+            shape=Shape(tuple(raw_shape.nav) + self.crop_shape, sig_dims=raw_shape.sig.dims),
+        )
+
+    def _frame_range(self, partition):
+        nav_shape = tuple(self.dataset.raw_shape.nav)
+        part_slice = partition.slice
+        first = np.ravel_multi_index(part_slice.origin[:len(nav_shape)], nav_shape)
+        last = np.ravel_multi_index(
+            tuple(o + s - 1 for o, s in zip(part_slice.origin, part_slice.shape.nav)),
+            nav_shape
+        )
+        if last - first + 1 != part_slice.shape.nav.size:
+            raise DataSetException(
+                "partition %r does not cover a contiguous range of frames" % partition
+            )
+        return int(first), int(last) + 1
+
+    def make_index(self):
+        shape = self.get_output_shape()
+        index = {
+            "version": 1,
+            "mode": self.output_format,
+            "dtype": str(self.dtype),
+            "shape": tuple(shape),
+            "sig_dims": shape.sig.dims,
+        }
+        if self.output_format == "raw":
+            index["filename"] = RAW_FILENAME
+            return index
+        frame_bytes = shape.sig.size * self.dtype.itemsize
+        chunk_frames = max(1, self.chunk_size // frame_bytes)
+        chunks = []
+        # chunks never cross partition boundaries, so each task writes whole chunks:
+        for partition in self.dataset.get_partitions():
+            first, stop = self._frame_range(partition)
+            for start in range(first, stop, chunk_frames):
+                chunks.append({
+                    "start": start,
+                    "num_frames": min(chunk_frames, stop - start),
+                    "filename": CHUNK_FILENAME_FMT % {"idx": len(chunks)},
+                })
+        index.update({
+            "codec": self.codec,
+            "shuffle": self.shuffle,
+            "chunks": chunks,
+        })
+        return index
+
+    def prepare_output(self, index):
+        os.makedirs(self.output_path, exist_ok=True)
+        if self.output_format == "raw":
+            nbytes = self.get_output_shape().size * self.dtype.itemsize
+            with open(os.path.join(self.output_path, RAW_FILENAME), "wb") as f:
+                f.truncate(nbytes)
+        with open(os.path.join(self.output_path, INDEX_FILENAME), "w") as f:
+            json.dump(index, f)
+
+    def _get_output(self, index, partition):
+        shape = self.get_output_shape()
+        if self.output_format == "raw":
+            return RawOutput(
+                path=os.path.join(self.output_path, RAW_FILENAME),
+                shape=tuple(shape.flatten_nav()),
+                dtype=self.dtype,
+            )
+        first, stop = self._frame_range(partition)
+        return ChunkedOutput(
+            dirname=self.output_path,
+            chunks=[c for c in index["chunks"] if first <= c["start"] < stop],
+            sig_shape=tuple(shape.sig),
+            dtype=self.dtype,
+            codec=self.codec,
+            shuffle=self.shuffle,
+        )
+
+    def get_tiling_preferences(self):
+        # the output is written in whole frames, and this job is limited by I/O:
+        return TilingPreferences(whole_frames=True, target_size=self.chunk_size)
+
+    def get_tasks(self):
+        """
+        writes the index and allocates the output, before yielding the tasks
+        """
+        index = self.make_index()
+        self.prepare_output(index)
+        crop_slice = self.get_crop_slice()
+        tiling = self.get_tiling()
+        for idx, partition in enumerate(self.dataset.get_partitions()):
+            yield ConvertTask(
+                partition=partition,
+                idx=idx,
+                tiling=tiling,
+                output=self._get_output(index, partition),
+                crop_slice=crop_slice,
+                dtype=self.dtype,
+                dark=self.dark,
+                gain=self.gain,
+            )
+
+    def get_result_shape(self):
+        return (1,)
+
+    def get_result_dtype(self):
+        return np.dtype("int64")
+
+
+class ConvertTask(Task):
+    def __init__(self, output, crop_slice, dtype, dark, gain, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._output = output
+        self._crop_slice = crop_slice
+        self._dtype = dtype
+        self._dark = dark
+        self._gain = gain
+
+    def for_partition(self, partition):
+        # the chunks of the chunked output must be written by a single task:
+        if isinstance(self._output, ChunkedOutput):
+            return None
+        return super().for_partition(partition)
+
+    def _correct(self, data, sig_slice):
+        if self._dark is None and self._gain is None:
+            return data
+        data = data.astype(np.float32)
+        if self._dark is not None:
+            data -= self._dark[sig_slice]
+        if self._gain is not None:
+            data *= self._gain[sig_slice]
+        return data
+
+    def __call__(self):
+        crop_slice = self._crop_slice
+        nav_shape = tuple(self.partition.meta.raw_shape.nav)
+        try:
+            for tile in self.get_tiles(crop_to=crop_slice):
+                intersection = tile.tile_slice.intersection_with(crop_slice)
+                if intersection.is_null():
+                    continue
+                data = tile.data[intersection.shift(tile.tile_slice).get()]
+                data = data.reshape((-1,) + tuple(intersection.shape.sig))
+                data = self._correct(data, intersection.get(sig_only=True))
+                frames = intersection.get_frame_indices(nav_shape).reshape((-1,))
+                self._output.write(
+                    frames=frames,
+                    sig_slice=intersection.shift(crop_slice).get(sig_only=True),
+                    data=data,
+                )
+        finally:
+            self._output.close()
+        return [ConvertResultTile(num_frames=self.partition.shape.nav.size)]
+
+
+class ConvertResultTile(ResultTile):
+    def __init__(self, num_frames):
+        self.num_frames = num_frames
+
+    @property
+    def dtype(self):
+        return np.dtype("int64")
+
+    def reduce_into_result(self, result):
+        result += self.num_frames
+        return result
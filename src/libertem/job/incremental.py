@@ -0,0 +1,328 @@
+import os
+import json
+import pickle
+import hashlib
+import logging
+
+from libertem.common import Slice, Shape
+from libertem.io.utils import get_cache_dir
+from libertem.io.dataset.base import SubPartition
+from .base import Job, Task
+
+log = logging.getLogger(__name__)
+
+
+def get_partials_key(analysis):
+    """
+    The key for the partial results of ``analysis``, which stays the same if its
+    dataset grows by more frames. None if the results can't be kept, because the
+    dataset or the parameters can't be identified.
+    """
+    dataset = analysis.dataset
+    identity = dataset.get_identity()
+    analysis_key = analysis.get_cache_key()
+    if identity is None or analysis_key is None:
+        return None
+    raw_shape = dataset.raw_shape
+    key = repr((
+        identity, analysis_key, str(dataset.dtype), tuple(raw_shape.sig),
+        # only the first navigation axis may grow:
+        tuple(raw_shape.nav)[1:],
+    ))
+    return hashlib.sha1(key.encode("utf8")).hexdigest()
+
+
+def _stat_files(paths):
+    result = []
+    for path in paths:
+        st = os.stat(path)
+        result.append([path, st.st_size, st.st_mtime_ns])
+    return result
+
+
+def _is_unchanged(entry):
+    try:
+        return _stat_files([f[0] for f in entry['files']]) == entry['files']
+    except (IOError, OSError):
+        return False
+
+
+def _entry_slice(entry):
+    return Slice(
+        origin=tuple(entry['origin']),
+        shape=Shape(tuple(entry['shape']), sig_dims=entry['sig_dims']),
+    )
+
+
+class PartialResultStore(object):
+    def __init__(self, path=None):
+        """
+        Keeps the results of the tasks of an analysis on disk, together with the
+        size and modification time of the files the tasks read, so they can be
+        re-used when the analysis is run again, for example on a dataset that grew.
+
+        Parameters
+        ----------
+        path : str or None
+            directory for the results, by default in ``$LIBERTEM_CACHE_DIR``
+        """
+        if path is None:
+            path = os.path.join(get_cache_dir(), "partials")
+        self.path = path
+
+    def _index_path(self, key):
+        return os.path.join(self.path, key, "index.json")
+
+    def load_entries(self, key):
+        """
+        Returns
+        -------
+        list of dict
+            the stored results for ``key`` whose files didn't change
+        """
+        try:
+            with open(self._index_path(key), "r") as f:
+                entries = json.load(f)
+        except (IOError, OSError, ValueError):
+            return []
+        return [
+            entry for entry in entries
+            if _is_unchanged(entry)
+            and os.path.exists(os.path.join(self.path, key, entry['filename']))
+        ]
+
+    def load_tiles(self, key, entry):
+        with open(os.path.join(self.path, key, entry['filename']), "rb") as f:
+            return pickle.load(f)
+
+    def store_tiles(self, key, partition, tiles):
+        """
+        Store the result ``tiles`` of the task for ``partition``
+
+        Returns
+        -------
+        dict or None
+            the new entry, None if the results can't be stored because the
+            partition doesn't read from files
+        """
+        paths = partition.get_paths()
+        if not paths:
+            return None
+        pslice = partition.slice
+        entry = {
+            'origin': list(pslice.origin),
+            'shape': list(pslice.shape),
+            'sig_dims': pslice.shape.sig.dims,
+            'files': _stat_files(paths),
+            'filename': "%s.pickle" % hashlib.sha1(
+                repr((pslice.origin, tuple(pslice.shape))).encode("utf8")
+            ).hexdigest(),
+        }
+        path = os.path.join(self.path, key, entry['filename'])
+        tmp_path = "%s.%d.tmp" % (path, os.getpid())
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, "wb") as f:
+                pickle.dump(list(tiles), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except (IOError, OSError) as e:
+            log.warning("could not store partial results: %s", e)
+            return None
+        return entry
+
+    def store_entries(self, key, entries):
+        """
+        replace the index for ``key`` with ``entries``, and remove results that are
+        no longer used
+        """
+        index_path = self._index_path(key)
+        tmp_path = "%s.%d.tmp" % (index_path, os.getpid())
+        try:
+            os.makedirs(os.path.dirname(index_path), exist_ok=True)
+            with open(tmp_path, "w") as f:
+                json.dump(entries, f)
+            os.replace(tmp_path, index_path)
+            used = {entry['filename'] for entry in entries} | {"index.json"}
+            for fn in os.listdir(os.path.dirname(index_path)):
+                if fn not in used and fn.endswith(".pickle"):
+                    os.unlink(os.path.join(os.path.dirname(index_path), fn))
+        except (IOError, OSError) as e:
+            log.warning("could not store index of partial results: %s", e)
+
+
+class _PartialResult(object):
+    def __init__(self, partition, tiles, idx=None):
+        self.partition = partition
+        self.tiles = tiles
+        self.idx = idx
+
+
+class _PartialTask(Task):
+    """
+    wraps a task, so its results can be assigned to its partition
+    """
+    def __init__(self, task):
+        self.task = task
+        super().__init__(partition=task.partition, idx=task.idx, tiling=task.tiling)
+
+    def for_partition(self, partition):
+        task = self.task.for_partition(partition)
+        if task is None:
+            return None
+        return _PartialTask(task)
+
+    def get_locations(self):
+        return self.task.get_locations()
+
+    def __call__(self):
+        return _PartialResult(
+            partition=self.partition, tiles=list(self.task()), idx=self.idx,
+        )
+
+
+class _TaskListJob(Job):
+    def __init__(self, job, tasks):
+        super().__init__(dataset=job.dataset)
+        self._job = job
+        self._tasks = tasks
+
+    def get_tasks(self):
+        return iter(self._tasks)
+
+    def get_result_shape(self):
+        return self._job.get_result_shape()
+
+
+def _frame_range(pslice):
+    return pslice.origin[0], pslice.origin[0] + pslice.shape[0]
+
+
+def _choose_entries(entries, num_frames):
+    """
+    non-overlapping entries, preferring those that start first and are longest
+    """
+    chosen = []
+    end = 0
+    for entry in sorted(entries, key=lambda e: (e['origin'][0], -e['shape'][0])):
+        start, stop = _frame_range(_entry_slice(entry))
+        if start >= end and stop <= num_frames:
+            chosen.append(entry)
+            end = stop
+    return chosen
+
+
+def _get_gaps(start, stop, entries):
+    gaps = []
+    pos = start
+    for entry in entries:
+        e_start, e_stop = _frame_range(_entry_slice(entry))
+        if e_start > pos:
+            gaps.append((pos, e_start))
+        pos = max(pos, e_stop)
+    if pos < stop:
+        gaps.append((pos, stop))
+    return gaps
+
+
+class IncrementalRun(object):
+    def __init__(self, job, key, store):
+        """
+        Run ``job``, re-using the stored results of partitions that didn't change,
+        and store the results of the others. For datasets with a single navigation
+        axis, stored results can cover any range of frames, and only the frames
+        that are not covered are read; otherwise, stored results are only re-used
+        for partitions with the same slice.
+
+        Parameters
+        ----------
+        job : Job
+            the job to run; its results must be independent per partition, and
+            ``ResultTile.reduce_into_result`` must add them to the result
+        key : str
+            identifies the job and its dataset, see ``get_partials_key``
+        store : PartialResultStore
+        """
+        self.job = job
+        self.key = key
+        self.store = store
+
+    def plan(self):
+        """
+        Returns
+        -------
+        (list of dict, list of Task)
+            the stored entries that are re-used, and the tasks that need to run
+        """
+        tasks = list(self.job.get_tasks())
+        entries = self.store.load_entries(self.key)
+        if not entries:
+            return [], tasks
+        if self.job.dataset.raw_shape.nav.dims == 1:
+            plan = self._plan_frame_ranges(tasks, entries)
+            if plan is not None:
+                return plan
+            return [], tasks
+        by_slice = {_entry_slice(entry): entry for entry in entries}
+        used = []
+        remaining = []
+        for task in tasks:
+            entry = by_slice.get(task.partition.slice)
+            if entry is None:
+                remaining.append(task)
+            else:
+                used.append(entry)
+        return used, remaining
+
+    def _plan_frame_ranges(self, tasks, entries):
+        chosen = _choose_entries(entries, self.job.dataset.raw_shape.nav.size)
+        used = {}
+        remaining = []
+        for task in tasks:
+            pslice = task.partition.slice
+            start, stop = _frame_range(pslice)
+            covering = [
+                entry for entry in chosen
+                if _frame_range(_entry_slice(entry))[0] < stop
+                and _frame_range(_entry_slice(entry))[1] > start
+            ]
+            gaps = _get_gaps(start, stop, covering)
+            for entry in covering:
+                used[entry['filename']] = entry
+            if gaps == [(start, stop)]:
+                remaining.append(task)
+                continue
+            for (g_start, g_stop) in gaps:
+                gap_slice = Slice(
+                    origin=(g_start,) + tuple(pslice.origin[1:]),
+                    shape=Shape((g_stop - g_start,) + tuple(pslice.shape[1:]),
+                                sig_dims=pslice.shape.sig.dims),
+                )
+                part = task.for_partition(SubPartition(task.partition, gap_slice))
+                if part is None:
+                    # can't combine the results of parts of this task
+                    return None
+                remaining.append(part)
+        return list(used.values()), remaining
+
+    def run(self, executor):
+        """
+        Like ``JobExecutor.run_job``: yields the result tiles of the stored entries
+        and of the tasks that are run
+        """
+        used, tasks = self.plan()
+        log.info("re-using %d stored results, running %d tasks", len(used), len(tasks))
+        entries = list(used)
+        try:
+            for entry in used:
+                yield self.store.load_tiles(self.key, entry)
+            if not tasks:
+                return
+            job = _TaskListJob(self.job, [_PartialTask(task) for task in tasks])
+            for result in executor.run_job(job):
+                entry = self.store.store_tiles(self.key, result.partition, result.tiles)
+                if entry is not None:
+                    entries.append(entry)
+                yield result.tiles
+        finally:
+            # also keep the results we have if the job fails:
+            self.store.store_entries(self.key, entries)
@@ -9,6 +9,7 @@ import scipy.sparse as sp
 import numpy as np
 
 from libertem.io.dataset.base import DataTile, Partition
+from libertem.io.tiling import TilingPreferences
 from .base import Job, Task, ResultTile
 from libertem.masks import to_dense, to_sparse
 from libertem.common import Slice
@@ -47,13 +48,23 @@ class ApplyMasksJob(Job):
         self.masks = MaskContainer(mask_factories, dtype=mask_dtype, use_sparse=use_sparse)
         self.use_torch = use_torch
 
+    def get_tiling_preferences(self):
+        if self.masks.use_sparse:
+            return TilingPreferences()
+        # like in benchmarks/fastdot: keep the part of the masks for a tile in L2
+        return TilingPreferences(
+            resident_bytes_per_pixel=len(self.masks) * self.masks.dtype.itemsize,
+        )
+
     def get_tasks(self):
+        tiling = self.get_tiling()
         for idx, partition in enumerate(self.dataset.get_partitions()):
             yield ApplyMasksTask(
                 partition=partition,
                 masks=self.masks,
                 use_torch=self.use_torch,
                 idx=idx,
+                tiling=tiling,
             )
 
     def get_result_shape(self):
@@ -192,7 +203,7 @@ class ApplyMasksTask(Task):
         if dest_dtype.kind not in ('c', 'f'):
             dest_dtype = 'float32'
         part = np.zeros((num_masks,) + tuple(self.partition.shape.nav), dtype=dest_dtype)
-        for data_tile in self.partition.get_tiles():
+        for data_tile in self.get_tiles():
             flat_data = data_tile.flat_data
             if flat_data.dtype != dest_dtype:
                 data = flat_data.astype(dest_dtype)
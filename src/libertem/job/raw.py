@@ -15,10 +15,11 @@ class PickFrameJob(Job):
         self._squeeze = squeeze
 
     def get_tasks(self):
+        tiling = self.get_tiling()
         for idx, partition in enumerate(self.dataset.get_partitions()):
             if self._slice.intersection_with(partition.slice).is_null():
                 continue
-            yield PickFrameTask(partition=partition, slice_=self._slice, idx=idx)
+            yield PickFrameTask(partition=partition, slice_=self._slice, idx=idx, tiling=tiling)
 
     def get_result_shape(self):
         if self._squeeze:
@@ -33,7 +34,7 @@ class PickFrameTask(Task):
 
     def __call__(self):
         result = np.zeros(self._slice.shape, dtype=self.partition.dtype)
-        for data_tile in self.partition.get_tiles(crop_to=self._slice):
+        for data_tile in self.get_tiles(crop_to=self._slice):
             intersection = data_tile.tile_slice.intersection_with(self._slice)
             # shift to data_tile relative coordinates:
             shifted = intersection.shift(data_tile.tile_slice)
@@ -5,8 +5,9 @@ from .base import Job, Task, ResultTile
 
 class SumFramesJob(Job):
     def get_tasks(self):
+        tiling = self.get_tiling()
         for idx, partition in enumerate(self.dataset.get_partitions()):
-            yield SumFramesTask(partition=partition, idx=idx)
+            yield SumFramesTask(partition=partition, idx=idx, tiling=tiling)
 
     def get_result_shape(self):
         return self.dataset.shape.sig
@@ -21,7 +22,7 @@ class SumFramesTask(Task):
         if dest_dtype.kind not in ('c', 'f'):
             dest_dtype = 'float32'
         part = np.zeros(self.partition.meta.shape.sig, dtype=dest_dtype)
-        for data_tile in self.partition.get_tiles():
+        for data_tile in self.get_tiles():
             if data_tile.data.dtype != dest_dtype:
                 data = data_tile.data.astype(dest_dtype)
             else:
@@ -18,6 +18,9 @@ from libertem.executor.dask import AsyncDaskJobExecutor
 from libertem.executor.base import JobCancelledError
 from libertem.io.dataset.base import DataSetException
 from libertem.io import dataset
+from libertem.io.planner import PartitionPlanner
+from libertem.job.cache import ResultCache, get_result_key
+from libertem.job.checkpoint import CheckpointedRun, CheckpointStore
 from libertem.analysis import (
     DiskMaskAnalysis, RingMaskAnalysis, PointMaskAnalysis,
     COMAnalysis, SumAnalysis, PickFrameAnalysis
@@ -26,6 +29,13 @@ from libertem.analysis import (
 
 log = logging.getLogger(__name__)
 
+# dask priorities of the tasks of each class of jobs; `run_function` uses 1:
+PRIORITY_CLASSES = {
+    "interactive": 10,
+    "preview": 0,
+    "batch": -10,
+}
+
 
 def log_message(message, exception=False):
     log_fn = log.info
@@ -207,8 +217,13 @@ class Message(object):
         }
 
 
+async def _no_results():
+    return
+    yield
+
+
 class RunJobMixin(object):
-    async def run_job(self, uuid, ds, job, full_result):
+    async def run_job(self, uuid, ds, job, full_result, task_results=None):
         self.data.register_job(uuid=uuid, job=job)
         executor = self.data.get_executor()
         msg = Message(self.data).start_job(
@@ -219,9 +234,11 @@ class RunJobMixin(object):
         self.finish()
         self.event_registry.broadcast_event(msg)
 
+        if task_results is None:
+            task_results = executor.run_job(job)
         t = time.time()
         try:
-            async for result in executor.run_job(job):
+            async for result in task_results:
                 for tile in result:
                     tile.reduce_into_result(full_result)
                 if time.time() - t < 0.3:
@@ -336,6 +353,17 @@ class JobDetailHandler(CORSMixin, RunJobMixin, tornado.web.RequestHandler):
         self.data = data
         self.event_registry = event_registry
 
+    def get_priority_class(self, type_):
+        priority_classes = {
+            "APPLY_DISK_MASK": "preview",
+            "APPLY_RING_MASK": "preview",
+            "APPLY_POINT_SELECTOR": "preview",
+            "CENTER_OF_MASS": "batch",
+            "SUM_FRAMES": "batch",
+            "PICK_FRAME": "interactive",
+        }
+        return priority_classes[type_]
+
     def get_analysis_by_type(self, type_):
         analysis_by_type = {
             "APPLY_DISK_MASK": DiskMaskAnalysis,
@@ -355,11 +383,45 @@ class JobDetailHandler(CORSMixin, RunJobMixin, tornado.web.RequestHandler):
             dataset=ds,
             parameters=params['analysis']['parameters']
         )
+        priority_class = params.get("priority")
+        if priority_class not in PRIORITY_CLASSES:
+            priority_class = self.get_priority_class(params['analysis']['type'])
+        # there are no user accounts, so we tell users apart by their address:
+        user = params.get("user", self.request.remote_ip)
+        executor = self.data.get_executor()
         job = analysis.get_job()
         full_result = job.get_result_buffer()
+        result_cache = self.data.get_result_cache()
+        key = None
+        # interactive jobs are small, computing the key would take about as long:
+        if priority_class != "interactive":
+            key = await run_blocking(get_result_key, analysis)
+        cached = None
+        if key is not None:
+            cached = await run_blocking(result_cache.get, key)
+        task_results = None
+        if cached is not None:
+            # we only need to send the cached result:
+            full_result[:] = cached
+            task_results = _no_results()
+        else:
+            run_fn = partial(executor.run_job, job)
+            # only long batch jobs are worth the cost of checkpoints:
+            if key is not None and priority_class == "batch":
+                run = CheckpointedRun(
+                    job, key, self.data.get_checkpoints(),
+                    interval=self.data.checkpoint_interval,
+                )
+                await run_blocking(run.start)
+                job = run.job
+                run_fn = partial(run.run_async, executor)
+            task_results = self.data.get_job_scheduler().run(
+                uuid=uuid, user=user, priority_class=priority_class, run_fn=run_fn,
+            )
         job_runner = self.run_job(
             full_result=full_result,
             uuid=uuid, ds=ds, job=job,
+            task_results=task_results,
         )
         try:
             await job_runner.asend(None)
@@ -370,7 +432,11 @@ class JobDetailHandler(CORSMixin, RunJobMixin, tornado.web.RequestHandler):
                 )
                 await job_runner.asend(results)
         except StopAsyncIteration:
-            pass
+            # if the data changed while the job was running, the key is outdated,
+            # and the result won't be found under it again:
+            if (cached is None and key is not None
+                    and not self.data.job_is_cancelled(uuid)):
+                await run_blocking(result_cache.put, key, full_result)
         except Exception as e:
             log.exception("error running job, params=%r", params)
             msg = Message(self.data).job_error(uuid, "error running job: %s" % str(e))
@@ -415,7 +481,7 @@ class DataSetDetailHandler(CORSMixin, tornado.web.RequestHandler):
         # TODO: validate request_data
         # let's start simple:
         assert params['type'].lower() in ["hdfs", "hdf5", "raw", "mib", "blo", "k2is", "ser",
-                                          "frms6"]
+                                          "frms6", "empad", "npy", "chunked"]
         if params["type"].lower() == "hdfs":
             dataset_params = {
                 "index_path": params["path"],
@@ -427,7 +493,7 @@ class DataSetDetailHandler(CORSMixin, tornado.web.RequestHandler):
             dataset_params = {
                 "path": params["path"],
                 "ds_path": params["ds_path"],
-                "tileshape": params["tileshape"],
+                "tileshape": params.get("tileshape"),
             }
         elif params["type"].lower() == "raw":
             dataset_params = {
@@ -441,7 +507,7 @@ class DataSetDetailHandler(CORSMixin, tornado.web.RequestHandler):
         elif params["type"].lower() == "mib":
             dataset_params = {
                 "path": params["path"],
-                "tileshape": params["tileshape"],
+                "tileshape": params.get("tileshape"),
                 "scan_size": params["scan_size"],
             }
         elif params["type"].lower() == "blo":
@@ -461,12 +527,27 @@ class DataSetDetailHandler(CORSMixin, tornado.web.RequestHandler):
             dataset_params = {
                 "path": params["path"],
             }
+        elif params["type"].lower() == "empad":
+            dataset_params = {
+                "path": params["path"],
+            }
+        elif params["type"].lower() == "npy":
+            dataset_params = {
+                "path": params["path"],
+            }
+        elif params["type"].lower() == "chunked":
+            dataset_params = {
+                "path": params["path"],
+            }
         try:
             executor = self.data.get_executor()
             ds = await executor.run_function(dataset.load,
                                              filetype=params["type"], **dataset_params)
             ds = await executor.run_function(ds.initialize)
             await executor.run_function(ds.check_valid)
+            resources = executor.get_resources()
+            if resources is not None:
+                ds.set_planner(PartitionPlanner(**resources))
             self.data.register_dataset(
                 uuid=uuid,
                 dataset=ds,
@@ -505,6 +586,109 @@ class DataSetDetectHandler(tornado.web.RequestHandler):
         self.write(msg)
 
 
+class JobScheduler(object):
+    def __init__(self, max_jobs_per_user=None):
+        """
+        Decides when the jobs of the web server run, so long batch jobs don't hold up
+        interactive work. Each job has a priority class from ``PRIORITY_CLASSES``,
+        which sets the dask priority of its tasks. While a job of a higher class
+        is running, jobs of lower classes are paused after their running tasks,
+        that is, at partition boundaries. The number of jobs of a class that each
+        user can run at the same time can be limited; further jobs wait.
+
+        Parameters
+        ----------
+        max_jobs_per_user : dict or None
+            for each priority class, the number of jobs that a user can run at the
+            same time, None for no limit
+        """
+        if max_jobs_per_user is None:
+            max_jobs_per_user = {"interactive": None, "preview": 2, "batch": 1}
+        self.max_jobs_per_user = max_jobs_per_user
+        self._running = {}
+        self._waiting = set()
+        self._cancelled = set()
+        self._changed = None
+
+    def _get_condition(self):
+        # created lazily, so it belongs to the running event loop:
+        if self._changed is None:
+            self._changed = asyncio.Condition()
+        return self._changed
+
+    def _can_start(self, user, priority_class):
+        limit = self.max_jobs_per_user.get(priority_class)
+        if limit is None:
+            return True
+        running = [
+            uuid for uuid, (u, p) in self._running.items()
+            if u == user and p == priority_class
+        ]
+        return len(running) < limit
+
+    async def acquire(self, uuid, user, priority_class):
+        """
+        wait until job ``uuid`` can start; raises `JobCancelledError` if it is
+        cancelled while waiting
+        """
+        changed = self._get_condition()
+        async with changed:
+            self._waiting.add(uuid)
+            try:
+                await changed.wait_for(
+                    lambda: uuid in self._cancelled or self._can_start(user, priority_class)
+                )
+            finally:
+                self._waiting.discard(uuid)
+            if uuid in self._cancelled:
+                self._cancelled.discard(uuid)
+                raise JobCancelledError()
+            self._running[uuid] = (user, priority_class)
+
+    async def release(self, uuid):
+        changed = self._get_condition()
+        async with changed:
+            self._running.pop(uuid, None)
+            changed.notify_all()
+
+    async def cancel(self, uuid):
+        """
+        cancel job ``uuid`` if it is waiting; running jobs are cancelled via the executor
+        """
+        changed = self._get_condition()
+        async with changed:
+            if uuid in self._waiting:
+                self._cancelled.add(uuid)
+                changed.notify_all()
+
+    def should_pause(self, uuid):
+        """
+        whether the running job ``uuid`` should wait for a job with a higher priority
+        """
+        priority = PRIORITY_CLASSES[self._running[uuid][1]]
+        return any(
+            PRIORITY_CLASSES[p] > priority
+            for other, (u, p) in self._running.items()
+            if other != uuid
+        )
+
+    async def run(self, uuid, user, priority_class, run_fn):
+        """
+        wait until job ``uuid`` can start, then yield the results of
+        ``run_fn(priority=..., pause=...)``, usually ``AsyncDaskJobExecutor.run_job``
+        """
+        await self.acquire(uuid, user, priority_class)
+        try:
+            results = run_fn(
+                priority=PRIORITY_CLASSES[priority_class],
+                pause=partial(self.should_pause, uuid),
+            )
+            async for result in results:
+                yield result
+        finally:
+            await self.release(uuid)
+
+
 class SharedData(object):
     def __init__(self):
         self.datasets = {}
@@ -513,6 +697,10 @@ class SharedData(object):
         self.dataset_to_id = {}
         self.executor = None
         self.cluster_params = {}
+        self.result_cache = ResultCache()
+        self.checkpoints = CheckpointStore()
+        self.checkpoint_interval = 60
+        self.job_scheduler = JobScheduler()
 
     def get_local_cores(self, default=2):
         cores = psutil.cpu_count(logical=False)
@@ -536,6 +724,15 @@ class SharedData(object):
             raise RuntimeError("wrong state: executor is None")
         return self.executor
 
+    def get_result_cache(self):
+        return self.result_cache
+
+    def get_checkpoints(self):
+        return self.checkpoints
+
+    def get_job_scheduler(self):
+        return self.job_scheduler
+
     def have_executor(self):
         return self.executor is not None
 
@@ -593,6 +790,7 @@ class SharedData(object):
         try:
             job = self.jobs[uuid]
             executor = self.get_executor()
+            await self.job_scheduler.cancel(uuid)
             await executor.cancel_job(job)
             del self.jobs[uuid]
             del self.job_to_id[job]
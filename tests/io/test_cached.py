@@ -0,0 +1,180 @@
+import os
+import time
+import multiprocessing
+
+import numpy as np
+import pytest
+
+from libertem.io.dataset.npy import NPYDataSet
+from libertem.io.dataset.chunked import ChunkedDataSet
+from libertem.io.ingest.chunked import ChunkedSink
+from libertem.io.dataset.cached import CachedDataSet, LocalFSCache, SharedMemoryCache
+from libertem.io.shm import have_shm
+
+from utils import _naive_mask_apply, _mk_random
+
+
+def _cached_files(cache_dir):
+    return [
+        os.path.join(dirpath, fn)
+        for dirpath, dirnames, filenames in os.walk(cache_dir)
+        for fn in filenames
+    ]
+
+
+def _npy_ds(tmpdir, name, data):
+    path = str(tmpdir.join(name))
+    np.save(path, data)
+    return NPYDataSet(path=path).initialize()
+
+
+def test_fill_and_hit(tmpdir, lt_ctx):
+    data = _mk_random(size=(8, 8, 16, 16), dtype='float32')
+    source_ds = _npy_ds(tmpdir, "data.npy", data)
+    cache = LocalFSCache(cache_dir=str(tmpdir.join("cache")))
+    ds = CachedDataSet(source_ds, cache=cache)
+    mask = _mk_random(size=(16, 16))
+    expected = _naive_mask_apply([mask], data)
+
+    for i in range(2):
+        analysis = lt_ctx.create_mask_analysis(factories=[lambda: mask], dataset=ds)
+        results = lt_ctx.run(analysis)
+        assert np.allclose(results.mask_0.raw_data, expected)
+        num_partitions = len(list(ds.get_partitions()))
+        assert len(_cached_files(cache.cache_dir)) == num_partitions
+
+    for p in ds.get_partitions():
+        tile = next(p.get_tiles())
+        assert isinstance(tile.data.base, np.memmap)
+
+
+def test_incomplete_pass_is_not_cached(tmpdir):
+    data = _mk_random(size=(8, 8, 16, 16), dtype='float32')
+    source_ds = _npy_ds(tmpdir, "data.npy", data)
+    cache = LocalFSCache(cache_dir=str(tmpdir.join("cache")))
+    ds = CachedDataSet(source_ds, cache=cache)
+    p = next(ds.get_partitions())
+    tiles = p.get_tiles()
+    next(tiles)
+    tiles.close()
+    assert _cached_files(cache.cache_dir) == []
+
+
+def test_lru_eviction(tmpdir):
+    data = _mk_random(size=(8, 16, 16), dtype='float32')
+    # room for two entries:
+    cache = LocalFSCache(cache_dir=str(tmpdir.join("cache")), max_size=2 * data.nbytes)
+
+    def _put(key):
+        entry = cache.create(key, shape=data.shape, dtype=data.dtype)
+        entry.data[:] = data
+        entry.commit()
+        # file times have a limited resolution:
+        time.sleep(0.05)
+
+    def _get(key):
+        return cache.get(key, shape=data.shape, dtype=data.dtype)
+
+    _put("ds/a")
+    _put("ds/b")
+    assert np.allclose(_get("ds/a"), data)
+    time.sleep(0.05)
+    _put("ds/c")
+    assert len(_cached_files(cache.cache_dir)) == 2
+    assert _get("ds/b") is None
+    assert _get("ds/a") is not None
+    assert _get("ds/c") is not None
+    assert cache.create("ds/too-large", shape=(3,) + data.shape, dtype=data.dtype) is None
+
+
+def test_cache_key():
+    ds1 = CachedDataSet(NPYDataSet(path="a.npy", scan_size=(4, 1)), cache=LocalFSCache())
+    ds2 = CachedDataSet(NPYDataSet(path="a.npy", scan_size=(1, 4)), cache=LocalFSCache())
+    ds3 = CachedDataSet(NPYDataSet(path="a.npy", scan_size=(4, 1)), cache=LocalFSCache())
+    assert ds1._cache_key != ds2._cache_key
+    assert ds1._cache_key == ds3._cache_key
+
+
+def test_cache_key_all_files(tmpdir):
+    data = _mk_random(size=(4, 4, 16, 16), dtype='float32')
+    sink = ChunkedSink(codec="zlib", chunk_size=16*16*4*4)
+    sink.prepare_output(str(tmpdir))
+    idx = sink.make_index(data=data, dtype=data.dtype)
+    sink.write_index(idx, str(tmpdir.join("index.json")))
+    sink.write_partitions(idx=idx, dataset=data, output_path=str(tmpdir), dtype=data.dtype)
+    ds = ChunkedDataSet(path=str(tmpdir)).initialize()
+    key = ds.get_cache_key()
+    assert ds.get_cache_key() == key
+
+    # a chunk changes, but not the index:
+    chunk_path = str(tmpdir.join(idx['chunks'][-1]['filename']))
+    with open(chunk_path, "ab") as f:
+        f.write(b"\0")
+    assert ds.get_cache_key() != key
+
+
+@pytest.fixture
+def shm_cache(tmpdir):
+    cache = SharedMemoryCache(index_dir=str(tmpdir.join("shm-index")))
+    yield cache
+    cache.clear()
+
+
+def _get_from_cache(cache, key, shape, dtype):
+    data = cache.get(key, shape=shape, dtype=dtype)
+    return data is not None and data.sum()
+
+
+@pytest.mark.skipif(not have_shm(), reason="needs multiprocessing.shared_memory")
+def test_shm_fill_and_hit(tmpdir, shm_cache, lt_ctx):
+    data = _mk_random(size=(8, 8, 16, 16), dtype='float32')
+    ds = CachedDataSet(_npy_ds(tmpdir, "data.npy", data), cache=shm_cache)
+    mask = _mk_random(size=(16, 16))
+    expected = _naive_mask_apply([mask], data)
+    for i in range(2):
+        analysis = lt_ctx.create_mask_analysis(factories=[lambda: mask], dataset=ds)
+        results = lt_ctx.run(analysis)
+        assert np.allclose(results.mask_0.raw_data, expected)
+
+    partitions = list(ds.get_partitions())
+    assert len(list(shm_cache._entries())) == len(partitions)
+
+    # other processes map the same blocks:
+    p = partitions[0]
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(1) as pool:
+        result = pool.apply(_get_from_cache, (shm_cache, p._get_key(), p.shape, p.dtype))
+    assert np.allclose(result, data[p.slice.get()].sum())
+
+
+@pytest.mark.skipif(not have_shm(), reason="needs multiprocessing.shared_memory")
+def test_shm_lru_eviction(shm_cache):
+    data = _mk_random(size=(8, 16, 16), dtype='float32')
+    shm_cache.max_size = 2 * data.nbytes
+
+    def _put(key):
+        entry = shm_cache.create(key, shape=data.shape, dtype=data.dtype)
+        entry.data[:] = data
+        entry.commit()
+        time.sleep(0.05)
+
+    def _get(key):
+        return shm_cache.get(key, shape=data.shape, dtype=data.dtype)
+
+    _put("ds/a")
+    _put("ds/b")
+    a = _get("ds/a")
+    assert np.allclose(a, data)
+    time.sleep(0.05)
+    _put("ds/c")
+    assert len(list(shm_cache._entries())) == 2
+    assert _get("ds/b") is None
+    assert _get("ds/c") is not None
+    # an entry that is being filled can't be created a second time:
+    entry = shm_cache.create("ds/d", shape=data.shape, dtype=data.dtype)
+    assert shm_cache.create("ds/d", shape=data.shape, dtype=data.dtype) is None
+    entry.abort()
+    assert _get("ds/d") is None
+    entry = shm_cache.create("ds/d", shape=data.shape, dtype=data.dtype)
+    assert entry is not None
+    entry.abort()
@@ -0,0 +1,117 @@
+import os
+import json
+
+import h5py
+import numpy as np
+import pytest
+
+from libertem.io.dataset.chunked import ChunkedDataSet
+from libertem.io.dataset.base import DataSetException
+from libertem.io.ingest.chunked import ChunkedSink
+from libertem.io.ingest.hdf5 import H5Ingestor
+from libertem.io.codecs import available_codecs, compress, decompress, shuffle, unshuffle
+from libertem.job.raw import PickFrameJob
+from libertem.common import Slice, Shape
+
+from utils import _naive_mask_apply, _mk_random
+
+
+def _write(data, path, codec="zlib", shuffle=True, chunk_size=16*16*4*7):
+    sink = ChunkedSink(codec=codec, shuffle=shuffle, chunk_size=chunk_size)
+    sink.prepare_output(path)
+    idx = sink.make_index(data=data, dtype=data.dtype)
+    sink.write_index(idx, os.path.join(path, "index.json"))
+    sink.write_partitions(idx=idx, dataset=data, output_path=path, dtype=data.dtype)
+    return idx
+
+
+@pytest.fixture(scope='module')
+def chunked_data(tmpdir_factory):
+    datadir = str(tmpdir_factory.mktemp('chunked'))
+    data = _mk_random(size=(5, 6, 16, 16), dtype='float32')
+    _write(data, datadir)
+    return datadir, data
+
+
+@pytest.mark.parametrize("codec", available_codecs())
+def test_codec_roundtrip(codec):
+    data = _mk_random(size=(3, 16, 16), dtype='uint16')
+    raw = decompress(codec, compress(codec, shuffle(data)))
+    result = np.frombuffer(unshuffle(raw, data.dtype.itemsize), dtype=data.dtype)
+    assert np.allclose(result.reshape(data.shape), data)
+
+
+def test_index(chunked_data):
+    path, data = chunked_data
+    with open(os.path.join(path, "index.json")) as f:
+        idx = json.load(f)
+    assert idx['mode'] == 'chunked'
+    assert tuple(idx['shape']) == data.shape
+    # 7 frames per chunk, the last one is shorter:
+    assert [c['num_frames'] for c in idx['chunks']] == [7, 7, 7, 7, 2]
+    assert ChunkedDataSet.detect_params(path) == {"path": os.path.join(path, "index.json")}
+
+
+@pytest.mark.parametrize("codec", available_codecs())
+def test_roundtrip(tmpdir, codec):
+    data = _mk_random(size=(4, 4, 16, 16), dtype='uint16')
+    _write(data, str(tmpdir), codec=codec, shuffle=codec != "none")
+    ds = ChunkedDataSet(path=str(tmpdir)).initialize()
+    assert ds.check_valid()
+    result = np.zeros(tuple(ds.raw_shape), dtype=ds.dtype)
+    for p in ds.get_partitions():
+        for tile in p.get_tiles():
+            result[tile.tile_slice.get()] = tile.data
+    assert np.allclose(result.reshape(data.shape), data)
+
+
+def test_apply_mask_analysis(chunked_data, lt_ctx):
+    path, data = chunked_data
+    ds = ChunkedDataSet(path=path, min_num_partitions=2).initialize()
+    mask = _mk_random(size=(16, 16))
+    analysis = lt_ctx.create_mask_analysis(factories=[lambda: mask], dataset=ds)
+    results = lt_ctx.run(analysis)
+    expected = _naive_mask_apply([mask], data)
+    assert np.allclose(results.mask_0.raw_data, expected)
+
+
+def test_crop_to(chunked_data, lt_ctx):
+    path, data = chunked_data
+    ds = ChunkedDataSet(path=path).initialize()
+    slice_ = Slice(shape=Shape((9, 8, 8), sig_dims=2), origin=(10, 4, 4))
+    job = PickFrameJob(dataset=ds, slice_=slice_)
+    res = lt_ctx.run(job)
+    assert np.allclose(res, data.reshape((30, 16, 16))[10:19, 4:12, 4:12])
+
+
+def test_missing_chunk(tmpdir):
+    data = _mk_random(size=(2, 2, 16, 16), dtype='float32')
+    idx = _write(data, str(tmpdir))
+    os.unlink(os.path.join(str(tmpdir), idx['chunks'][0]['filename']))
+    ds = ChunkedDataSet(path=str(tmpdir)).initialize()
+    with pytest.raises(DataSetException):
+        ds.check_valid()
+
+
+def test_ingest_hdf5(tmpdir):
+    data = _mk_random(size=(3, 5, 16, 16), dtype='float32')
+    h5_path = str(tmpdir.join("in.h5"))
+    with h5py.File(h5_path, "w") as f:
+        f.create_dataset("data", data=data)
+    out_path = str(tmpdir.join("out"))
+    ingestor = H5Ingestor(sink=ChunkedSink(codec="zlib", chunk_size=16*16*4*4))
+    ingestor.main(
+        input_filename=h5_path,
+        input_dataset_path="data",
+        output_path=out_path,
+        target_partition_size=512*1024*1024,
+        dest_dtype="float64",
+    )
+    ds = ChunkedDataSet(path=out_path).initialize()
+    assert ds.dtype == np.dtype("float64")
+    assert tuple(ds.shape) == data.shape
+    result = np.zeros(tuple(ds.raw_shape), dtype=ds.dtype)
+    for p in ds.get_partitions():
+        for tile in p.get_tiles():
+            result[tile.tile_slice.get()] = tile.data
+    assert np.allclose(result.reshape(data.shape), data)
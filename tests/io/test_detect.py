@@ -14,6 +14,5 @@ def test_detection_nonempty_hdf5(hdf5_ds_1):
     assert params != {}
     assert params["ds_path"] == "data"
     assert params["path"] == fn
-    assert params["tileshape"] == (1, 8, 16, 16)
     assert params["type"] == "hdf5"
-    assert list(params.keys()) == ["path", "ds_path", "tileshape", "type"]
+    assert list(params.keys()) == ["path", "ds_path", "type"]
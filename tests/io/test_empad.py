@@ -0,0 +1,100 @@
+import os
+import pickle
+
+import numpy as np
+import pytest
+
+from libertem.io.dataset.empad import EMPADDataSet
+from libertem.io.dataset.base import DataSetException
+from libertem.job.raw import PickFrameJob
+from libertem.common import Slice, Shape
+
+from utils import _naive_mask_apply, _mk_random
+
+EMPAD_XML = """<?xml version="1.0" ?>
+<root>
+  <raw_file filename="%(raw)s"/>
+  <scan_parameters mode="acquire">
+    <scan_resolution_x>%(scan_x)d</scan_resolution_x>
+    <scan_resolution_y>%(scan_y)d</scan_resolution_y>
+  </scan_parameters>
+</root>
+"""
+
+
+@pytest.fixture(scope='module')
+def empad_data(tmpdir_factory):
+    datadir = tmpdir_factory.mktemp('data')
+    raw_data = _mk_random(size=(4, 5, 130, 128), dtype='float32')
+    raw_data.tofile(str(datadir + '/scan.raw'))
+    xml_path = str(datadir + '/scan.xml')
+    with open(xml_path, "w") as f:
+        f.write(EMPAD_XML % {"raw": "scan.raw", "scan_x": 5, "scan_y": 4})
+    return xml_path, raw_data
+
+
+@pytest.fixture
+def default_empad(empad_data):
+    xml_path, _ = empad_data
+    ds = EMPADDataSet(path=xml_path)
+    ds = ds.initialize()
+    return ds
+
+
+def test_detect(empad_data):
+    xml_path, _ = empad_data
+    assert EMPADDataSet.detect_params(xml_path) == {"path": xml_path}
+    assert EMPADDataSet.detect_params(xml_path.replace(".xml", ".raw")) is False
+
+
+def test_simple_open(default_empad):
+    default_empad.check_valid()
+    assert tuple(default_empad.shape) == (4, 5, 128, 128)
+    assert tuple(default_empad.raw_shape) == (4, 5, 128, 128)
+
+
+def test_scan_size_mismatch(empad_data):
+    xml_path, _ = empad_data
+    ds = EMPADDataSet(path=xml_path, scan_size=(5, 5)).initialize()
+    with pytest.raises(DataSetException):
+        ds.check_valid()
+
+
+def test_raw_needs_scan_size(empad_data):
+    xml_path, raw_data = empad_data
+    raw_path = os.path.join(os.path.dirname(xml_path), "scan.raw")
+    with pytest.raises(DataSetException):
+        EMPADDataSet(path=raw_path).initialize()
+    ds = EMPADDataSet(path=raw_path, scan_size=(4, 5)).initialize()
+    ds.check_valid()
+
+
+def test_read(default_empad, empad_data):
+    _, raw_data = empad_data
+    for p in default_empad.get_partitions():
+        for tile in p.get_tiles():
+            assert tile.tile_slice.shape.nav.size > 1
+            assert np.allclose(tile.data, raw_data[:, :, :128, :][tile.tile_slice.get()])
+
+
+def test_pickle_is_small(default_empad):
+    pickled = pickle.dumps(default_empad)
+    pickle.loads(pickled)
+    assert len(pickled) < 2 * 1024
+
+
+def test_apply_mask_analysis(default_empad, empad_data, lt_ctx):
+    _, raw_data = empad_data
+    mask = _mk_random(size=(128, 128))
+    analysis = lt_ctx.create_mask_analysis(factories=[lambda: mask], dataset=default_empad)
+    results = lt_ctx.run(analysis)
+    expected = _naive_mask_apply([mask], raw_data[:, :, :128, :])
+    assert np.allclose(results.mask_0.raw_data, expected)
+
+
+def test_crop_to(default_empad, empad_data, lt_ctx):
+    _, raw_data = empad_data
+    slice_ = Slice(shape=Shape((4, 5, 16, 32), sig_dims=2), origin=(0, 0, 64, 8))
+    job = PickFrameJob(dataset=default_empad, slice_=slice_)
+    res = lt_ctx.run(job)
+    assert np.allclose(res, raw_data[:, :, 64:80, 8:40])
@@ -1,7 +1,13 @@
+import os
 import pickle
+
+import h5py
+import pytest
 import cloudpickle
 import numpy as np
-from libertem.io.dataset.hdf5 import H5DataSet
+from libertem.io.dataset.hdf5 import H5DataSet, H5Reader, H5FileCache
+from libertem.io.dataset.base import DataSetException
+from libertem.common import Slice, Shape
 
 from utils import _naive_mask_apply, _mk_random
 
@@ -58,3 +64,152 @@ def test_cloudpickle(lt_ctx, hdf5):
 
     # let's keep the pickled dataset size small-ish:
     assert len(pickled) < 1 * 1024
+
+
+@pytest.fixture(scope='session')
+def chunked_hdf5(tmpdir_factory):
+    datadir = tmpdir_factory.mktemp('data')
+    filename = datadir + '/hdf5-test-chunked.h5'
+    data = _mk_random(size=(8, 7, 16, 16), dtype='float32')
+    with h5py.File(filename, "w") as f:
+        f.create_dataset("data", data=data, chunks=(2, 7, 8, 16), compression="gzip")
+    with h5py.File(filename, 'r') as f:
+        yield f
+
+
+def test_chunk_aligned_partitions(chunked_hdf5):
+    ds = H5DataSet(
+        path=chunked_hdf5.filename, ds_path="data", tileshape=(1, 3, 16, 16),
+        min_num_partitions=3,
+    )
+    ds.initialize()
+    partitions = list(ds.get_partitions())
+    assert len(partitions) == 4
+    for p in partitions:
+        assert p.slice.origin[0] % 2 == 0
+        assert tuple(p.shape) == (2, 7, 16, 16)
+        # tileshape is grown to a multiple of the chunk shape:
+        assert tuple(p.tileshape) == (2, 7, 16, 16)
+        for tile in p.get_tiles():
+            assert tile.tile_slice.origin[0] % 2 == 0
+
+
+def test_chunked_apply_masks(lt_ctx, chunked_hdf5):
+    ds = H5DataSet(
+        path=chunked_hdf5.filename, ds_path="data", tileshape=(1, 3, 16, 16),
+    )
+    ds.initialize()
+    mask = _mk_random(size=(16, 16))
+    data = chunked_hdf5['data'][:]
+    expected = _naive_mask_apply([mask], data)
+    analysis = lt_ctx.create_mask_analysis(
+        dataset=ds, factories=[lambda: mask]
+    )
+    results = lt_ctx.run(analysis)
+
+    assert np.allclose(
+        results.mask_0.raw_data,
+        expected
+    )
+
+
+def test_chunk_decoder(tmpdir_factory):
+    datadir = tmpdir_factory.mktemp('data')
+    filename = str(datadir + '/hdf5-test-filters.h5')
+    data = _mk_random(size=(5, 6, 16, 16), dtype='uint16')
+    with h5py.File(filename, "w") as f:
+        f.create_dataset("data", data=data, chunks=(2, 4, 8, 16), compression="gzip",
+                         shuffle=True, fletcher32=True)
+        f.create_dataset("empty", shape=data.shape, dtype='float32', chunks=(2, 4, 8, 16),
+                         compression="gzip", fillvalue=42)
+        f.create_dataset("lzf", data=data, chunks=(2, 4, 8, 16), compression="lzf")
+
+    reader = H5Reader(path=filename, ds_path="data")
+    tile_slice = Slice(origin=(1, 3, 4, 0), shape=Shape((3, 2, 8, 16), sig_dims=2))
+    with reader.get_h5ds() as h5ds:
+        decoder = reader.get_chunk_decoder(h5ds)
+        assert decoder is not None
+        out = np.zeros(tuple(tile_slice.shape), dtype=h5ds.dtype)
+        decoder.read_direct(out, tile_slice)
+        assert np.allclose(out, data[tile_slice.get()])
+
+    reader = H5Reader(path=filename, ds_path="empty")
+    with reader.get_h5ds() as h5ds:
+        out = np.zeros(tuple(tile_slice.shape), dtype=h5ds.dtype)
+        reader.get_chunk_decoder(h5ds).read_direct(out, tile_slice)
+        assert np.allclose(out, 42)
+
+    reader = H5Reader(path=filename, ds_path="lzf")
+    with reader.get_h5ds() as h5ds:
+        assert reader.get_chunk_decoder(h5ds) is None
+
+    ds = H5DataSet(path=filename, ds_path="data", tileshape=(1, 4, 16, 16))
+    ds.initialize()
+    for p in ds.get_partitions():
+        for tile in p.get_tiles():
+            assert np.allclose(tile.data, data[tile.tile_slice.get()])
+
+
+def test_chunk_decoder_fletcher32(tmpdir_factory):
+    datadir = tmpdir_factory.mktemp('data')
+    filename = str(datadir + '/hdf5-test-fletcher32.h5')
+    # chunks with an odd number of bytes:
+    data = _mk_random(size=(4, 4, 5, 5), dtype='uint8')
+    with h5py.File(filename, "w") as f:
+        f.create_dataset("data", data=data, chunks=(1, 2, 5, 5), fletcher32=True)
+        f.create_dataset("zeros", data=np.zeros_like(data), chunks=(1, 2, 5, 5),
+                         fletcher32=True, compression="gzip")
+        # a chunk is corrupted, but keeps its checksum:
+        f.create_dataset("corrupted", data=data, chunks=(1, 2, 5, 5), fletcher32=True)
+        filter_mask, raw = f["corrupted"].id.read_direct_chunk((1, 2, 0, 0))
+        raw = bytes([raw[0] ^ 1]) + raw[1:]
+        f["corrupted"].id.write_direct_chunk((1, 2, 0, 0), raw, filter_mask)
+
+    tile_slice = Slice(origin=(0, 0, 0, 0), shape=Shape((4, 4, 5, 5), sig_dims=2))
+    for name, expected in [("data", data), ("zeros", 0)]:
+        reader = H5Reader(path=filename, ds_path=name)
+        with reader.get_h5ds() as h5ds:
+            out = np.zeros(tuple(tile_slice.shape), dtype=h5ds.dtype)
+            reader.get_chunk_decoder(h5ds).read_direct(out, tile_slice)
+            assert np.allclose(out, expected)
+
+    reader = H5Reader(path=filename, ds_path="corrupted")
+    with reader.get_h5ds() as h5ds:
+        out = np.zeros(tuple(tile_slice.shape), dtype=h5ds.dtype)
+        with pytest.raises(DataSetException):
+            reader.get_chunk_decoder(h5ds).read_direct(out, tile_slice)
+
+
+def test_file_cache(tmpdir_factory):
+    datadir = tmpdir_factory.mktemp('data')
+    filenames = [str(datadir + '/hdf5-cache-%d.h5' % i) for i in range(3)]
+    for fn in filenames:
+        with h5py.File(fn, "w") as f:
+            f.create_dataset("data", data=np.ones((2, 2, 4, 4)))
+
+    cache = H5FileCache(max_size=2)
+    with cache.open(filenames[0]) as f0:
+        with cache.open(filenames[0]) as f0_again:
+            assert f0 is f0_again
+
+    # changing the mtime invalidates the entry:
+    st = os.stat(filenames[0])
+    os.utime(filenames[0], ns=(st.st_atime_ns, st.st_mtime_ns + 1000000000))
+    with cache.open(filenames[0]) as f0_new:
+        assert f0_new is not f0
+        assert not f0.id.valid
+        assert f0_new["data"].shape == (2, 2, 4, 4)
+
+    # files that are still in use are only closed once they are released:
+    with cache.open(filenames[1]) as f1:
+        with cache.open(filenames[2]):
+            pass
+        assert len(cache) == 2
+        assert f1.id.valid
+        with cache.open(filenames[0]):
+            pass
+        assert f1.id.valid
+    assert not f1.id.valid
+
+    cache.clear()
+    assert len(cache) == 0
@@ -0,0 +1,149 @@
+import pickle
+import multiprocessing
+
+import numpy as np
+import pytest
+
+from libertem.api import Context
+from libertem.executor.inline import InlineJobExecutor
+from libertem.io.dataset.memory import MemoryDataSet
+from libertem.io.dataset.npy import NPYDataSet
+from libertem.io.shm import SharedArray, have_shm
+
+from utils import _naive_mask_apply, _mk_random
+
+
+def _sum_partitions(dataset):
+    return sum(
+        tile.data.sum()
+        for p in dataset.get_partitions()
+        for tile in p.get_tiles()
+    )
+
+
+@pytest.mark.skipif(not have_shm(), reason="needs multiprocessing.shared_memory")
+def test_shared_array_pickle():
+    data = _mk_random(size=(64, 64, 16, 16))
+    ds = MemoryDataSet(data=data, use_shm=True)
+    pickled = pickle.dumps(ds)
+    # only a handle is transferred, not the data:
+    assert len(pickled) < 2 * 1024
+    loaded = pickle.loads(pickled)
+    assert np.allclose(loaded.data, data)
+
+
+@pytest.mark.skipif(not have_shm(), reason="needs multiprocessing.shared_memory")
+def test_shared_array_other_process():
+    data = _mk_random(size=(16, 16, 16, 16))
+    ds = MemoryDataSet(data=data, use_shm=True)
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(1) as pool:
+        result = pool.apply(_sum_partitions, (ds,))
+    assert np.allclose(result, data.sum())
+    # the data is still available after the worker attached and went away:
+    assert np.allclose(ds.data, data)
+
+
+@pytest.mark.skipif(not have_shm(), reason="needs multiprocessing.shared_memory")
+def test_shared_array_close():
+    arr = SharedArray.from_array(np.ones((4, 4)))
+    loaded = pickle.loads(pickle.dumps(arr))
+    assert np.allclose(loaded.data, 1)
+    loaded.close()
+    arr.close()
+    with pytest.raises(FileNotFoundError):
+        pickle.loads(pickle.dumps(arr)).data
+
+
+def test_memory_without_shm(lt_ctx):
+    data = _mk_random(size=(16, 16, 16, 16))
+    # the default, as workers on other nodes can't access shared memory:
+    ds = MemoryDataSet(data=data)
+    assert not isinstance(ds._data, SharedArray)
+    mask = _mk_random(size=(16, 16))
+    analysis = lt_ctx.create_mask_analysis(dataset=ds, factories=[lambda: mask])
+    results = lt_ctx.run(analysis)
+    assert np.allclose(results.mask_0.raw_data, _naive_mask_apply([mask], data))
+
+
+class LocalWorkersExecutor(InlineJobExecutor):
+    def workers_share_memory(self):
+        return True
+
+
+@pytest.mark.skipif(not have_shm(), reason="needs multiprocessing.shared_memory")
+def test_shm_for_local_workers():
+    data = _mk_random(size=(16, 16, 16, 16))
+    ctx = Context(executor=LocalWorkersExecutor())
+    ds = ctx.load("memory", data=data)
+    assert isinstance(ds._data, SharedArray)
+
+    ds = MemoryDataSet(data=data)
+    result = ctx.run(ctx.create_sum_analysis(dataset=ds))
+    assert isinstance(ds._data, SharedArray)
+    assert np.allclose(result.intensity.raw_data, data.sum(axis=(0, 1)))
+
+    # and back, for an executor with remote workers:
+    Context(executor=InlineJobExecutor()).run(ctx.create_sum_analysis(dataset=ds))
+    assert not isinstance(ds._data, SharedArray)
+    assert np.allclose(ds.data, data)
+
+    # an explicit choice is kept:
+    ds = MemoryDataSet(data=data, use_shm=False)
+    ctx.run(ctx.create_sum_analysis(dataset=ds))
+    assert not isinstance(ds._data, SharedArray)
+
+
+@pytest.fixture(scope='module')
+def npy_data(tmpdir_factory):
+    datadir = tmpdir_factory.mktemp('data')
+    filename = str(datadir + '/data.npy')
+    data = _mk_random(size=(8, 8, 16, 16))
+    np.save(filename, data)
+    return filename, data
+
+
+def test_npy_detect(npy_data):
+    filename, _ = npy_data
+    assert NPYDataSet.detect_params(filename) == {"path": filename}
+
+
+def test_npy_apply_masks(npy_data, lt_ctx):
+    filename, data = npy_data
+    ds = NPYDataSet(path=filename).initialize()
+    ds.check_valid()
+    assert tuple(ds.shape) == (8, 8, 16, 16)
+    mask = _mk_random(size=(16, 16))
+    analysis = lt_ctx.create_mask_analysis(dataset=ds, factories=[lambda: mask])
+    results = lt_ctx.run(analysis)
+    assert np.allclose(results.mask_0.raw_data, _naive_mask_apply([mask], data))
+
+
+def test_npy_pickle_is_small(npy_data):
+    filename, _ = npy_data
+    ds = NPYDataSet(path=filename).initialize()
+    assert len(pickle.dumps(ds)) < 1024
+    assert len(pickle.dumps(next(ds.get_partitions()))) < 1024
+
+
+def test_split_partition():
+    data = _mk_random(size=(6, 4, 16, 16))
+    # tiles cross the boundaries of the parts:
+    ds = MemoryDataSet(data=data, tileshape=(1, 3, 16, 16), partition_shape=(6, 4, 16, 16))
+    p = next(ds.get_partitions())
+    parts = p.split(4)
+    assert len(parts) == 4
+    assert [part.shape.nav[0] for part in parts] == [2, 2, 1, 1]
+    result = np.zeros_like(data)
+    for part in parts:
+        assert part.get_placement_key() == p.get_placement_key()
+        for tile in part.get_tiles():
+            assert tile.tile_slice.intersection_with(part.slice) == tile.tile_slice
+            result[tile.tile_slice.get()] += tile.data
+    assert np.allclose(result, data)
+    # a single row is split along the next axis:
+    row = parts[-1].split(4)
+    assert [part.shape.nav[1] for part in row] == [1, 1, 1, 1]
+    assert row[0].split(2) == [row[0]]
+    assert len(p.split(4, min_frames=12)) == 2
+    assert p.split(4, min_frames=13) == [p]
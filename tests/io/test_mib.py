@@ -1,24 +1,30 @@
 import os
+import time
 import pickle
+import threading
 
 import numpy as np
 import pytest
 
-from libertem.io.dataset.mib import MIBDataSet
+from libertem.io.dataset.mib import MIBDataSet, MIBFile
+from libertem.io.dataset.base import DataSetException
+from libertem.io.planner import PartitionPlanner
 from libertem.job.masks import ApplyMasksJob
 from libertem.job.raw import PickFrameJob
 from libertem.executor.inline import InlineJobExecutor
 from libertem.analysis.raw import PickFrameAnalysis
 from libertem.common import Slice, Shape
 
+from utils import _write_mib
+
 MIB_TESTDATA_PATH = os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'default.mib')
 HAVE_MIB_TESTDATA = os.path.exists(MIB_TESTDATA_PATH)
 
-pytestmark = pytest.mark.skipif(not HAVE_MIB_TESTDATA, reason="need .mib testdata")  # NOQA
-
 
 @pytest.fixture
 def default_mib():
+    if not HAVE_MIB_TESTDATA:
+        pytest.skip("need .mib testdata")
     scan_size = (32, 32)
     ds = MIBDataSet(path=MIB_TESTDATA_PATH, tileshape=(1, 8, 256, 256), scan_size=scan_size)
     ds = ds.initialize()
@@ -29,7 +35,6 @@ def test_detect():
     params = MIBDataSet.detect_params(MIB_TESTDATA_PATH)
     assert params == {
         "path": MIB_TESTDATA_PATH,
-        "tileshape": (1, 8, 256, 256)
     }
 
 
@@ -43,9 +48,10 @@ def test_check_valid(default_mib):
 
 
 def test_read(default_mib):
-    partitions = default_mib.get_partitions()
-    p = next(partitions)
-    assert tuple(p.shape) == (32 * 32, 256, 256)
+    partitions = list(default_mib.get_partitions())
+    assert sum(p.shape[0] for p in partitions) == 32 * 32
+    p = partitions[0]
+    assert tuple(p.shape.sig) == (256, 256)
     tiles = p.get_tiles()
     t = next(tiles)
     # we get 3D tiles here, because MIB partitions are inherently 3D
@@ -107,3 +113,206 @@ def test_crop_to(default_mib, lt_ctx):
     res = lt_ctx.run(job)
     assert res.shape == (1024, 64, 64)
     # TODO: check contents
+
+
+@pytest.fixture
+def synthetic_mib(tmpdir):
+    data = np.random.randint(0, 1024, size=(8, 16, 16)).astype("uint16")
+    for i in range(4):
+        _write_mib(str(tmpdir.join("scan_%d.mib" % (i + 1))), 2 * i + 1, data[2 * i:2 * i + 2])
+    return str(tmpdir.join("scan_1.mib")), data
+
+
+def test_header_index(tmpdir, synthetic_mib, lt_ctx, monkeypatch):
+    path, data = synthetic_mib
+    index_path = str(tmpdir.join("index.json"))
+    ds = MIBDataSet(path=path, scan_size=(2, 4), index_path=index_path).initialize()
+    ds.check_valid()
+    assert tuple(ds.shape) == (2, 4, 16, 16)
+    assert len(ds.get_header_index().load()) == 4
+    results = lt_ctx.run(lt_ctx.create_sum_analysis(dataset=ds))
+    assert np.allclose(results.intensity.raw_data, data.sum(axis=0))
+
+    # only new or changed files are read again:
+    read_paths = []
+    read_header = MIBFile.read_header
+
+    def _read_header(self):
+        read_paths.append(self.path)
+        return read_header(self)
+
+    monkeypatch.setattr(MIBFile, "read_header", _read_header)
+    MIBDataSet(path=path, scan_size=(2, 4), index_path=index_path).initialize()
+    assert read_paths == []
+    _write_mib(str(tmpdir.join("scan_5.mib")), 9, data[:2])
+    ds = MIBDataSet(path=path, scan_size=(2, 5), index_path=index_path).initialize()
+    ds.check_valid()
+    assert read_paths == [str(tmpdir.join("scan_5.mib"))]
+    assert len(ds.get_header_index().load()) == 5
+
+
+def _read_partition(p):
+    out = np.zeros(p.shape, dtype=p.dtype)
+    for tile in p.get_tiles():
+        out[tile.tile_slice.shift(p.slice).get()] = tile.data
+    return out
+
+
+def test_partitions_span_files(tmpdir, synthetic_mib):
+    path, data = synthetic_mib
+    ds = MIBDataSet(
+        path=path, scan_size=(2, 4), tileshape=(1, 2, 16, 16),
+        index_path=str(tmpdir.join("index.json")),
+    ).initialize()
+    # three frames per partition, including the headers:
+    frame_size = 16 * 16 * 2 + 384
+    ds.set_planner(PartitionPlanner(num_workers=1, min_size=1, max_size=3 * frame_size))
+    partitions = list(ds.get_partitions())
+    assert [(p.slice.origin[0], p.shape[0]) for p in partitions] == [(0, 3), (3, 3), (6, 2)]
+    assert len(partitions[0].get_paths()) == 2
+    assert len(partitions[1].get_paths()) == 2
+    for p in partitions:
+        assert np.allclose(_read_partition(p), data[p.slice.get(nav_only=True)])
+
+
+def test_large_file_is_split(tmpdir):
+    data = np.random.randint(0, 1024, size=(16, 16, 16)).astype("uint16")
+    path = str(tmpdir.join("single.mib"))
+    _write_mib(path, 1, data)
+    ds = MIBDataSet(
+        path=path, scan_size=(4, 4), index_path=str(tmpdir.join("index.json"))
+    ).initialize()
+    ds.set_planner(PartitionPlanner(num_workers=2, partitions_per_worker=2, min_size=1))
+    partitions = list(ds.get_partitions())
+    assert len(partitions) == 4
+    for p in partitions:
+        assert p.get_paths() == [path]
+        assert np.allclose(_read_partition(p), data[p.slice.get(nav_only=True)])
+
+
+def _encode_raw(frame, counter_depth):
+    """
+    inverse of the raw mode decoders, for a frame in file order
+    """
+    pixels = frame.reshape((-1,))
+    if counter_depth == 1:
+        packed = np.packbits(pixels.astype(np.uint8).reshape((-1, 8)), axis=-1, bitorder="little")
+        return packed.reshape((-1, 8))[:, ::-1].tobytes()
+    elif counter_depth == 6:
+        return pixels.astype(np.uint8).reshape((-1, 8))[:, ::-1].tobytes()
+    elif counter_depth == 12:
+        return pixels.astype(">u2").reshape((-1, 4))[:, ::-1].tobytes()
+    elif counter_depth == 24:
+        return _encode_raw(pixels >> 12, 12) + _encode_raw(pixels & 0xFFF, 12)
+
+
+def _to_quad_file_order(frame):
+    h, w = frame.shape[0] // 2, frame.shape[1] // 2
+    chips = [
+        frame[h:, w:][::-1, ::-1], frame[h:, :w][::-1, ::-1], frame[:h, w:], frame[:h, :w],
+    ]
+    return np.hstack(chips)
+
+
+def _write_raw_mib(path, data, counter_depth, quad=False):
+    header_size = 768 if quad else 384
+    with open(path, "wb") as f:
+        for i, frame in enumerate(data):
+            header = "MQ1,%06d,%05d,%02d,%04d,%04d,R64,%s,%s,0.001,0,0,%d" % (
+                i + 1, header_size, 4 if quad else 1, frame.shape[1], frame.shape[0],
+                "2x2" if quad else "1x1", "0F" if quad else "01", counter_depth,
+            )
+            f.write(header.ljust(header_size, "\x00").encode("ascii"))
+            if quad:
+                frame = _to_quad_file_order(frame)
+            f.write(_encode_raw(frame, counter_depth))
+
+
+@pytest.mark.parametrize("counter_depth,quad", [
+    (1, False), (6, False), (12, False), (24, False), (1, True), (12, True),
+])
+def test_raw_mode(tmpdir, lt_ctx, counter_depth, quad):
+    size = 32 if quad else 16
+    data = np.random.randint(0, 2**counter_depth, size=(8, size, size)).astype("uint32")
+    path = str(tmpdir.join("raw.mib"))
+    _write_raw_mib(path, data, counter_depth, quad=quad)
+    ds = MIBDataSet(
+        path=path, scan_size=(2, 4), index_path=str(tmpdir.join("index.json"))
+    ).initialize()
+    ds.check_valid()
+    assert tuple(ds.shape) == (2, 4, size, size)
+    for p in ds.get_partitions():
+        assert np.allclose(_read_partition(p), data[p.slice.get(nav_only=True)])
+
+    slice_ = Slice(shape=Shape((8, 4, 8), sig_dims=2), origin=(0, 4, 2))
+    res = lt_ctx.run(PickFrameJob(dataset=ds, slice_=slice_))
+    assert np.allclose(res, data[:, 4:8, 2:10])
+
+
+def test_cache_key(tmpdir):
+    data = np.random.randint(0, 1024, size=(8, 16, 16)).astype("uint16")
+    for i in range(2):
+        _write_mib(str(tmpdir.join("data_%d.mib" % (i + 1))), 4 * i + 1, data[4 * i:4 * i + 4])
+
+    def _load():
+        return MIBDataSet(
+            path=str(tmpdir.join("data_1.mib")), scan_size=(2, 4),
+            index_path=str(tmpdir.join("index.json")),
+        ).initialize()
+
+    # the same data, read by different instances:
+    key = _load().get_cache_key()
+    assert _load().get_cache_key() == key
+
+    path = str(tmpdir.join("data_2.mib"))
+    mtime = os.stat(path).st_mtime_ns
+    _write_mib(path, 5, data[4:] + 1)
+    # the file system may not notice the change within its timestamp resolution:
+    os.utime(path, ns=(mtime + 10**9, mtime + 10**9))
+    assert _load().get_cache_key() != key
+
+
+@pytest.mark.parametrize("first_images", [(1, 6), (1, 4)])
+def test_frame_ranges(tmpdir, first_images):
+    data = np.random.randint(0, 1024, size=(8, 16, 16)).astype("uint16")
+    _write_mib(str(tmpdir.join("data_1.mib")), first_images[0], data[:4])
+    _write_mib(str(tmpdir.join("data_2.mib")), first_images[1], data[4:])
+    ds = MIBDataSet(
+        path=str(tmpdir.join("data_1.mib")), scan_size=(2, 4),
+        index_path=str(tmpdir.join("index.json")),
+    ).initialize()
+    # the files have a gap, or overlap:
+    with pytest.raises(DataSetException):
+        ds.check_valid()
+    with pytest.raises(DataSetException):
+        for p in ds.get_partitions():
+            list(p.get_tiles())
+
+
+def test_live(tmpdir, lt_ctx):
+    data = np.random.randint(0, 1024, size=(8, 16, 16)).astype("uint16")
+    _write_mib(str(tmpdir.join("live_1.mib")), 1, data[:1])
+
+    def _write():
+        # one file per frame, as written by the detector:
+        for i in range(1, 8):
+            time.sleep(0.01)
+            _write_mib(str(tmpdir.join("live_%d.mib" % (i + 1))), i + 1, data[i:i + 1])
+
+    ds = MIBDataSet(
+        path=str(tmpdir.join("live_1.mib")), scan_size=(2, 4), live=True, live_timeout=10,
+        index_path=str(tmpdir.join("index.json")),
+    ).initialize()
+    assert ds.check_valid()
+    assert tuple(ds.shape) == (2, 4, 16, 16)
+    assert ds.get_progress()["frames_available"] == 1
+    frame_size = 16 * 16 * 2 + 384
+    ds.set_planner(PartitionPlanner(num_workers=1, min_size=1, max_size=2 * frame_size))
+
+    writer = threading.Thread(target=_write)
+    writer.start()
+    results = list(lt_ctx.run_iter(lt_ctx.create_sum_analysis(dataset=ds)))
+    writer.join()
+    assert len(results) == 4
+    assert np.allclose(results[-1].intensity.raw_data, data.sum(axis=0))
+    assert ds.get_progress()["frames_available"] == 8
@@ -0,0 +1,71 @@
+import numpy as np
+
+from libertem.common import Shape
+from libertem.io.planner import PartitionPlanner
+from libertem.io.dataset.raw import RawFileDataSet
+
+from utils import _mk_random, _naive_mask_apply
+
+MB = 1024 * 1024
+
+
+def test_small_dataset_uses_all_workers():
+    planner = PartitionPlanner(num_workers=8, worker_memory=1024 * MB, min_size=MB)
+    # 64 MB dataset, 2 partitions per worker:
+    ranges = planner.get_frame_ranges(num_frames=1024, frame_size=64 * 1024)
+    assert len(ranges) == 16
+    assert ranges[0] == (0, 64)
+    assert ranges[-1] == (960, 1024)
+
+
+def test_tiny_dataset_is_not_split():
+    planner = PartitionPlanner(num_workers=8, worker_memory=1024 * MB, min_size=4 * MB)
+    assert planner.get_frame_ranges(num_frames=10, frame_size=1024) == [(0, 10)]
+    # unless a number of partitions is requested explicitly:
+    assert len(planner.get_frame_ranges(10, 1024, min_num_partitions=5)) == 5
+
+
+def test_partition_size_limited_by_memory():
+    planner = PartitionPlanner(
+        num_workers=2, worker_memory=256 * MB, memory_fraction=0.25, max_size=512 * MB
+    )
+    frames = planner.get_frames_per_partition(num_frames=100000, frame_size=MB)
+    assert frames == 64
+
+
+def test_frame_ranges_balanced():
+    planner = PartitionPlanner(num_workers=1, worker_memory=1024 * MB, min_size=1)
+    ranges = planner.get_frame_ranges(num_frames=10, frame_size=1, min_num_partitions=3)
+    assert ranges == [(0, 4), (4, 7), (7, 10)]
+
+
+def test_partition_shape_rows_and_sub_rows():
+    planner = PartitionPlanner(num_workers=4, worker_memory=1024 * MB, min_size=1)
+    shape = Shape((16, 16, 64, 64), sig_dims=2)
+    # 8 partitions of two rows each:
+    assert planner.get_partition_shape(shape, "float32") == (2, 16, 64, 64)
+    # more partitions than rows: parts of a single row
+    assert planner.get_partition_shape(
+        shape, "float32", min_num_partitions=64
+    ) == (1, 4, 64, 64)
+    assert planner.get_partition_shape(
+        shape, "float32", min_num_partitions=24
+    ) == (1, 8, 64, 64)
+
+
+def test_raw_sub_row_partitions(tmpdir, lt_ctx):
+    data = _mk_random(size=(4, 8, 16, 16), dtype='float32')
+    path = str(tmpdir.join("data.raw"))
+    data.tofile(path)
+    ds = RawFileDataSet(
+        path=path, scan_size=(4, 8), dtype="float32",
+        detector_size_raw=(16, 16), crop_detector_to=(16, 16),
+    ).initialize()
+    ds.set_planner(PartitionPlanner(num_workers=8, min_size=1))
+    partitions = list(ds.get_partitions())
+    assert len(partitions) == 16
+    assert all(tuple(p.shape.nav) == (1, 2) for p in partitions)
+    mask = _mk_random(size=(16, 16))
+    analysis = lt_ctx.create_mask_analysis(dataset=ds, factories=[lambda: mask])
+    results = lt_ctx.run(analysis)
+    assert np.allclose(results.mask_0.raw_data, _naive_mask_apply([mask], data))
@@ -1,9 +1,12 @@
+import time
 import pickle
+import threading
 
 import numpy as np
 import pytest
 
 from libertem.io.dataset.raw import RawFileDataSet
+from libertem.io.planner import PartitionPlanner
 from libertem.job.masks import ApplyMasksJob
 from libertem.executor.inline import InlineJobExecutor
 from libertem.analysis.raw import PickFrameAnalysis
@@ -99,3 +102,32 @@ def test_pick_analysis(default_raw, lt_ctx):
     analysis = PickFrameAnalysis(dataset=default_raw, parameters={"x": 16, "y": 16})
     results = lt_ctx.run(analysis)
     assert results[0].raw_data.shape == (128, 128)
+
+
+def test_live(tmpdir, lt_ctx):
+    data = _mk_random(size=(4, 4, 16, 16), dtype='float32')
+    path = str(tmpdir.join("live.raw"))
+    open(path, "wb").close()
+
+    def _write():
+        with open(path, "ab") as f:
+            for frame in data.reshape((16, 16, 16)):
+                time.sleep(0.01)
+                f.write(frame.tobytes())
+                f.flush()
+
+    ds = RawFileDataSet(
+        path=path, scan_size=(4, 4), dtype="float32", detector_size_raw=(16, 16),
+        crop_detector_to=(16, 16), live=True, live_timeout=10,
+    ).initialize()
+    ds.set_planner(PartitionPlanner(num_workers=1, min_size=1, max_size=4 * 16 * 16 * 4))
+    ds.check_valid()
+    assert ds.get_progress()["frames_available"] == 0
+
+    writer = threading.Thread(target=_write)
+    writer.start()
+    results = list(lt_ctx.run_iter(lt_ctx.create_sum_analysis(dataset=ds)))
+    writer.join()
+    assert len(results) == 4
+    assert np.allclose(results[-1].intensity.raw_data, data.sum(axis=(0, 1)))
+    assert ds.get_progress()["fraction"] == 1
@@ -0,0 +1,90 @@
+import os
+import json
+
+import numpy as np
+import pytest
+
+from libertem.io.ingest.sink import LocalBinarySink
+from libertem.io.dataset.binary import BinaryDataSet
+
+from utils import _mk_random
+
+
+def _ingest(sink, data, path, dtype, min_num_partitions=4):
+    sink.prepare_output(path)
+    idx = sink.make_index(data=data, dtype=dtype, min_num_partitions=min_num_partitions)
+    sink.write_index(idx, os.path.join(path, "index.json"))
+    sink.write_partitions(idx=idx, dataset=data, output_path=path, dtype=dtype)
+    return idx
+
+
+def _read_back(path):
+    with open(os.path.join(path, "index.json")) as f:
+        idx = json.load(f)
+    result = np.zeros(idx['shape'], dtype=idx['dtype'])
+    for p in idx['partitions']:
+        data = np.fromfile(os.path.join(path, p['filename']), dtype=idx['dtype'])
+        y, x = p['origin']
+        h, w = p['shape'][:2]
+        result[y:y + h, x:x + w] = data.reshape(p['shape'])
+    return result
+
+
+@pytest.mark.parametrize("block_size", [
+    # several rows per block:
+    16*16*8*4*3,
+    # parts of a row per block:
+    16*16*8*3,
+])
+def test_local_roundtrip(tmpdir, block_size):
+    data = _mk_random(size=(8, 8, 16, 16), dtype='uint16')
+    sink = LocalBinarySink(block_size=block_size, max_pending_blocks=1)
+    idx = _ingest(sink, data, str(tmpdir), dtype='float64')
+    assert len(idx['partitions']) == 4
+    result = _read_back(str(tmpdir))
+    assert result.dtype == np.dtype('float64')
+    assert np.allclose(result, data)
+
+
+@pytest.mark.parametrize("scan_size", [(7, 10), (7, 7), (8, 7), (10, 7), (12, 7)])
+def test_uneven_partitions(tmpdir, scan_size):
+    data = _mk_random(size=scan_size + (16, 16), dtype='uint16')
+    sink = LocalBinarySink(block_size=16*16*2*3, max_pending_blocks=1)
+    # the planner splits the rows into parts of different sizes:
+    idx = _ingest(sink, data, str(tmpdir), dtype='uint16', min_num_partitions=16)
+    assert sum(np.prod(p['shape'][:2]) for p in idx['partitions']) == np.prod(scan_size)
+    assert np.allclose(_read_back(str(tmpdir)), data)
+    assert BinaryDataSet(path=str(tmpdir)).initialize().check_valid()
+
+
+class FailingSink(LocalBinarySink):
+    def open(self, filename, nbytes=None):
+        if filename.endswith(".raw"):
+            raise IOError("disk full")
+        return super().open(filename, nbytes)
+
+
+def test_writer_error(tmpdir):
+    data = _mk_random(size=(8, 8, 16, 16), dtype='uint16')
+    sink = FailingSink(block_size=16*16*2, max_pending_blocks=1)
+    with pytest.raises(IOError):
+        _ingest(sink, data, str(tmpdir), dtype='uint16')
+
+
+def test_load_ingested(tmpdir, lt_ctx):
+    data = _mk_random(size=(8, 8, 16, 16), dtype='uint16')
+    sink = LocalBinarySink(block_size=16*16*8*3, max_pending_blocks=1)
+    _ingest(sink, data, str(tmpdir), dtype='float32')
+
+    assert BinaryDataSet.detect_params(str(tmpdir)) == {
+        "path": os.path.join(str(tmpdir), "index.json"),
+    }
+    ds = lt_ctx.load("binary", path=str(tmpdir))
+    assert tuple(ds.shape) == (8, 8, 16, 16)
+    assert ds.check_valid()
+
+    mask = _mk_random(size=(16, 16))
+    analysis = lt_ctx.create_mask_analysis(dataset=ds, factories=[lambda: mask])
+    results = lt_ctx.run(analysis)
+    expected = np.einsum("ijkl,kl->ij", data.astype("float32"), mask)
+    assert np.allclose(results.mask_0.raw_data, expected)
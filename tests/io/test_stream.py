@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from libertem.io.dataset.base import DataSetException
+from libertem.io.dataset.stream import StreamDataSet, ReplayServer
+from libertem.io.planner import PartitionPlanner
+
+from utils import _write_mib
+
+
+@pytest.fixture
+def replay_server(tmpdir):
+    data = np.random.randint(0, 1024, size=(16, 16, 16)).astype("uint16")
+    paths = []
+    for i in range(2):
+        path = str(tmpdir.join("scan_%d.mib" % (i + 1)))
+        _write_mib(path, 8 * i + 1, data[8 * i:8 * (i + 1)])
+        paths.append(path)
+    with ReplayServer(paths, frame_delay=0.001) as server:
+        yield server, data
+
+
+def test_stream(replay_server, lt_ctx):
+    server, data = replay_server
+    frame_size = 16 * 16 * 2
+    # a ring buffer of three frames:
+    ds = lt_ctx.load(
+        "stream", host="127.0.0.1", port=server.port, scan_size=(4, 4),
+        buffer_size=3 * frame_size, timeout=10,
+    )
+    assert tuple(ds.shape) == (4, 4, 16, 16)
+    ds.set_planner(PartitionPlanner(num_workers=1, min_size=1, max_size=4 * frame_size))
+    try:
+        results = list(lt_ctx.run_iter(lt_ctx.create_sum_analysis(dataset=ds)))
+        assert len(results) == 4
+        assert np.allclose(results[-1].intensity.raw_data, data.sum(axis=0))
+        assert ds.get_progress()["frames_available"] == 16
+
+        # the frames are gone:
+        with pytest.raises(DataSetException):
+            lt_ctx.run(lt_ctx.create_sum_analysis(dataset=ds))
+    finally:
+        ds.close()
+
+
+def test_pick_from_stream(replay_server, lt_ctx):
+    server, data = replay_server
+    ds = StreamDataSet(host="127.0.0.1", port=server.port, scan_size=(4, 4)).initialize()
+    try:
+        result = lt_ctx.run(lt_ctx.create_pick_job(dataset=ds, origin=(2, 1)))
+        assert np.allclose(result, data[9])
+    finally:
+        ds.close()
@@ -0,0 +1,99 @@
+import numpy as np
+
+from libertem.common import Shape
+from libertem.io.tiling import (
+    TilingPreferences, TilingCapabilities, Tiling, TilingTuner, negotiate_tiling,
+)
+from libertem.io.dataset.memory import MemoryDataSet
+from libertem.job.masks import ApplyMasksJob
+
+from utils import _mk_random, _naive_mask_apply
+
+
+def test_fixed_tiles_are_not_negotiated():
+    shape = Shape((16, 16, 64, 64), sig_dims=2)
+    tiling = negotiate_tiling(
+        TilingPreferences(), TilingCapabilities(fixed=True), shape, "float32"
+    )
+    assert tiling is None
+
+
+def test_whole_frames():
+    shape = Shape((16, 16, 64, 64), sig_dims=2)
+    tiling = negotiate_tiling(
+        TilingPreferences(whole_frames=True, target_size=64 * 1024),
+        TilingCapabilities(sig_tiles=True, native_sig_shape=(16, 16)),
+        shape, "float32"
+    )
+    assert tiling.sig_shape == (64, 64)
+    assert tiling.depth == 4
+
+
+def test_sig_tiles_for_resident_data():
+    shape = Shape((16, 16, 64, 64), sig_dims=2)
+    prefs = TilingPreferences(
+        target_size=64 * 1024, resident_bytes_per_pixel=64 * 4, resident_size=64 * 1024
+    )
+    # 64 masks of float32 -> 256 pixels, or 4 rows, stay in the cache:
+    tiling = negotiate_tiling(prefs, TilingCapabilities(sig_tiles=True), shape, "float32")
+    assert tiling.sig_shape == (4, 64)
+    assert tiling.depth == 64
+    # the dataset can only read whole frames:
+    tiling = negotiate_tiling(prefs, TilingCapabilities(), shape, "float32")
+    assert tiling.sig_shape == (64, 64)
+    assert tiling.depth == 4
+
+
+def test_dataset_limits():
+    shape = Shape((16, 16, 64, 64), sig_dims=2)
+    prefs = TilingPreferences(target_size=64 * 1024)
+    tiling = negotiate_tiling(prefs, TilingCapabilities(min_size=1024 * 1024), shape, "float32")
+    assert tiling.depth == 64
+    tiling = negotiate_tiling(prefs, TilingCapabilities(max_depth=2), shape, "float32")
+    assert tiling.depth == 2
+
+
+def test_tileshape_for_partition():
+    tiling = Tiling(depth=8, sig_shape=(4, 64))
+    assert tuple(tiling.get_tileshape(Shape((4, 16, 64, 64), sig_dims=2))) == (1, 8, 4, 64)
+    assert tuple(tiling.get_tileshape(Shape((1, 4, 64, 64), sig_dims=2))) == (1, 4, 4, 64)
+    assert tuple(tiling.get_tileshape(Shape((64, 64, 64), sig_dims=2))) == (8, 4, 64)
+
+
+def test_negotiated_sig_tiles(lt_ctx):
+    data = _mk_random(size=(4, 4, 64, 64), dtype="float32")
+    masks = [_mk_random(size=(64, 64)) for i in range(64)]
+    dataset = MemoryDataSet(data=data, partition_shape=(2, 4, 64, 64))
+    job = ApplyMasksJob(
+        dataset=dataset, mask_factories=[(lambda m=m: m) for m in masks]
+    )
+    tiling = job.get_tiling()
+    assert tiling.sig_shape == (16, 64)
+    task = next(job.get_tasks())
+    assert {tuple(tile.tile_slice.shape.sig) for tile in task.get_tiles()} == {(16, 64)}
+
+    out = job.get_result_buffer()
+    for tiles in lt_ctx.executor.run_job(job):
+        for tile in tiles:
+            tile.reduce_into_result(out)
+    assert np.allclose(out, _naive_mask_apply(masks, data))
+
+
+def test_tuner_stores_results(tmpdir, monkeypatch):
+    data = _mk_random(size=(4, 16, 16, 16), dtype="float32")
+    dataset = MemoryDataSet(data=data, partition_shape=(4, 16, 16, 16))
+    partition = next(dataset.get_partitions())
+    path = str(tmpdir.join("tiling.json"))
+    tiling = Tiling(depth=8, sig_shape=(16, 16))
+
+    tuner = TilingTuner(path=path)
+    tuned = tuner.tune(partition, tiling)
+    assert tuned.depth in tuner.get_candidates(tiling)
+    assert tuned.sig_shape == (16, 16)
+
+    def _fail(*args, **kwargs):
+        raise AssertionError("should use the stored result")
+
+    other = TilingTuner(path=path)
+    monkeypatch.setattr(other, "benchmark", _fail)
+    assert other.tune(partition, tiling).depth == tuned.depth
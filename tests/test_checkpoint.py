@@ -0,0 +1,116 @@
+import asyncio
+import threading
+
+import numpy as np
+import pytest
+
+from libertem import api as lt
+from libertem.executor.inline import InlineJobExecutor
+from libertem.io.dataset.raw import RawFileDataSet
+from libertem.io.planner import PartitionPlanner
+from libertem.job.cache import get_result_key
+from libertem.job.checkpoint import CheckpointedRun, CheckpointStore
+from libertem.analysis.ring import RingMaskAnalysis
+
+FRAME_SIZE = 16 * 16 * 4
+
+
+class FlakyExecutor(InlineJobExecutor):
+    """
+    splits each task in two parts, and fails after ``fail_after`` parts
+    """
+    def __init__(self, fail_after=None):
+        self.fail_after = fail_after
+        self.frames_run = 0
+
+    def run_job(self, job):
+        num_parts = 0
+        for task in job.get_tasks():
+            for part in task.partition.split(2):
+                if num_parts == self.fail_after:
+                    raise OSError("worker failed")
+                num_parts += 1
+                self.frames_run += part.shape.nav.size
+                yield task.for_partition(part)()
+
+
+class AsyncFlakyExecutor(object):
+    def __init__(self, fail_after=None):
+        self._executor = FlakyExecutor(fail_after=fail_after)
+
+    async def run_job(self, job):
+        for result in self._executor.run_job(job):
+            yield result
+
+
+@pytest.fixture
+def raw_ds(tmpdir, monkeypatch):
+    monkeypatch.setenv("LIBERTEM_CACHE_DIR", str(tmpdir.join("cache")))
+    data = np.random.choice(a=[0, 1], size=(4, 4, 16, 16)).astype("float32")
+    path = str(tmpdir.join("data.raw"))
+    data.tofile(path)
+    ds = RawFileDataSet(
+        path=path, scan_size=(4, 4), detector_size_raw=(16, 16), crop_detector_to=(16, 16),
+        dtype="float32", tileshape=(1, 2, 16, 16),
+    ).initialize()
+    # four partitions of one row each:
+    ds.set_planner(PartitionPlanner(num_workers=1, min_size=1, max_size=4 * FRAME_SIZE))
+    return ds
+
+
+def test_resume(raw_ds):
+    ring = RingMaskAnalysis(dataset=raw_ds, parameters={"cx": 8, "cy": 8, "ri": 2, "ro": 5})
+    expected = lt.Context(executor=InlineJobExecutor()).run(ring)
+
+    # fails in the middle of the second partition:
+    executor = FlakyExecutor(fail_after=3)
+    ctx = lt.Context(executor=executor, checkpoint_interval=0)
+    with pytest.raises(OSError):
+        ctx.run(ring)
+
+    # only the three partitions that were not done are run:
+    executor = FlakyExecutor()
+    ctx = lt.Context(executor=executor, checkpoint_interval=0)
+    result = ctx.run(ring)
+    assert executor.frames_run == 12
+    assert np.allclose(result.intensity.raw_data, expected.intensity.raw_data)
+
+    # the checkpoint is removed when the job is done:
+    executor = FlakyExecutor()
+    ctx = lt.Context(executor=executor, checkpoint_interval=0)
+    ctx.run(ring)
+    assert executor.frames_run == 16
+
+
+def test_resume_async(raw_ds, tmpdir):
+    ring = RingMaskAnalysis(dataset=raw_ds, parameters={"cx": 8, "cy": 8, "ri": 2, "ro": 5})
+    key = get_result_key(ring)
+    store = CheckpointStore(path=str(tmpdir.join("checkpoints")))
+    save_threads = []
+
+    class RecordingStore(CheckpointStore):
+        def save(self, *args, **kwargs):
+            save_threads.append(threading.current_thread())
+            return super().save(*args, **kwargs)
+
+    async def _run(executor):
+        run = CheckpointedRun(
+            ring.get_job(), key, RecordingStore(path=store.path), interval=0
+        )
+        result = run._job.get_result_buffer()
+        async for tiles in run.run_async(executor):
+            for tile in tiles:
+                tile.reduce_into_result(result)
+        return result
+
+    with pytest.raises(OSError):
+        asyncio.run(_run(AsyncFlakyExecutor(fail_after=3)))
+    # the checkpoints are written outside of the event loop:
+    assert save_threads
+    assert threading.main_thread() not in save_threads
+
+    executor = AsyncFlakyExecutor()
+    result = asyncio.run(_run(executor))
+    assert executor._executor.frames_run == 12
+    expected = lt.Context(executor=InlineJobExecutor()).run(ring.get_job())
+    assert np.allclose(result, expected)
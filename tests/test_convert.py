@@ -0,0 +1,99 @@
+import os
+import json
+
+import numpy as np
+from click.testing import CliRunner
+
+from libertem.io.dataset import detect
+from libertem.io.dataset.memory import MemoryDataSet
+from libertem.io.dataset.raw import RawFileDataSet
+from libertem.io.dataset.chunked import ChunkedDataSet
+from libertem.io.ingest.cli import main
+from libertem.job.convert import ConvertJob
+
+from utils import _mk_random
+
+
+def _read_all(ds):
+    result = np.zeros(tuple(ds.raw_shape), dtype=ds.dtype)
+    for p in ds.get_partitions():
+        for tile in p.get_tiles():
+            result[tile.tile_slice.get()] = tile.data
+    return result
+
+
+def test_convert_raw(lt_ctx, tmpdir):
+    data = _mk_random(size=(6, 8, 16, 16), dtype='uint16')
+    ds = MemoryDataSet(data=data, tileshape=(1, 3, 16, 16), partition_shape=(2, 8, 16, 16))
+    job = ConvertJob(dataset=ds, output_path=str(tmpdir), dtype='float32')
+    assert lt_ctx.run(job)[0] == 48
+    with open(str(tmpdir.join("index.json"))) as f:
+        idx = json.load(f)
+    assert idx['mode'] == 'raw'
+    assert tuple(idx['shape']) == (6, 8, 16, 16)
+    result = np.fromfile(str(tmpdir.join(idx['filename'])), dtype=idx['dtype'])
+    assert np.allclose(result.reshape(data.shape), data)
+
+
+def test_load_converted_raw(lt_ctx, tmpdir):
+    data = _mk_random(size=(6, 8, 16, 16), dtype='uint16')
+    ds = MemoryDataSet(data=data, tileshape=(1, 3, 16, 16), partition_shape=(2, 8, 16, 16))
+    lt_ctx.run(ConvertJob(dataset=ds, output_path=str(tmpdir), crop_shape=(8, 12)))
+    params = detect(str(tmpdir))
+    assert params['type'] == 'raw'
+    out_ds = lt_ctx.load(params.pop('type'), **params)
+    assert out_ds.check_valid()
+    assert tuple(out_ds.shape) == (6, 8, 8, 12)
+    assert out_ds.dtype == np.dtype('uint16')
+    assert np.allclose(_read_all(out_ds), data[:, :, :8, :12])
+
+
+def test_convert_crop_and_correct(lt_ctx, tmpdir):
+    data = _mk_random(size=(4, 4, 16, 16), dtype='float32')
+    dark = _mk_random(size=(16, 16), dtype='float32')
+    gain = _mk_random(size=(16, 16), dtype='float32')
+    # tiles that are smaller than the frames:
+    ds = MemoryDataSet(data=data, tileshape=(1, 2, 8, 8), partition_shape=(1, 4, 16, 16))
+    job = ConvertJob(
+        dataset=ds, output_path=str(tmpdir),
+        crop_origin=(4, 2), crop_shape=(8, 12),
+        dark=dark, gain=gain,
+    )
+    lt_ctx.run(job)
+    out_ds = RawFileDataSet(
+        path=str(tmpdir.join("data.raw")), scan_size=(4, 4), dtype='float32',
+        detector_size_raw=(8, 12), crop_detector_to=(8, 12),
+    ).initialize()
+    expected = ((data - dark) * gain)[:, :, 4:12, 2:14]
+    assert np.allclose(_read_all(out_ds), expected)
+
+
+def test_convert_chunked(lt_ctx, tmpdir):
+    data = _mk_random(size=(6, 8, 16, 16), dtype='uint16')
+    ds = MemoryDataSet(data=data, tileshape=(1, 3, 16, 16), partition_shape=(3, 8, 16, 16))
+    job = ConvertJob(
+        dataset=ds, output_path=str(tmpdir), output_format="chunked", codec="zlib",
+        chunk_size=5*16*16*2,
+    )
+    lt_ctx.run(job)
+    out_ds = ChunkedDataSet(path=str(tmpdir)).initialize()
+    assert out_ds.check_valid()
+    # chunks don't cross the partitions of the input:
+    assert [c['num_frames'] for c in out_ds._index['chunks']] == [5, 5, 5, 5, 4, 5, 5, 5, 5, 4]
+    assert np.allclose(_read_all(out_ds).reshape(data.shape), data)
+
+
+def test_convert_cli(tmpdir):
+    data = _mk_random(size=(4, 4, 16, 16), dtype='float32')
+    npy_path = str(tmpdir.join("data.npy"))
+    np.save(npy_path, data)
+    out_path = str(tmpdir.join("out"))
+    runner = CliRunner()
+    result = runner.invoke(main, [
+        "convert", npy_path, out_path, "--dest-dtype", "float64", "--crop", "0,0,8,8",
+        "--scheduler", "inline",
+    ])
+    assert result.exit_code == 0, result.output
+    assert os.path.exists(os.path.join(out_path, "index.json"))
+    result = np.fromfile(os.path.join(out_path, "data.raw"), dtype="float64")
+    assert np.allclose(result.reshape((4, 4, 8, 8)), data[:, :, :8, :8])
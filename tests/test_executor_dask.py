@@ -1,21 +1,287 @@
-from libertem.executor.dask import CommonDaskMixin
+import os
+import math
+import collections
 
+import numpy as np
+import pytest
 
-def test_task_affinity_1():
+from libertem.executor.dask import (
+    CommonDaskMixin, DaskJobExecutor, _TaskScheduler, _JobRun
+)
+from libertem.io.utils import get_devices
+from libertem.io.dataset.memory import MemoryDataSet, MemoryPartition
+from libertem.job.sum import SumFramesJob
+from libertem.job.convert import ConvertJob
+
+from utils import _mk_random
+
+
+WORKERS = [
+    {'host': '127.0.0.1', 'name': 'w1'},
+    {'host': '127.0.0.1', 'name': 'w2'},
+    {'host': '127.0.0.1', 'name': 'w3'},
+    {'host': '127.0.0.1', 'name': 'w4'},
+
+    {'host': '127.0.0.2', 'name': 'w5'},
+    {'host': '127.0.0.2', 'name': 'w6'},
+    {'host': '127.0.0.2', 'name': 'w7'},
+    {'host': '127.0.0.2', 'name': 'w8'},
+
+    {'host': '127.0.0.3', 'name': 'w9'},
+    {'host': '127.0.0.3', 'name': 'w10'},
+]
+
+KEYS = ["partition-%d" % i for i in range(300)]
+
+
+def _hosts(workers):
+    return {w['name']: w['host'] for w in workers}
+
+
+def test_task_affinity_whole_host():
     cdm = CommonDaskMixin()
-    workers = [
-        {'host': '127.0.0.1', 'name': 'w1'},
-        {'host': '127.0.0.1', 'name': 'w2'},
-        {'host': '127.0.0.1', 'name': 'w3'},
-        {'host': '127.0.0.1', 'name': 'w4'},
-
-        {'host': '127.0.0.2', 'name': 'w5'},
-        {'host': '127.0.0.2', 'name': 'w6'},
-        {'host': '127.0.0.2', 'name': 'w7'},
-        {'host': '127.0.0.2', 'name': 'w8'},
-    ]
-
-    assert cdm._task_idx_to_workers(workers, 0) == ['w1', 'w2', 'w3', 'w4']
-    assert cdm._task_idx_to_workers(workers, 1) == ['w5', 'w6', 'w7', 'w8']
-    assert cdm._task_idx_to_workers(workers, 2) == ['w1', 'w2', 'w3', 'w4']
-    assert cdm._task_idx_to_workers(workers, 3) == ['w5', 'w6', 'w7', 'w8']
+    host_of = _hosts(WORKERS)
+    for key in KEYS:
+        names = cdm._task_to_workers(WORKERS, key)
+        hosts = set(host_of[n] for n in names)
+        assert len(hosts) == 1
+        host = hosts.pop()
+        assert names == [w['name'] for w in WORKERS if w['host'] == host]
+
+
+def test_task_affinity_stable_and_balanced():
+    cdm = CommonDaskMixin()
+    first = [cdm._task_to_workers(WORKERS, key) for key in KEYS]
+    # independent of worker order:
+    second = [cdm._task_to_workers(list(reversed(WORKERS)), key) for key in KEYS]
+    assert [sorted(f) for f in first] == [sorted(s) for s in second]
+    host_of = _hosts(WORKERS)
+    counts = {}
+    for names in first:
+        host = host_of[names[0]]
+        counts[host] = counts.get(host, 0) + 1
+    assert len(counts) == 3
+    assert min(counts.values()) > 50
+
+
+def test_task_affinity_host_leaves():
+    cdm = CommonDaskMixin()
+    host_of = _hosts(WORKERS)
+    remaining = [w for w in WORKERS if w['host'] != '127.0.0.3']
+    for key in KEYS:
+        before = host_of[cdm._task_to_workers(WORKERS, key)[0]]
+        after = host_of[cdm._task_to_workers(remaining, key)[0]]
+        # only partitions of the host that left are moved:
+        if before != '127.0.0.3':
+            assert before == after
+
+
+def test_task_affinity_pin_workers():
+    cdm = CommonDaskMixin()
+    cdm.pin_workers = True
+    host_of = _hosts(WORKERS)
+    chosen = set()
+    for key in KEYS:
+        names = cdm._task_to_workers(WORKERS, key)
+        assert len(names) == 1
+        # the same host as without pinning:
+        cdm.pin_workers = False
+        assert host_of[names[0]] == host_of[cdm._task_to_workers(WORKERS, key)[0]]
+        cdm.pin_workers = True
+        chosen.add(names[0])
+    assert chosen == set(host_of.keys())
+
+
+def test_task_affinity_bounded_load():
+    cdm = CommonDaskMixin()
+    host_of = _hosts(WORKERS)
+    # uneven hashing: all keys prefer the same host
+    keys = [
+        key for key in KEYS
+        if host_of[cdm._task_to_workers(WORKERS, key)[0]] == '127.0.0.3'
+    ][:20]
+    assert len(keys) == 20
+    load = collections.Counter()
+    for key in keys:
+        load[host_of[cdm._task_to_workers(WORKERS, key, load=load)[0]]] += 1
+    # no host gets much more than its share of the tasks, by number of workers:
+    workers_per_host = collections.Counter(host_of.values())
+    assert set(load.keys()) == set(workers_per_host.keys())
+    for host, count in load.items():
+        assert count <= math.ceil(cdm.load_factor * 20 * workers_per_host[host] / 10)
+    # without load, a task goes to the host that it hashes to:
+    for key in keys:
+        assert host_of[cdm._task_to_workers(WORKERS, key, load={})[0]] == '127.0.0.3'
+
+
+class _FakePartition(object):
+    def __init__(self, devices):
+        self._devices = devices
+
+    def get_devices(self):
+        return self._devices
+
+
+class _FakeTask(object):
+    def __init__(self, idx, devices):
+        self.idx = idx
+        self.partition = _FakePartition(devices)
+
+
+def _idx(tasks):
+    return [t.idx for t in tasks]
+
+
+def test_device_scheduler_limit():
+    tasks = [_FakeTask(i, [i % 2]) for i in range(6)] + [_FakeTask(6, [])]
+    scheduler = _TaskScheduler(tasks, max_readers_per_device=1)
+    # one task per device, tasks without files are not limited:
+    first = scheduler.next_tasks()
+    assert _idx(first) == [0, 1, 6]
+    assert scheduler.next_tasks() == []
+    scheduler.task_done(first[1])
+    assert _idx(scheduler.next_tasks()) == [3]
+    scheduler.task_done(first[0])
+    assert _idx(scheduler.next_tasks()) == [2]
+
+
+def test_device_scheduler_keeps_order():
+    tasks = [_FakeTask(0, [1]), _FakeTask(1, [1, 2]), _FakeTask(2, [2])]
+    scheduler = _TaskScheduler(tasks, max_readers_per_device=1)
+    first = scheduler.next_tasks()
+    assert _idx(first) == [0]
+    # task 2 can't overtake task 1, which waits for device 1:
+    scheduler.task_done(first[0])
+    assert _idx(scheduler.next_tasks()) == [1]
+
+
+def test_device_scheduler_cancel():
+    tasks = [_FakeTask(i, [0]) for i in range(3)]
+    scheduler = _TaskScheduler(tasks, max_readers_per_device=2)
+    first = scheduler.next_tasks()
+    assert _idx(first) == [0, 1]
+    scheduler.cancel()
+    scheduler.task_done(first[0])
+    assert scheduler.next_tasks() == []
+
+
+def test_get_devices(tmpdir):
+    path = str(tmpdir.join("a.raw"))
+    with open(path, "wb") as f:
+        f.write(b"\\0")
+    assert get_devices([path, path, str(tmpdir.join("missing"))]) == [os.stat(path).st_dev]
+
+
+def test_split_pending_fills_slots():
+    data = _mk_random(size=(16, 16, 16, 16), dtype='float32')
+    ds = MemoryDataSet(data=data, tileshape=(1, 8, 16, 16), partition_shape=(8, 16, 16, 16))
+    scheduler = _TaskScheduler(SumFramesJob(dataset=ds).get_tasks())
+    assert scheduler.num_pending == 2
+    scheduler.split_pending(8, min_size=0)
+    assert scheduler.num_pending == 8
+    tasks = scheduler.next_tasks()
+    # the parts cover all frames exactly once:
+    covered = np.zeros((16, 16), dtype=int)
+    for task in tasks:
+        covered[task.partition.slice.get(nav_only=True)] += 1
+    assert np.all(covered == 1)
+    result = sum(r.data for task in tasks for r in task())
+    assert np.allclose(result, data.sum(axis=(0, 1)))
+
+
+def test_split_pending_min_size():
+    data = _mk_random(size=(4, 4, 16, 16), dtype='float32')
+    ds = MemoryDataSet(data=data, tileshape=(1, 4, 16, 16), partition_shape=(4, 4, 16, 16))
+    scheduler = _TaskScheduler(SumFramesJob(dataset=ds).get_tasks())
+    # parts need to have at least 8 frames:
+    scheduler.split_pending(8, min_size=8 * 16 * 16 * 4)
+    assert scheduler.num_pending == 2
+
+
+def test_split_pending_unsplittable(tmpdir):
+    data = _mk_random(size=(4, 4, 16, 16), dtype='float32')
+    ds = MemoryDataSet(data=data, tileshape=(1, 4, 16, 16), partition_shape=(4, 4, 16, 16))
+    job = ConvertJob(dataset=ds, output_path=str(tmpdir), output_format="chunked")
+    scheduler = _TaskScheduler(job.get_tasks())
+    scheduler.split_pending(8, min_size=0)
+    assert scheduler.num_pending == 1
+
+
+@pytest.fixture
+def inproc_executor():
+    executor = DaskJobExecutor.make_local(
+        cluster_kwargs={"n_workers": 2, "threads_per_worker": 1, "processes": False},
+        retry_delay=0.01,
+    )
+    yield executor
+    executor.close()
+
+
+@pytest.fixture
+def flaky_tiles(monkeypatch):
+    """
+    the first read of each partition fails with an ``OSError``
+    """
+    failed = set()
+    get_tiles = MemoryPartition.get_tiles
+
+    def _get_tiles(self, *args, **kwargs):
+        if self.slice not in failed:
+            failed.add(self.slice)
+            raise OSError("transient error")
+        return get_tiles(self, *args, **kwargs)
+
+    monkeypatch.setattr(MemoryPartition, "get_tiles", _get_tiles)
+    return failed
+
+
+def test_retry_failed_tasks(inproc_executor, flaky_tiles):
+    data = _mk_random(size=(16, 16, 16, 16), dtype='float32')
+    ds = MemoryDataSet(data=data, tileshape=(1, 8, 16, 16), partition_shape=(4, 16, 16, 16))
+    result = np.zeros((16, 16), dtype='float32')
+    for tiles in inproc_executor.run_job(SumFramesJob(dataset=ds)):
+        for tile in tiles:
+            tile.reduce_into_result(result)
+    assert len(flaky_tiles) >= 4
+    assert np.allclose(result, data.sum(axis=(0, 1)))
+
+
+def test_partial_results_are_kept(inproc_executor, flaky_tiles):
+    inproc_executor.max_retries = 0
+    data = _mk_random(size=(16, 16, 16, 16), dtype='float32')
+    ds = MemoryDataSet(data=data, tileshape=(1, 8, 16, 16), partition_shape=(4, 16, 16, 16))
+    # the first partition succeeds:
+    flaky_tiles.add(next(ds.get_partitions()).slice)
+    results = []
+    with pytest.raises(OSError):
+        for tiles in inproc_executor.run_job(SumFramesJob(dataset=ds)):
+            results.append(tiles)
+    assert len(results) >= 1
+
+
+def test_tasks_in_flight(inproc_executor):
+    data = _mk_random(size=(16, 16, 16, 16), dtype='float32')
+    ds = MemoryDataSet(data=data, tileshape=(1, 8, 16, 16), partition_shape=(1, 16, 16, 16))
+    run = _JobRun(inproc_executor, SumFramesJob(dataset=ds))
+    run.submit()
+    # two threads, with two tasks each:
+    assert run.scheduler.num_pending == 12
+    futures = run.cancel()
+    assert len(futures) == 4
+    inproc_executor.client.cancel(futures)
+
+
+def test_retry_waits_on_client(inproc_executor, flaky_tiles):
+    inproc_executor.retry_delay = 0.5
+    data = _mk_random(size=(4, 16, 16, 16), dtype='float32')
+    ds = MemoryDataSet(data=data, tileshape=(1, 8, 16, 16), partition_shape=(4, 16, 16, 16))
+    run = _JobRun(inproc_executor, SumFramesJob(dataset=ds))
+    completed = run.iter_completed()
+    future, result = next(completed)
+    assert future.status == "error"
+    run.fail(future, result)
+    # the retry is only submitted once its delay has passed:
+    run.submit()
+    assert run.as_completed.is_empty()
+    future, result = next(completed)
+    assert future.status == "finished"
@@ -0,0 +1,94 @@
+import os
+
+import numpy as np
+import pytest
+
+from libertem import api as lt
+from libertem.io.dataset.mib import MIBDataSet, MIBFile
+from libertem.io.planner import PartitionPlanner
+from libertem.analysis.ring import RingMaskAnalysis
+
+from utils import _write_mib
+
+FRAME_SIZE = 16 * 16 * 2 + 384
+
+
+@pytest.fixture
+def ctx(tmpdir, monkeypatch, inline_executor):
+    monkeypatch.setenv("LIBERTEM_CACHE_DIR", str(tmpdir.join("cache")))
+    return lt.Context(executor=inline_executor, incremental=True)
+
+
+@pytest.fixture
+def frames_read(monkeypatch):
+    counts = []
+    read_frames = MIBFile.read_frames
+
+    def _read_frames(self, num, *args, **kwargs):
+        counts.append(num)
+        return read_frames(self, num, *args, **kwargs)
+
+    monkeypatch.setattr(MIBFile, "read_frames", _read_frames)
+    return counts
+
+
+def _load(tmpdir, num_rows):
+    ds = MIBDataSet(
+        path=str(tmpdir.join("scan_1.mib")), scan_size=(num_rows, 4),
+        index_path=str(tmpdir.join("index.json")),
+    ).initialize()
+    ds.set_planner(PartitionPlanner(num_workers=1, min_size=1, max_size=3 * FRAME_SIZE))
+    return ds
+
+
+def _write_rows(tmpdir, data, rows):
+    for row in rows:
+        _write_mib(str(tmpdir.join("scan_%d.mib" % (row + 1))), 4 * row + 1, data[row])
+
+
+def test_only_new_frames_are_read(tmpdir, ctx, frames_read):
+    data = np.random.randint(0, 1024, size=(3, 4, 16, 16)).astype("uint16")
+    _write_rows(tmpdir, data, range(2))
+    ds = _load(tmpdir, 2)
+    sum_result = ctx.run(ctx.create_sum_analysis(dataset=ds))
+    ring = RingMaskAnalysis(dataset=ds, parameters={"ri": 2, "ro": 5})
+    ring_result = ctx.run(ring)
+    assert sum(frames_read) == 16
+    assert np.allclose(sum_result.intensity.raw_data, data[:2].sum(axis=(0, 1)))
+
+    # running again doesn't read anything:
+    del frames_read[:]
+    assert np.allclose(
+        ctx.run(ctx.create_sum_analysis(dataset=ds)).intensity.raw_data,
+        sum_result.intensity.raw_data,
+    )
+    assert np.allclose(ctx.run(ring).intensity.raw_data, ring_result.intensity.raw_data)
+    assert frames_read == []
+
+    # a new row is appended, with different partition boundaries:
+    _write_rows(tmpdir, data, [2])
+    ds = _load(tmpdir, 3)
+    result = ctx.run(ctx.create_sum_analysis(dataset=ds))
+    assert sum(frames_read) == 4
+    assert np.allclose(result.intensity.raw_data, data.sum(axis=(0, 1)))
+
+    ring = RingMaskAnalysis(dataset=ds, parameters={"ri": 2, "ro": 5})
+    expected = lt.Context(executor=ctx.executor).run(ring)
+    assert np.allclose(ctx.run(ring).intensity.raw_data, expected.intensity.raw_data)
+
+
+def test_changed_files_are_read_again(tmpdir, ctx, frames_read):
+    data = np.random.randint(0, 1024, size=(2, 4, 16, 16)).astype("uint16")
+    _write_rows(tmpdir, data, range(2))
+    ds = _load(tmpdir, 2)
+    ctx.run(ctx.create_sum_analysis(dataset=ds))
+
+    data[1] = 0
+    _write_rows(tmpdir, data, [1])
+    path = str(tmpdir.join("scan_2.mib"))
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1000000000))
+    del frames_read[:]
+    result = ctx.run(ctx.create_sum_analysis(dataset=_load(tmpdir, 2)))
+    assert 4 <= sum(frames_read) < 8
+    assert np.allclose(result.intensity.raw_data, data.sum(axis=(0, 1)))
@@ -0,0 +1,43 @@
+import asyncio
+
+import pytest
+
+from libertem.executor.base import JobCancelledError
+from libertem.web.server import JobScheduler
+
+
+def test_pause_for_higher_priority():
+    async def _test():
+        scheduler = JobScheduler()
+        await scheduler.acquire("batch", "user1", "batch")
+        assert not scheduler.should_pause("batch")
+        await scheduler.acquire("pick", "user2", "interactive")
+        assert scheduler.should_pause("batch")
+        assert not scheduler.should_pause("pick")
+        await scheduler.release("pick")
+        assert not scheduler.should_pause("batch")
+
+    asyncio.run(_test())
+
+
+def test_jobs_per_user():
+    async def _test():
+        scheduler = JobScheduler(max_jobs_per_user={"batch": 1})
+        await scheduler.acquire("a", "user1", "batch")
+        # other users and other classes are not limited:
+        await scheduler.acquire("b", "user2", "batch")
+        await scheduler.acquire("c", "user1", "preview")
+
+        waiting = asyncio.ensure_future(scheduler.acquire("d", "user1", "batch"))
+        await asyncio.sleep(0.01)
+        assert not waiting.done()
+        await scheduler.release("a")
+        await asyncio.wait_for(waiting, 1)
+
+        cancelled = asyncio.ensure_future(scheduler.acquire("e", "user1", "batch"))
+        await asyncio.sleep(0.01)
+        await scheduler.cancel("e")
+        with pytest.raises(JobCancelledError):
+            await asyncio.wait_for(cancelled, 1)
+
+    asyncio.run(_test())
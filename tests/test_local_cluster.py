@@ -4,7 +4,8 @@ import numpy as np
 import pytest
 
 from libertem import api
-from utils import _naive_mask_apply, _mk_random
+from libertem.executor.dask import DaskJobExecutor
+from utils import _naive_mask_apply, _mk_random, MemoryDataSet
 
 
 @pytest.mark.skipif('LT_RUN_FUNCTIONAL' not in os.environ, reason="Takes a long time")
@@ -24,3 +25,23 @@ def test_start_local(hdf5_ds_1):
         results.mask_0.raw_data,
         expected
     )
+
+
+@pytest.mark.skipif('LT_RUN_FUNCTIONAL' not in os.environ, reason="Takes a long time")
+@pytest.mark.parametrize("speculative_tasks", [0, 4])
+def test_split_and_speculate(speculative_tasks):
+    data = _mk_random(size=(16, 16, 16, 16), dtype='float32')
+    # a single partition, which is split to use all worker threads:
+    dataset = MemoryDataSet(
+        data=data, tileshape=(1, 4, 16, 16), partition_shape=(16, 16, 16, 16)
+    )
+    mask = _mk_random(size=(16, 16))
+    expected = _naive_mask_apply([mask], data)
+    executor = DaskJobExecutor.make_local(
+        cluster_kwargs={"n_workers": 2, "threads_per_worker": 2},
+        min_split_size=0, speculative_tasks=speculative_tasks,
+    )
+    with api.Context(executor=executor) as ctx:
+        analysis = ctx.create_mask_analysis(dataset=dataset, factories=[lambda: mask])
+        results = ctx.run(analysis)
+    assert np.allclose(results.mask_0.raw_data, expected)
@@ -0,0 +1,83 @@
+import time
+
+import numpy as np
+import pytest
+
+from libertem import api as lt
+from libertem.io.dataset.raw import RawFileDataSet
+from libertem.job.cache import ResultCache
+from libertem.analysis.ring import RingMaskAnalysis
+
+
+@pytest.fixture
+def raw_ds(tmpdir):
+    data = np.random.choice(a=[0, 1], size=(4, 4, 16, 16)).astype("float32")
+    path = str(tmpdir.join("data.raw"))
+    data.tofile(path)
+    ds = RawFileDataSet(
+        path=path, scan_size=(4, 4), detector_size_raw=(16, 16), crop_detector_to=(16, 16),
+        dtype="float32", tileshape=(1, 2, 16, 16),
+    ).initialize()
+    return ds, data, path
+
+
+@pytest.fixture
+def tasks_run(monkeypatch, inline_executor):
+    counts = []
+    run_job = inline_executor.run_job
+
+    def _run_job(job):
+        counts.append(job)
+        return run_job(job)
+
+    monkeypatch.setattr(inline_executor, "run_job", _run_job)
+    return counts
+
+
+def test_cached_result(tmpdir, raw_ds, inline_executor, tasks_run):
+    ds, data, path = raw_ds
+    cache = ResultCache(path=str(tmpdir.join("results")))
+    ctx = lt.Context(executor=inline_executor, result_cache=cache)
+    ring = RingMaskAnalysis(dataset=ds, parameters={"cx": 8, "cy": 8, "ri": 2, "ro": 5})
+    result = ctx.run(ring)
+    assert len(tasks_run) == 1
+
+    # the same parameters, from memory and from disk:
+    for c in [cache, ResultCache(path=cache.path)]:
+        ctx = lt.Context(executor=inline_executor, result_cache=c)
+        again = ctx.run(RingMaskAnalysis(
+            dataset=ds, parameters={"ro": 5, "ri": 2, "cy": 8, "cx": 8}
+        ))
+        assert len(tasks_run) == 1
+        assert np.allclose(again.intensity.raw_data, result.intensity.raw_data)
+
+    # other parameters:
+    ctx.run(RingMaskAnalysis(dataset=ds, parameters={"cx": 8, "cy": 8, "ri": 1, "ro": 5}))
+    assert len(tasks_run) == 2
+
+    # changed data:
+    (data + 1).tofile(path)
+    changed = ctx.run(ring)
+    assert len(tasks_run) == 3
+    assert not np.allclose(changed.intensity.raw_data, result.intensity.raw_data)
+
+
+def test_lru_eviction(tmpdir):
+    result = np.ones((16, 16), dtype="float32")
+    cache = ResultCache(
+        # 128 bytes for the .npy header:
+        max_memory=2 * result.nbytes, path=str(tmpdir), max_disk=3 * (result.nbytes + 128),
+    )
+    for i in range(4):
+        cache.put("key%d" % i, result * i)
+        # file times are the LRU order on disk:
+        time.sleep(0.05)
+        if i == 2:
+            # key0 is used more recently than key1 and key2:
+            assert cache.get("key0") is not None
+            time.sleep(0.05)
+    assert list(cache._memory.keys()) == ["key0", "key3"]
+    disk_only = ResultCache(path=str(tmpdir))
+    assert disk_only.get("key1") is None
+    assert np.allclose(disk_only.get("key0"), 0)
+    assert np.allclose(disk_only.get("key3"), 3)
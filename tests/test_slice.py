@@ -240,3 +240,12 @@ def test_get():
         slice(0, 1),
         slice(0, 1),
     )
+
+
+def test_get_frame_indices():
+    s = Slice(
+        origin=(1, 2, 0, 0),
+        shape=Shape((2, 3, 4, 4), sig_dims=2)
+    )
+    frame_idx = np.arange(5 * 8).reshape((5, 8))
+    assert np.array_equal(s.get_frame_indices((5, 8)), frame_idx[s.get(nav_only=True)])
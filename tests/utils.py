@@ -1,79 +1,9 @@
 import numpy as np
 
-from libertem.io.dataset.base import DataTile, DataSet, Partition, DataSetMeta
-from libertem.common import Slice, Shape
+from libertem.io.dataset.memory import MemoryDataSet  # NOQA: F401
 from libertem.masks import to_dense
 
 
-class MemoryReader(object):
-    def __init__(self, data):
-        self.data = data
-
-
-class MemoryDataSet(DataSet):
-    def __init__(self, data, tileshape, partition_shape, sig_dims=2, effective_shape=None):
-        self.data = data
-        self.tileshape = Shape(tileshape, sig_dims=sig_dims)
-        self.partition_shape = Shape(partition_shape, sig_dims=sig_dims)
-        self.sig_dims = sig_dims
-        self._effective_shape = effective_shape and Shape(effective_shape, sig_dims) or None
-        self._meta = DataSetMeta(
-            shape=self.shape,
-            raw_shape=self.raw_shape,
-            dtype=self.data.dtype,
-        )
-
-    @property
-    def dtype(self):
-        return self.data.dtype
-
-    @property
-    def raw_shape(self):
-        return Shape(self.data.shape, sig_dims=self.sig_dims)
-
-    @property
-    def shape(self):
-        return self._effective_shape or self.raw_shape
-
-    def check_valid(self):
-        return True
-
-    def get_reader(self):
-        return MemoryReader(data=self.data)
-
-    def get_partitions(self):
-        ds_slice = Slice(origin=tuple([0] * self.raw_shape.dims), shape=self.raw_shape)
-        for pslice in ds_slice.subslices(self.partition_shape):
-            yield MemoryPartition(
-                tileshape=self.tileshape,
-                meta=self._meta,
-                reader=self.get_reader(),
-                partition_slice=pslice,
-            )
-
-
-class MemoryPartition(Partition):
-    def __init__(self, tileshape, reader, *args, **kwargs):
-        self.tileshape = tileshape
-        self.reader = reader
-        super().__init__(*args, **kwargs)
-
-    def get_tiles(self, crop_to=None):
-        subslices = self.slice.subslices(shape=self.tileshape)
-        for tile_slice in subslices:
-            if crop_to is not None:
-                intersection = tile_slice.intersection_with(crop_to)
-                if intersection.is_null():
-                    continue
-            yield DataTile(
-                data=self.reader.data[tile_slice.get()],
-                tile_slice=tile_slice
-            )
-
-    def __repr__(self):
-        return "<MemoryPartition for %r>" % self.slice
-
-
 def _naive_mask_apply(masks, data):
     """
     masks: list of masks
@@ -112,3 +42,16 @@ def _mk_random(size, dtype='float32'):
     data[coords2] = np.random.choice(choice) * sum(size)
     data[coords10] = np.random.choice(choice) * 10 * sum(size)
     return data
+
+
+def _write_mib(path, first_image, data, header_size=384):
+    """
+    write ``data`` as frames of a MIB file, numbered from ``first_image``
+    """
+    with open(path, "wb") as f:
+        for i, frame in enumerate(data):
+            header = "MQ1,%06d,%05d,01,%04d,%04d,U16," % (
+                first_image + i, header_size, frame.shape[1], frame.shape[0]
+            )
+            f.write(header.ljust(header_size).encode("ascii"))
+            f.write(frame.astype(">u2").tobytes())